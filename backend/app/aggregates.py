@@ -0,0 +1,140 @@
+# app/aggregates.py
+"""
+Date-range totals over the sales table.
+
+sales_totals() backs /api/sales/aggregate and the fixed-period tiles
+(nb-promo, promo-only, abc-sections, the coachees-table summary): count and
+sum of total_amount between two payment dates, optionally grouped by profit
+center, sales person, main item and/or day, week or month, and narrowed by a
+SalesFilter. Sales schema v2 indexes latest_payment_date and profit_center
+together with total_amount, so date-range and profit-center totals are read
+from the index instead of scanning the table.
+"""
+
+import datetime
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import schema, storage
+
+# group_by keys: sales columns, and date buckets of latest_payment_date
+GROUP_COLUMNS = ("profit_center", "sales_person", "main_item")
+GROUP_PERIODS = ("day", "week", "month")
+
+# Personal training profit centers (the coachees table and the PT time series)
+PT_NEW_CENTERS = [
+    'PT Postdate - New',
+    'Personal Training - NEW',
+]
+PT_RENEW_CENTERS = [
+    'PT Postdate - Renew',
+    'Personal Training - RENEW',
+]
+
+# Promotion main items that upgrade an EFT membership (the EFT entries page and the New EFT KPI)
+UPGRADE_ITEMS = [
+    'UPG to AMT+',
+    'CT UPGRADE',
+    'UPG CTG',
+    'Upg to AMT',
+    'CT - Upgrade'
+]
+
+@schema.migration("sales", 2, "payment date and profit center indexes")
+def index_sales_dates(conn):
+    """
+    Covering indexes for date-range totals, with and without a profit center
+    filter, and a payment date index for transactions. Deferred until the
+    first sales import has created the tables.
+    """
+    if not schema.table_exists(conn, "sales"):
+        return False
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_date_center ON sales (latest_payment_date, profit_center, total_amount)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_center_date ON sales (profit_center, latest_payment_date, total_amount)")
+    if schema.table_exists(conn, "transactions"):
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_payment_date ON transactions (payment_date)")
+    if storage.is_sqlite():
+        # Statistics let the planner skip-scan the profit center index for ranges grouped by profit center
+        conn.execute("ANALYZE sales")
+
+@dataclass
+class SalesFilter:
+    """Row predicates; empty lists don't filter."""
+    profit_centers: Sequence[str] = field(default_factory=list)
+    # Case-insensitive substrings, e.g. "pos dues" for every POS Dues variant
+    profit_center_contains: Sequence[str] = field(default_factory=list)
+    sales_people: Sequence[str] = field(default_factory=list)
+    main_items: Sequence[str] = field(default_factory=list)
+    main_item_prefixes: Sequence[str] = field(default_factory=list)
+    # Substrings; sales without a main item are kept, as in the promotion tiles
+    exclude_main_items: Sequence[str] = field(default_factory=list)
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+
+    def sql(self) -> Tuple[List[str], List[Any]]:
+        clauses, params = [], []
+        for column, values in (("profit_center", self.profit_centers), ("sales_person", self.sales_people),
+                               ("main_item", self.main_items)):
+            if values:
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        if self.profit_center_contains:
+            clauses.append("(" + " OR ".join(f"profit_center {storage.like()} ?" for _ in self.profit_center_contains) + ")")
+            params.extend(f"%{text}%" for text in self.profit_center_contains)
+        if self.main_item_prefixes:
+            clauses.append("(" + " OR ".join("main_item LIKE ?" for _ in self.main_item_prefixes) + ")")
+            params.extend(f"{p}%" for p in self.main_item_prefixes)
+        for text in self.exclude_main_items:
+            clauses.append("(main_item IS NULL OR main_item NOT LIKE ?)")
+            params.append(f"%{text}%")
+        if self.min_amount is not None:
+            clauses.append("total_amount >= ?")
+            params.append(self.min_amount)
+        if self.max_amount is not None:
+            clauses.append("total_amount <= ?")
+            params.append(self.max_amount)
+        return clauses, params
+
+def yesterday_and_first_of_month(today: Optional[datetime.date] = None) -> Tuple[datetime.date, datetime.date]:
+    today = today or datetime.date.today()
+    return today - datetime.timedelta(days=1), today.replace(day=1)
+
+def sales_totals(start: Optional[datetime.date], end: Optional[datetime.date], group_by: Sequence[str] = (),
+                 where: Optional[SalesFilter] = None) -> List[Dict[str, Any]]:
+    """
+    {<group keys>, "sales": count, "total": sum of total_amount} per group, in
+    group order; one row when group_by is empty. start and end are inclusive
+    payment dates and either may be None for an open range.
+    """
+    unknown = [g for g in group_by if g not in GROUP_COLUMNS and g not in GROUP_PERIODS]
+    if unknown:
+        raise ValueError(f"Cannot group by {', '.join(unknown)}")
+    keys = [
+        f"{storage.date_bucket(g, 'latest_payment_date')} AS {g}" if g in GROUP_PERIODS else g
+        for g in group_by
+    ]
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("latest_payment_date >= ?")
+        params.append(start.isoformat())
+    if end is not None:
+        # Before the next day, so timestamped payment dates on `end` still count
+        clauses.append("latest_payment_date < ?")
+        params.append((end + datetime.timedelta(days=1)).isoformat())
+    filter_clauses, filter_params = (where or SalesFilter()).sql()
+    clauses += filter_clauses
+    params += filter_params
+    sql = f"SELECT {''.join(k + ', ' for k in keys)}COUNT(*) AS sales, SUM(total_amount) AS total FROM sales"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    if keys:
+        positions = ", ".join(str(i + 1) for i in range(len(keys)))
+        sql += f" GROUP BY {positions} ORDER BY {positions}"
+    rows = storage.query("sales", sql, tuple(params))
+    for row in rows:
+        row["total"] = round(row["total"] or 0.0, 2)
+    return rows
+
+def sales_total(start: Optional[datetime.date], end: Optional[datetime.date], where: Optional[SalesFilter] = None) -> float:
+    """Sum of total_amount for the range (0.0 when nothing matches)."""
+    return sales_totals(start, end, where=where)[0]["total"]
@@ -0,0 +1,111 @@
+# app/bus.py
+"""
+Change bus behind the live update stream (/api/live, Server-Sent Events).
+
+Writes publish the data topics they touched (sales, events, guests, kpi,
+...): the cache invalidation middleware calls cache.clear(topics) after every
+successful write, and the bus listens to that in the worker that handled the
+write. Writes handled by other workers arrive through the shared cache
+database: while at least one client is connected, a watcher reads the cache
+generation every settings.LIVE_POLL_SECONDS and publishes the topics written
+since. Without clients there is no watcher, and a connected client that
+hears nothing costs one sleeping coroutine and a heartbeat comment every
+settings.LIVE_HEARTBEAT_SECONDS.
+
+Every client holds at most one pending message per topic: a change arriving
+before the client has read the previous one for the same topic replaces it,
+so a slow reader or a burst of writes never builds up a queue.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from . import cache
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+TOPICS = sorted({topic for topics in cache.WRITE_TOPICS.values() for topic in topics})
+
+class Subscriber:
+    """One connected client: its topic filter and its pending message per topic."""
+    def __init__(self, topics: Optional[Set[str]]):
+        self.topics = topics
+        self.loop = asyncio.get_running_loop()
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self._wakeup = asyncio.Event()
+
+    def offer(self, topic: str, generation: int):
+        """Queue (or coalesce) a change; call on the subscriber's event loop."""
+        if self.topics is not None and topic not in self.topics:
+            return
+        previous = self.pending.get(topic)
+        if previous is None or generation > previous["generation"]:
+            self.pending[topic] = {"topic": topic, "generation": generation}
+        self._wakeup.set()
+
+    async def next(self, timeout: float) -> List[Dict[str, Any]]:
+        """The pending messages, oldest first; [] when nothing arrives within `timeout` seconds."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._wakeup.clear()
+        messages, self.pending = sorted(self.pending.values(), key=lambda m: m["generation"]), {}
+        return messages
+
+_lock = threading.Lock()
+_subscribers: Set[Subscriber] = set()
+_published: Dict[str, int] = {}  # topic -> newest generation announced by this worker
+_watcher: Optional[asyncio.Task] = None
+
+def publish(topics: Sequence[str], generation: int):
+    """Announce that `topics` changed at cache generation `generation`; safe from any thread."""
+    with _lock:
+        fresh = [topic for topic in topics if generation > _published.get(topic, 0)]
+        for topic in fresh:
+            _published[topic] = generation
+        subscribers = list(_subscribers)
+    for topic in fresh:
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(subscriber.offer, topic, generation)
+
+cache.on_clear(publish)
+
+async def _watch():
+    """Publish other workers' writes while anyone is listening."""
+    global _watcher
+    seen = await asyncio.to_thread(cache.generation)
+    while True:
+        await asyncio.sleep(settings.LIVE_POLL_SECONDS)
+        with _lock:
+            if not _subscribers:
+                _watcher = None
+                return
+        try:
+            current = await asyncio.to_thread(cache.generation)
+            if current != seen:
+                for topic, generation in (await asyncio.to_thread(cache.changed_topics, seen)).items():
+                    publish([topic], generation)
+                seen = current
+        except sqlite3.Error as e:
+            logger.warning("live watcher could not read the cache generation: %s", e)
+
+def subscribe(topics: Optional[Set[str]] = None) -> Optional[Subscriber]:
+    """A new subscriber (None when settings.LIVE_MAX_CLIENTS are connected); call from the event loop."""
+    global _watcher
+    subscriber = Subscriber(topics)
+    with _lock:
+        if len(_subscribers) >= settings.LIVE_MAX_CLIENTS:
+            return None
+        _subscribers.add(subscriber)
+        if _watcher is None:
+            _watcher = subscriber.loop.create_task(_watch())
+    return subscriber
+
+def unsubscribe(subscriber: Subscriber):
+    with _lock:
+        _subscribers.discard(subscriber)
@@ -0,0 +1,219 @@
+# app/cache.py
+"""
+Response cache shared by every worker process.
+
+Entries live in one local SQLite file (settings.CACHE_PATH, WAL), so a
+dashboard endpoint computed by one gunicorn/uvicorn worker is served from the
+cache by all of them. @cached stores the endpoint's rendered JSON under its
+function and arguments for settings.CACHE_TTL_SECONDS. Any successful
+non-GET request clears the whole cache (invalidation_middleware): writes are
+rare next to dashboard reads, and a clear is one DELETE every worker sees.
+Each clear also bumps generation(), which per-process structures built from
+the data (app.lookups) compare against to know when to rebuild, and records
+the generation against the topics the write touched (WRITE_TOPICS), which is
+what the live update stream (app/bus.py) announces. Changes made outside the
+API (cron imports, scripts) show up within the TTL.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from . import storage
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.path.join(storage.BACKEND_DIR, settings.CACHE_PATH)  # join keeps an absolute setting as is
+
+# Data topics a successful write under each path prefix touches (the longest prefix wins)
+WRITE_TOPICS = {
+    "/api/sales": ["sales"],
+    "/api/tools/process-sales": ["sales"],
+    "/api/tools/process-guests": ["guests"],
+    "/api/tools/process-attrition": ["attrition"],
+    "/api/guests": ["guests"],
+    "/api/kpi": ["kpi"],
+    "/api/employees": ["employees"],
+    "/api/memberships": ["memberships"],
+    "/api/members": ["members"],
+    "/api/events": ["events"],
+    "/api/api-events": ["events"],
+    "/api/first-workouts": ["events"],
+    "/api/thirtyday-reprograms": ["events"],
+    "/api/debug": [],
+    "/api/upload-csv": [],  # stores the file; the process-* tools import it
+}
+
+_local = threading.local()
+_schema_ready = False
+_listeners: List[Callable[[Sequence[str], int], None]] = []
+
+def connect() -> sqlite3.Connection:
+    """This thread's connection to the shared cache database, reused across requests."""
+    global _schema_ready
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = storage.sqlite_connect(CACHE_PATH)
+        if not _schema_ready:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_generation (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO cache_generation (id, value) VALUES (0, 0)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_topics (topic TEXT PRIMARY KEY, generation INTEGER NOT NULL)")
+            conn.commit()
+            _schema_ready = True
+    return conn
+
+def get(key: str) -> Optional[bytes]:
+    row = connect().execute(
+        "SELECT body FROM response_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+    ).fetchone()
+    return row[0] if row else None
+
+def put(key: str, body: bytes, ttl: float):
+    conn = connect()
+    conn.execute(
+        "INSERT OR REPLACE INTO response_cache (key, body, expires_at) VALUES (?, ?, ?)",
+        (key, body, time.time() + ttl),
+    )
+    conn.commit()
+
+def clear(topics: Sequence[str] = ()) -> int:
+    """
+    Drop every entry (expired rows included) for all workers, bump the
+    generation and mark `topics` as changed at it; the new generation.
+    """
+    conn = connect()
+    conn.execute("DELETE FROM response_cache")
+    conn.execute("UPDATE cache_generation SET value = value + 1 WHERE id = 0")
+    value = conn.execute("SELECT value FROM cache_generation WHERE id = 0").fetchone()[0]
+    conn.executemany("INSERT OR REPLACE INTO cache_topics (topic, generation) VALUES (?, ?)",
+                     [(topic, value) for topic in topics])
+    conn.commit()
+    for listener in _listeners:
+        try:
+            listener(topics, value)
+        except Exception:
+            logger.exception("cache clear listener failed")
+    return value
+
+def on_clear(listener: Callable[[Sequence[str], int], None]):
+    """Call listener(topics, generation) in this process after every clear()."""
+    _listeners.append(listener)
+
+def changed_topics(since: int) -> Dict[str, int]:
+    """Topics written after generation `since`, by any worker, with the generation of their last write."""
+    return dict(connect().execute("SELECT topic, generation FROM cache_topics WHERE generation > ?", (since,)).fetchall())
+
+def write_topics(path: str) -> Sequence[str]:
+    """The topics a write to `path` touches; unknown paths touch none."""
+    matches = [prefix for prefix in WRITE_TOPICS if path == prefix or path.startswith(prefix + "/")]
+    return WRITE_TOPICS[max(matches, key=len)] if matches else []
+
+def generation() -> int:
+    """Counter bumped by every clear(), i.e. after every successful write in any worker."""
+    return connect().execute("SELECT value FROM cache_generation WHERE id = 0").fetchone()[0]
+
+def _key(fn: Callable, kwargs: dict) -> str:
+    return f"{fn.__module__}.{fn.__qualname__}:{json.dumps(kwargs, sort_keys=True, default=str)}"
+
+def _render(result: Any) -> Optional[Response]:
+    """The JSONResponse FastAPI would have built, or None when the result should not be cached."""
+    if isinstance(result, Response):
+        return None
+    if isinstance(result, dict) and "error" in result:
+        return None  # endpoints that swallow exceptions report them as {"error": ...}
+    return JSONResponse(jsonable_encoder(result))
+
+def _cached_body(key: str) -> Optional[Response]:
+    try:
+        body = get(key)
+    except sqlite3.Error as e:
+        logger.warning("cache read failed: %s", e)
+        return None
+    return Response(content=body, media_type="application/json") if body is not None else None
+
+def _generation() -> Optional[int]:
+    try:
+        return generation()
+    except sqlite3.Error as e:
+        logger.warning("cache read failed: %s", e)
+        return None
+
+def _store(key: str, result: Any, ttl: float, started: Optional[int]) -> Any:
+    """
+    Cache the rendered result unless a write cleared the cache while it was
+    being computed (started is the generation read before computing): the
+    result may predate that write and would outlive the clear.
+    """
+    response = _render(result)
+    if response is None:
+        return result
+    if started is None:
+        return response
+    try:
+        if generation() == started:
+            put(key, response.body, ttl)
+    except sqlite3.Error as e:
+        logger.warning("cache write failed: %s", e)
+    return response
+
+def cached(ttl: Optional[float] = None):
+    """
+    Cache a GET endpoint's JSON response across workers. Works on sync and async
+    endpoints; FastAPI still sees the original signature. A no-op when
+    settings.CACHE_ENABLED is off.
+    """
+    def decorate(fn: Callable) -> Callable:
+        if not settings.CACHE_ENABLED:
+            return fn
+        seconds = settings.CACHE_TTL_SECONDS if ttl is None else ttl
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                # The cache file is read and written off the event loop, as app.bus does
+                key = _key(fn, kwargs)
+                hit = await asyncio.to_thread(_cached_body, key)
+                if hit is not None:
+                    return hit
+                started = await asyncio.to_thread(_generation)
+                return await asyncio.to_thread(_store, key, await fn(*args, **kwargs), seconds, started)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = _key(fn, kwargs)
+            hit = _cached_body(key)
+            if hit is not None:
+                return hit
+            started = _generation()
+            return _store(key, fn(*args, **kwargs), seconds, started)
+        return wrapper
+    return decorate
+
+async def invalidation_middleware(request, call_next):
+    """Clear the shared cache (and bump its generation) after every successful write."""
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        try:
+            await asyncio.to_thread(clear, write_topics(request.url.path))
+        except sqlite3.Error as e:
+            logger.warning("cache clear failed: %s", e)
+    return response
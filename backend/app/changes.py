@@ -0,0 +1,102 @@
+# app/changes.py
+"""
+The sales change log behind /api/changes.
+
+Every sales mutation appends a row to sales_audit: the CSV import
+(app/scripts/process_sales.py) and the create, update and delete endpoints
+of the sales router, which record the change in the same transaction as the
+write. Replacing the whole table (an import through the API, or undoing
+one; see app/generations.py) is a single "reload" change without a sale_id.
+The audit row's id is the change's sequence number: it only grows, and a
+change becomes visible together with its sale, so a consumer that
+remembers the last sequence it applied and asks for everything after it
+never misses or repeats a change.
+
+On PostgreSQL identity values are handed out before commit, so a later
+number could become visible first; appends serialize on a transaction-level
+advisory lock to keep sequence order and commit order the same.
+"""
+
+import datetime
+import json
+from typing import Any, Dict, List, Optional
+
+from . import schema, storage
+
+TABLE = "sales_audit"
+ACTIONS = ("insert", "update", "delete", "reload")
+_APPEND_LOCK = 0x5A1E5  # pg_advisory_xact_lock key for appends
+
+@schema.migration("sales", 4, "sales_audit change log")
+def create_change_log(conn):
+    # The import creates it too; databases that only ever saw the API get it here
+    if not storage.is_sqlite():
+        return
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_id TEXT,
+            action TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            old_data TEXT,
+            new_data TEXT
+        )
+    ''')
+
+def _dump(row: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(row, default=str) if row is not None else ''
+
+def record(conn, sale_id: Any, action: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+    """Append one change inside the caller's transaction (see app.db.transaction)."""
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown change action {action}")
+    if not storage.is_sqlite():
+        conn.execute("SELECT pg_advisory_xact_lock(?)", (_APPEND_LOCK,))
+    # Explicit timestamp: the migrated PostgreSQL table has no column default
+    now = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute(
+        f"INSERT INTO {TABLE} (sale_id, action, timestamp, old_data, new_data) VALUES (?, ?, ?, ?, ?)",
+        (sale_id, action, now, _dump(old), _dump(new)),
+    )
+
+def _load(text: Optional[str]) -> Any:
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def latest() -> int:
+    """Sequence number of the newest change (0 before the first)."""
+    rows = storage.query("sales", f"SELECT MAX(id) AS seq FROM {TABLE}")
+    return rows[0]["seq"] or 0
+
+def since(seq: int, limit: int) -> List[Dict[str, Any]]:
+    """
+    Up to `limit` changes after `seq`, oldest first, each with the sale as it
+    is now (None once deleted), so a consumer can apply the current row
+    instead of replaying the recorded ones.
+    """
+    rows = storage.query("sales", f"""
+        SELECT a.id AS seq, a.sale_id, a.action, a.timestamp, a.old_data, a.new_data
+        FROM {TABLE} AS a
+        WHERE a.id > ?
+        ORDER BY a.id
+        LIMIT ?
+    """, (seq, limit))
+    ids = sorted({r["sale_id"] for r in rows if r["sale_id"] is not None})
+    current: Dict[Any, Dict[str, Any]] = {}
+    if ids:
+        current = {s["sale_id"]: s for s in storage.query(
+            "sales", f"SELECT * FROM sales WHERE sale_id IN ({', '.join('?' for _ in ids)})", tuple(ids)
+        )}
+    return [{
+        "seq": r["seq"],
+        "sale_id": r["sale_id"],
+        "action": r["action"],
+        "timestamp": r["timestamp"],
+        "old": _load(r["old_data"]),
+        "new": _load(r["new_data"]),
+        "sale": current.get(r["sale_id"]),
+    } for r in rows]
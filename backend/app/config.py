@@ -5,6 +5,52 @@ class Settings(BaseSettings):
     APP_ID: str
     APP_KEY: str
     DATABASE_URL: Optional[str] = None
+    # Connection pool for DATABASE_URL (shared by every request in a worker)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Single SQLite file built by app/scripts/consolidate_dbs.py; unset keeps the per-domain files
+    UNIFIED_DB_PATH: Optional[str] = None
+    # Every SQLite connection (app.storage.sqlite_connect): WAL journal, busy wait, synchronous level
+    SQLITE_WAL: bool = True
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    # Cross-worker response cache (app/cache.py) and single-runner job leases (app/jobs.py)
+    CACHE_ENABLED: bool = True
+    CACHE_PATH: str = "cache.db"
+    CACHE_TTL_SECONDS: int = 30
+    JOB_LEASE_SECONDS: int = 1800
+    # Threads per SQLite file for the async query helpers in app.db
+    DB_EXECUTOR_WORKERS: int = 4
+    # Threads reserved for long analytic endpoints (member tracker, EFT counts)
+    ANALYTIC_EXECUTOR_WORKERS: int = 2
+    # Request/query timing (app/perf.py); statements slower than PERF_SLOW_QUERY_MS are logged
+    PERF_ENABLED: bool = True
+    PERF_SLOW_QUERY_MS: int = 250
+    PERF_SLOW_QUERY_LOG: Optional[str] = "slow_queries.log"
+    # Logging (app/logs.py): root level, per-module overrides ("app.routers.sales=DEBUG,app.perf=WARNING"),
+    # "text" or "json" lines, optional file, and 1-in-N sampling for per-row debug traces
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""
+    LOG_FORMAT: str = "text"
+    LOG_FILE: Optional[str] = None
+    LOG_SAMPLE_EVERY: int = 100
+    # Background warm-up after startup (app/warmup.py): open connections, build the lookup indexes,
+    # cache the dashboard responses (readiness waits for these), then preload pandas/requests
+    WARMUP_ENABLED: bool = True
+    WARMUP_PREFETCH_MB: int = 256  # SQLite bytes read into the OS page cache at boot
+    WARMUP_DASHBOARD: bool = True
+    # Live update stream (app/bus.py, /api/live): how often a worker with clients looks for other
+    # workers' writes, the keep-alive comment interval and the connection limit per worker
+    LIVE_POLL_SECONDS: float = 1.0
+    LIVE_HEARTBEAT_SECONDS: int = 25
+    LIVE_MAX_CLIENTS: int = 200
+    # Sales tables kept from before the latest CSV imports, for /api/sales/undo-import (app/generations.py)
+    SALES_IMPORT_GENERATIONS: int = 3
+    # Append every dashboard GET to this JSONL file for benchmarks/loadtest.py (app/recording.py)
+    RECORD_SESSION: Optional[str] = None
 
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -3,24 +3,33 @@
 import os
 import shutil
 import sqlite3
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from datetime import datetime
 from fastapi import HTTPException
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator, Optional
 import json
+import logging
 from .config import settings
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-
-# Fix database paths to point to the correct location in backend/
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "sales_data.db")
-EMPLOYEES_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "employees.db")
-KPI_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "clubKPI.db")
-MEMBERSHIPS_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "memberships.db")
-GUESTS_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "guests.db")
-FIRST_WORKOUTS_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "firstWorkouts.db")
-MEMBERS_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "members.db")
-API_EVENTS_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "apiEvents.db")
-STRUCTURED_EVENTS_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "structured_events.db")
+from . import schema, storage
+
+logger = logging.getLogger(__name__)
+
+# Database paths resolve through app.storage: the per-domain files, or the
+# unified database for every domain once UNIFIED_DB_PATH is configured
+DB_PATH = storage.path_for("sales")
+EMPLOYEES_DB_PATH = storage.path_for("employees")
+KPI_DB_PATH = storage.path_for("kpi")
+MEMBERSHIPS_DB_PATH = storage.path_for("memberships")
+GUESTS_DB_PATH = storage.path_for("guests")
+FIRST_WORKOUTS_DB_PATH = storage.path_for("first_workouts")
+MEMBERS_DB_PATH = storage.path_for("members")
+API_EVENTS_DB_PATH = storage.path_for("api_events")
+STRUCTURED_EVENTS_DB_PATH = storage.path_for("structured_events")
 
 # Directory where backups will be stored
 BACKUP_DIR = "db_backups"
@@ -30,17 +39,17 @@ MEMBERS_TABLE = "members"
 API_EVENTS_TABLE = "api_events"
 
 # --- Database Engine Setup ---
-engine = None
+# The pooled engine lives in app.storage; sessions share its pool.
+engine = storage.engine
 SessionLocal = None
-
-# If DATABASE_URL is set in the environment, use PostgreSQL for production.
-if settings.DATABASE_URL:
-    print("INFO:     DATABASE_URL found, connecting to PostgreSQL.")
-    engine = create_engine(settings.DATABASE_URL)
+if engine is not None:
+    from sqlalchemy.orm import sessionmaker
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-# Otherwise, we continue with the assumption of using local SQLite files.
+
+if engine is not None:
+    logger.info("DATABASE_URL found, connecting to PostgreSQL.")
 else:
-    print("INFO:     No DATABASE_URL found, falling back to local SQLite files.")
+    logger.info("No DATABASE_URL found, falling back to local SQLite files.")
 
 def _ensure_backup_dir():
     """Create the backup directory if it does not exist."""
@@ -65,124 +74,262 @@ def _daily_backup(path: str):
 def _connect(path: str) -> sqlite3.Connection:
     """
     Ensure the file exists, then open a connection. 
-    If connecting to the main sales_data.db, perform a daily backup.
+    If connecting to the main sales_data.db, perform a daily backup
+    (legacy per-domain files only).
     """
     if not os.path.exists(path):
         raise HTTPException(status_code=404, detail=f"Database not found at {path}")
 
-    # For the primary DB (sales_data), we make a daily backup
-    if path == DB_PATH:
+    # For the primary DB (sales_data), we make a daily backup. In the unified
+    # layout every domain shares this path and a copy would be the whole database.
+    if path == DB_PATH and not storage.is_unified():
         _daily_backup(path)
 
-    conn = sqlite3.connect(path)
+    conn = storage.sqlite_connect(path)
     conn.row_factory = sqlite3.Row
     return conn
 
-def query_db(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
-    """
-    Run a SELECT (or other read) on sales_data.db and return a list of dicts.
-    """
-    conn = _connect(DB_PATH)
+def _open(domain: str):
+    """Connection for a storage domain: the SQLite file (with backups) or the pooled PostgreSQL database."""
+    if storage.is_sqlite():
+        return _connect(storage.path_for(domain))
+    return storage.connect(domain)
+
+def _query(domain: str, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    conn = _open(domain)
     cur = conn.cursor()
     cur.execute(query, params)
     rows = [dict(r) for r in cur.fetchall()]
     conn.close()
     return rows
 
+def _execute(domain: str, query: str, params: tuple = ()) -> None:
+    conn = _open(domain)
+    cur = conn.cursor()
+    cur.execute(query, params)
+    conn.commit()
+    conn.close()
+
+@contextmanager
+def transaction(domain: str) -> Iterator[Any]:
+    """
+    One connection for a batch of writes (KPI goals, employees, memberships),
+    committed together when the block ends and rolled back entirely if
+    anything in it raises. On SQLite the write lock is taken up front, so
+    reads in the block see the rows the writes will change.
+    """
+    conn = _open(domain)
+    try:
+        if storage.is_sqlite():
+            conn.execute("BEGIN IMMEDIATE")
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def query_db(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    """
+    Run a SELECT (or other read) on sales_data.db and return a list of dicts.
+    """
+    return _query("sales", query, params)
+
 def execute_db(query: str, params: tuple = ()) -> None:
     """
     Run INSERT/UPDATE/DELETE on sales_data.db. A daily backup is made
     automatically (in _connect) before this write if one doesn't exist for today.
     """
-    conn = _connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(query, params)
-    conn.commit()
-    conn.close()
+    _execute("sales", query, params)
 
 def query_employees(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
-    conn = _connect(EMPLOYEES_DB_PATH)
-    cur = conn.cursor()
-    cur.execute(query, params)
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    return _query("employees", query, params)
 
 def execute_employees(query: str, params: tuple = ()) -> None:
-    conn = _connect(EMPLOYEES_DB_PATH)
-    cur = conn.cursor()
-    cur.execute(query, params)
-    conn.commit()
-    conn.close()
+    _execute("employees", query, params)
 
 def query_kpi(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
-    conn = _connect(KPI_DB_PATH)
-    cur = conn.cursor()
-    cur.execute(query, params)
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    return _query("kpi", query, params)
 
 def execute_kpi(query: str, params: tuple = ()) -> None:
-    conn = _connect(KPI_DB_PATH)
-    cur = conn.cursor()
-    cur.execute(query, params)
-    conn.commit()
-    conn.close()
+    _execute("kpi", query, params)
 
 def query_memberships(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
-    conn = _connect(MEMBERSHIPS_DB_PATH)
-    cur = conn.cursor()
-    cur.execute(query, params)
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    return _query("memberships", query, params)
 
 def execute_memberships(query: str, params: tuple = ()) -> None:
-    conn = _connect(MEMBERSHIPS_DB_PATH)
-    cur = conn.cursor()
-    cur.execute(query, params)
-    conn.commit()
-    conn.close()
+    _execute("memberships", query, params)
 
 def query_guests(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
-    conn = _connect(GUESTS_DB_PATH)
-    cur = conn.cursor()
-    cur.execute(query, params)
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    return _query("guests", query, params)
 
 def query_first_workouts(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
-    conn = _connect(FIRST_WORKOUTS_DB_PATH)
-    cur = conn.cursor()
-    cur.execute(query, params)
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    return _query("first_workouts", query, params)
 
 def execute_first_workouts(query: str, params: tuple = ()) -> None:
-    conn = _connect(FIRST_WORKOUTS_DB_PATH)
-    cur = conn.cursor()
-    cur.execute(query, params)
-    conn.commit()
-    conn.close()
+    _execute("first_workouts", query, params)
 
 def query_structured_events(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
     """
     Run a SELECT on structured_events.db and return a list of dicts.
     """
-    conn = _connect(STRUCTURED_EVENTS_DB_PATH)
-    cur = conn.cursor()
+    return _query("structured_events", query, params)
+
+# Columns projected out of event_json by SQLite JSON1 so date-range reads can use an
+# index instead of decoding every stored event. VIRTUAL columns can be added with
+# ALTER TABLE, so existing databases pick them up without a rebuild.
+EVENT_JSON_COLUMNS = {
+    "eventTimestamp": "json_extract(event_json, '$.eventTimestamp')",
+    "eventName": "json_extract(event_json, '$.eventName')",
+    "status": "json_extract(event_json, '$.status')",
+    "employee": "TRIM(COALESCE(json_extract(event_json, '$.employeeFirstName'), '') || ' ' || "
+                "COALESCE(json_extract(event_json, '$.employeeLastName'), ''))",
+}
+
+# The same projections as STORED generated columns on PostgreSQL (migrate.py creates them)
+PG_EVENT_JSON_COLUMNS = {
+    "eventTimestamp": "(event_json::jsonb ->> 'eventTimestamp')",
+    "eventName": "(event_json::jsonb ->> 'eventName')",
+    "status": "(event_json::jsonb ->> 'status')",
+    "employee": "TRIM(COALESCE(event_json::jsonb ->> 'employeeFirstName', '') || ' ' || "
+                "COALESCE(event_json::jsonb ->> 'employeeLastName', ''))",
+}
+
+# --- Async access ---
+# Every SQLite file gets its own small executor so a slow query on one database
+# cannot occupy the threads that cheap lookups on another database need. Long
+# analytic endpoints run on the analytic executor, which is bounded separately
+# so they queue behind each other instead of starving the rest of the API.
+# All of them are created on first use, so a restarted app gets fresh ones.
+_DB_EXECUTORS: Dict[str, ThreadPoolExecutor] = {}
+_DB_EXECUTORS_LOCK = threading.Lock()
+_ANALYTIC_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+def _executor_for(path: str) -> ThreadPoolExecutor:
+    executor = _DB_EXECUTORS.get(path)
+    if executor is None:
+        with _DB_EXECUTORS_LOCK:
+            executor = _DB_EXECUTORS.get(path)
+            if executor is None:
+                name = os.path.splitext(os.path.basename(path))[0]
+                executor = ThreadPoolExecutor(
+                    max_workers=settings.DB_EXECUTOR_WORKERS, thread_name_prefix=f"db-{name}"
+                )
+                _DB_EXECUTORS[path] = executor
+    return executor
+
+def _analytic_executor() -> ThreadPoolExecutor:
+    global _ANALYTIC_EXECUTOR
+    executor = _ANALYTIC_EXECUTOR
+    if executor is None:
+        with _DB_EXECUTORS_LOCK:
+            if _ANALYTIC_EXECUTOR is None:
+                _ANALYTIC_EXECUTOR = ThreadPoolExecutor(
+                    max_workers=settings.ANALYTIC_EXECUTOR_WORKERS, thread_name_prefix="db-analytic"
+                )
+            executor = _ANALYTIC_EXECUTOR
+    return executor
+
+async def run_in_db(path: str, fn: Callable, *args, **kwargs):
+    """Run a blocking call against the SQLite file at path on that file's executor."""
+    loop = asyncio.get_running_loop()
+    # run_in_executor does not carry context variables over (perf.current_request)
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor_for(path), context.run, partial(fn, *args, **kwargs))
+
+async def run_analytic(fn: Callable, *args, **kwargs):
+    """Run a long, blocking analytic computation on the bounded analytic executor."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_analytic_executor(), context.run, partial(fn, *args, **kwargs))
+
+async def aquery_db(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    return await run_in_db(DB_PATH, query_db, query, params)
+
+async def aexecute_db(query: str, params: tuple = ()) -> None:
+    return await run_in_db(DB_PATH, execute_db, query, params)
+
+async def aquery_employees(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    return await run_in_db(EMPLOYEES_DB_PATH, query_employees, query, params)
+
+async def aexecute_employees(query: str, params: tuple = ()) -> None:
+    return await run_in_db(EMPLOYEES_DB_PATH, execute_employees, query, params)
+
+async def aquery_kpi(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    return await run_in_db(KPI_DB_PATH, query_kpi, query, params)
+
+async def aexecute_kpi(query: str, params: tuple = ()) -> None:
+    return await run_in_db(KPI_DB_PATH, execute_kpi, query, params)
+
+async def aquery_memberships(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    return await run_in_db(MEMBERSHIPS_DB_PATH, query_memberships, query, params)
+
+async def aexecute_memberships(query: str, params: tuple = ()) -> None:
+    return await run_in_db(MEMBERSHIPS_DB_PATH, execute_memberships, query, params)
+
+async def aquery_guests(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    return await run_in_db(GUESTS_DB_PATH, query_guests, query, params)
+
+async def aquery_first_workouts(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    return await run_in_db(FIRST_WORKOUTS_DB_PATH, query_first_workouts, query, params)
+
+async def aexecute_first_workouts(query: str, params: tuple = ()) -> None:
+    return await run_in_db(FIRST_WORKOUTS_DB_PATH, execute_first_workouts, query, params)
+
+async def aquery_structured_events(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    return await run_in_db(STRUCTURED_EVENTS_DB_PATH, query_structured_events, query, params)
+
+def shutdown_executors():
+    """Stop the async helper threads; called from the app shutdown hook."""
+    global _ANALYTIC_EXECUTOR
+    with _DB_EXECUTORS_LOCK:
+        if _ANALYTIC_EXECUTOR is not None:
+            _ANALYTIC_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+            _ANALYTIC_EXECUTOR = None
+        for executor in _DB_EXECUTORS.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        _DB_EXECUTORS.clear()
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with prefix, so a prefix filter becomes an index range."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def _ensure_event_json_columns(cur, table: str):
+    existing = {row[1] for row in cur.execute(f"PRAGMA table_xinfo({table})").fetchall()}
+    for column, expr in EVENT_JSON_COLUMNS.items():
+        if column not in existing:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT GENERATED ALWAYS AS ({expr}) VIRTUAL")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_eventTimestamp ON {table} (eventTimestamp)")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_eventName_status ON {table} (eventName, status)")
+
+def _select_event_json(cur: sqlite3.Cursor, table: str, start_date=None, end_date=None, event_name=None, status=None):
+    """
+    Read event_json rows filtered on the generated columns. start_date/end_date are
+    inclusive YYYY-MM-DD bounds on eventTimestamp; only matching rows are decoded.
+    """
+    query = f"SELECT event_json FROM {table}"
+    filters, params = [], []
+    if start_date:
+        filters.append("eventTimestamp >= ?")
+        params.append(start_date)
+    if end_date:
+        filters.append("eventTimestamp < ?")
+        params.append(prefix_upper_bound(end_date))
+    if event_name:
+        filters.append("eventName = ?")
+        params.append(event_name)
+    if status:
+        filters.append("status = ?")
+        params.append(status)
+    if filters:
+        query += " WHERE " + " AND ".join(filters)
     cur.execute(query, params)
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
-
-def ensure_abc_events_table():
-    conn = _connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(f'''
+    return [json.loads(row[0]) for row in cur.fetchall()]
+
+@schema.migration("sales", 1, "abc_events table with indexed JSON columns")
+def create_abc_events_table(conn):
+    # SQLite DDL (AUTOINCREMENT, JSON1 generated columns); PostgreSQL tables come from the migrator
+    if not storage.is_sqlite():
+        return
+    conn.execute(f'''
         CREATE TABLE IF NOT EXISTS {ABC_EVENTS_TABLE} (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             eventId TEXT,
@@ -190,34 +337,31 @@ def ensure_abc_events_table():
             fetched_at TEXT
         )
     ''')
-    conn.commit()
-    conn.close()
+    _ensure_event_json_columns(conn, ABC_EVENTS_TABLE)
 
 def insert_abc_events(events: list):
-    ensure_abc_events_table()
-    conn = _connect(DB_PATH)
+    schema.ensure("sales")
+    conn = _open("sales")
     cur = conn.cursor()
     now = datetime.now().isoformat()
     for event in events:
         event_id = event.get("eventId")
-        cur.execute(f"INSERT OR REPLACE INTO {ABC_EVENTS_TABLE} (eventId, event_json, fetched_at) VALUES (?, ?, ?)",
+        cur.execute(f"INSERT INTO {ABC_EVENTS_TABLE} (eventId, event_json, fetched_at) VALUES (?, ?, ?)",
                     (event_id, json.dumps(event), now))
     conn.commit()
     conn.close()
 
-def get_abc_events():
-    ensure_abc_events_table()
-    conn = _connect(DB_PATH)
+def get_abc_events(start_date=None, end_date=None, event_name=None, status=None):
+    schema.ensure("sales")
+    conn = _open("sales")
     cur = conn.cursor()
-    cur.execute(f"SELECT event_json FROM {ABC_EVENTS_TABLE}")
-    rows = cur.fetchall()
+    events = _select_event_json(cur, ABC_EVENTS_TABLE, start_date, end_date, event_name, status)
     conn.close()
-    return [json.loads(row[0]) for row in rows]
+    return events
 
-def ensure_members_table():
-    conn = sqlite3.connect(MEMBERS_DB_PATH)
-    cur = conn.cursor()
-    cur.execute(f'''
+@schema.migration("members", 1, "members table")
+def create_members_table(conn):
+    conn.execute(f'''
         CREATE TABLE IF NOT EXISTS {MEMBERS_TABLE} (
             memberId TEXT PRIMARY KEY,
             firstName TEXT,
@@ -233,18 +377,17 @@ def ensure_members_table():
             salesPersonName TEXT
         )
     ''')
-    conn.commit()
-    conn.close()
 
 def insert_members(members: list):
-    ensure_members_table()
-    conn = sqlite3.connect(MEMBERS_DB_PATH)
+    schema.ensure("members")
+    conn = _open("members")
     cur = conn.cursor()
     for m in members:
         cur.execute(f'''
-            INSERT OR IGNORE INTO {MEMBERS_TABLE} (
+            INSERT INTO {MEMBERS_TABLE} (
                 memberId, firstName, lastName, email, primaryPhone, agreementNumber, membershipType, totalCheckInCount, firstCheckInTimestamp, lastCheckInTimestamp, sinceDate, salesPersonName
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (memberId) DO NOTHING
         ''', (
             m.get("memberId", ""),
             m.get("personal", {}).get("firstName", ""),
@@ -263,8 +406,8 @@ def insert_members(members: list):
     conn.close()
 
 def get_members():
-    ensure_members_table()
-    conn = sqlite3.connect(MEMBERS_DB_PATH)
+    schema.ensure("members")
+    conn = _open("members")
     cur = conn.cursor()
     cur.execute(f"SELECT * FROM {MEMBERS_TABLE}")
     rows = [dict(zip([column[0] for column in cur.description], row)) for row in cur.fetchall()]
@@ -272,16 +415,16 @@ def get_members():
     return rows
 
 def get_members_paginated(page=1, page_size=50, sort_by="memberId", sort_order="asc", name=None, email=None, status=None):
-    ensure_members_table()
+    schema.ensure("members")
     offset = (page - 1) * page_size
     query = f"SELECT * FROM {MEMBERS_TABLE}"
     filters = []
     params = []
     if name:
-        filters.append("(firstName LIKE ? OR lastName LIKE ?)")
+        filters.append(f"(firstName {storage.like()} ? OR lastName {storage.like()} ?)")
         params.extend([f"%{name}%", f"%{name}%"])
     if email:
-        filters.append("email LIKE ?")
+        filters.append(f"email {storage.like()} ?")
         params.append(f"%{email}%")
     # Add more filters as needed
     if filters:
@@ -289,7 +432,7 @@ def get_members_paginated(page=1, page_size=50, sort_by="memberId", sort_order="
     query += f" ORDER BY {sort_by} {sort_order.upper()}"
     query += " LIMIT ? OFFSET ?"
     params.extend([page_size, offset])
-    conn = sqlite3.connect(MEMBERS_DB_PATH)
+    conn = _open("members")
     cur = conn.cursor()
     cur.execute(query, params)
     rows = [dict(zip([column[0] for column in cur.description], row)) for row in cur.fetchall()]
@@ -305,75 +448,157 @@ def get_members_paginated(page=1, page_size=50, sort_by="memberId", sort_order="
     return {"members": rows, "total": total}
 
 def search_members(query, page=1, page_size=50):
-    ensure_members_table()
+    schema.ensure("members")
     offset = (page - 1) * page_size
-    sql = f"SELECT * FROM {MEMBERS_TABLE} WHERE firstName LIKE ? OR lastName LIKE ? OR email LIKE ?"
+    like = storage.like()
+    match = f"firstName {like} ? OR lastName {like} ? OR email {like} ?"
+    sql = f"SELECT * FROM {MEMBERS_TABLE} WHERE {match}"
     params = [f"%{query}%", f"%{query}%", f"%{query}%"]
     sql += " LIMIT ? OFFSET ?"
     params.extend([page_size, offset])
-    conn = sqlite3.connect(MEMBERS_DB_PATH)
+    conn = _open("members")
     cur = conn.cursor()
     cur.execute(sql, params)
     rows = [dict(zip([column[0] for column in cur.description], row)) for row in cur.fetchall()]
     # Get total count for pagination
-    count_sql = f"SELECT COUNT(*) FROM {MEMBERS_TABLE} WHERE firstName LIKE ? OR lastName LIKE ? OR email LIKE ?"
+    count_sql = f"SELECT COUNT(*) FROM {MEMBERS_TABLE} WHERE {match}"
     count_cur = conn.cursor()
     count_cur.execute(count_sql, params[:-2])
     total = count_cur.fetchone()[0]
     conn.close()
     return {"members": rows, "total": total}
 
-def ensure_api_events_table():
-    conn = sqlite3.connect(API_EVENTS_DB_PATH)
-    cur = conn.cursor()
-    cur.execute(f'''
+@schema.migration("api_events", 1, "api_events table with indexed JSON columns")
+def create_api_events_table(conn):
+    if not storage.is_sqlite():
+        return
+    conn.execute(f'''
         CREATE TABLE IF NOT EXISTS {API_EVENTS_TABLE} (
             eventId TEXT PRIMARY KEY,
             event_json TEXT,
             fetched_at TEXT
         )
     ''')
-    conn.commit()
-    conn.close()
+    _ensure_event_json_columns(conn, API_EVENTS_TABLE)
 
 def insert_api_events(events: list):
-    ensure_api_events_table()
-    conn = sqlite3.connect(API_EVENTS_DB_PATH)
+    schema.ensure("api_events")
+    conn = _open("api_events")
     cur = conn.cursor()
     now = datetime.now().isoformat()
     for event in events:
         event_id = event.get("eventId")
-        cur.execute(f"INSERT OR REPLACE INTO {API_EVENTS_TABLE} (eventId, event_json, fetched_at) VALUES (?, ?, ?)",
+        cur.execute(f"""
+            INSERT INTO {API_EVENTS_TABLE} (eventId, event_json, fetched_at) VALUES (?, ?, ?)
+            ON CONFLICT (eventId) DO UPDATE SET event_json = excluded.event_json, fetched_at = excluded.fetched_at
+        """,
                     (event_id, json.dumps(event), now))
     conn.commit()
     conn.close()
 
-def get_api_events():
-    ensure_api_events_table()
-    conn = sqlite3.connect(API_EVENTS_DB_PATH)
+def get_api_events(start_date=None, end_date=None, event_name=None, status=None):
+    schema.ensure("api_events")
+    conn = _open("api_events")
     cur = conn.cursor()
-    cur.execute(f"SELECT event_json FROM {API_EVENTS_TABLE}")
-    rows = cur.fetchall()
+    events = _select_event_json(cur, API_EVENTS_TABLE, start_date, end_date, event_name, status)
     conn.close()
-    return [json.loads(row[0]) for row in rows]
+    return events
+
+def dedupe_event_members(conn: sqlite3.Connection) -> int:
+    """
+    Collapse duplicate (eventId, memberId) links left behind by older re-fetches,
+    keeping the earliest row of each pair. Returns the number of rows removed.
+    """
+    cur = conn.execute("""
+        DELETE FROM event_members
+        WHERE event_member_id NOT IN (
+            SELECT MIN(event_member_id) FROM event_members GROUP BY eventId, memberId
+        )
+    """)
+    return cur.rowcount
+
+def _ensure_event_members_unique(conn):
+    """Create the (eventId, memberId) unique index that the event_members upsert relies on."""
+    if not storage.is_sqlite():
+        return  # created with the PostgreSQL schema
+    try:
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_event_members_event_member ON event_members (eventId, memberId)")
+    except sqlite3.IntegrityError:
+        removed = dedupe_event_members(conn)
+        logger.info("Removed %d duplicate event_members rows before adding unique index.", removed)
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_event_members_event_member ON event_members (eventId, memberId)")
+
+@schema.migration("structured_events", 1, "event date index, member lookup index, unique member links")
+def index_structured_events(conn):
+    """
+    Index structured_events.db for date-range reads and the member lookup join,
+    and enforce one event_members row per (eventId, memberId).
+    Deferred until the migration script has created the tables.
+    """
+    if not schema.table_exists(conn, "events"):
+        return False
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_eventTimestamp ON events (eventTimestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_event_members_eventId ON event_members (eventId)")
+    _ensure_event_members_unique(conn)
 
-def insert_structured_events(events: list):
+def get_structured_events(start_date=None, end_date=None, page=1, page_size=0):
     """
-    Insert a list of events into structured_events.db, populating both the events and event_members tables.
-    Mirrors the logic of insert_api_events but for the new schema.
+    Return events from structured_events.db with their members attached, newest first.
+    Uses one connection and two queries regardless of how many events match:
+    the page of events, then every member of that page via a join on the same page.
+    page_size=0 returns every matching event.
     """
-    conn = _connect(STRUCTURED_EVENTS_DB_PATH)
+    where, params = "", []
+    filters = []
+    if start_date:
+        filters.append("eventTimestamp >= ?")
+        params.append(start_date)
+    if end_date:
+        filters.append("eventTimestamp < ?")
+        params.append(prefix_upper_bound(end_date))
+    if filters:
+        where = " WHERE " + " AND ".join(filters)
+    page_query = f"SELECT * FROM events{where} ORDER BY eventTimestamp DESC, eventId"
+    if page_size:
+        page_query += " LIMIT ? OFFSET ?"
+        params.extend([page_size, (page - 1) * page_size])
+
+    conn = _open("structured_events")
     cur = conn.cursor()
+    cur.execute(page_query, params)
+    events = [dict(r) for r in cur.fetchall()]
+    by_id = {}
+    for event in events:
+        event["members"] = []
+        by_id[event["eventId"]] = event
+    if events:
+        cur.execute(f"""
+            SELECT em.eventId, em.memberId, em.firstName, em.lastName
+            FROM event_members AS em
+            JOIN ({page_query}) AS page ON page.eventId = em.eventId
+            ORDER BY em.event_member_id
+        """, params)
+        for row in cur.fetchall():
+            member = dict(row)
+            by_id[member.pop("eventId")]["members"].append(member)
+    conn.close()
+    return events
+
+def insert_structured_events(events: list) -> Dict[str, int]:
+    """
+    Upsert a list of events into structured_events.db, populating both the events and event_members tables.
+    Re-running with the same payload is a no-op: events are keyed on eventId, member links on
+    (eventId, memberId), and links no longer present in an event's member list are deleted.
+    """
+    schema.ensure("structured_events")
+    conn = _open("structured_events")
+    cur = conn.cursor()
+    event_rows, member_rows, synced = [], [], []
     for event in events:
         event_id = event.get("eventId")
         if not event_id:
             continue
-        # Insert into events table
-        cur.execute('''
-            INSERT OR REPLACE INTO events (
-                eventId, eventName, eventTimestamp, status, employeeFirstName, employeeLastName, clubId
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        event_rows.append((
             event_id,
             event.get('eventName'),
             event.get('eventTimestamp'),
@@ -382,21 +607,48 @@ def insert_structured_events(events: list):
             event.get('employeeLastName'),
             event.get('clubId')
         ))
-        # Insert into event_members table
         if 'members' in event and isinstance(event['members'], list):
+            member_ids = []
             for member in event['members']:
-                cur.execute('''
-                    INSERT INTO event_members (
-                        eventId, memberId, firstName, lastName
-                    ) VALUES (?, ?, ?, ?)
-                ''', (
-                    event_id,
-                    member.get('memberId'),
-                    member.get('firstName'),
-                    member.get('lastName')
-                ))
+                member_id = member.get('memberId')
+                if not member_id:
+                    continue
+                member_ids.append(member_id)
+                member_rows.append((event_id, member_id, member.get('firstName'), member.get('lastName')))
+            synced.append((event_id, member_ids))
+
+    cur.executemany('''
+        INSERT INTO events (
+            eventId, eventName, eventTimestamp, status, employeeFirstName, employeeLastName, clubId
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(eventId) DO UPDATE SET
+            eventName = excluded.eventName,
+            eventTimestamp = excluded.eventTimestamp,
+            status = excluded.status,
+            employeeFirstName = excluded.employeeFirstName,
+            employeeLastName = excluded.employeeLastName,
+            clubId = excluded.clubId
+    ''', event_rows)
+    cur.executemany('''
+        INSERT INTO event_members (eventId, memberId, firstName, lastName) VALUES (?, ?, ?, ?)
+        ON CONFLICT(eventId, memberId) DO UPDATE SET
+            firstName = excluded.firstName,
+            lastName = excluded.lastName
+    ''', member_rows)
+
+    # Drop links for members that ABC no longer lists on the event
+    removed = 0
+    for event_id, member_ids in synced:
+        placeholders = ",".join("?" for _ in member_ids)
+        if member_ids:
+            cur.execute(f"DELETE FROM event_members WHERE eventId = ? AND (memberId IS NULL OR memberId NOT IN ({placeholders}))",
+                        (event_id, *member_ids))
+        else:
+            cur.execute("DELETE FROM event_members WHERE eventId = ?", (event_id,))
+        removed += cur.rowcount
     conn.commit()
     conn.close()
+    return {"events": len(event_rows), "member_links": len(member_rows), "member_links_removed": removed}
 
 def get_db_session():
     """
@@ -410,15 +662,3 @@ def get_db_session():
         yield db
     finally:
         db.close()
-
-def _connect_sqlite(path: str) -> sqlite3.Connection:
-    """
-    Connect to a SQLite database file and return the connection.
-    Used for local development with SQLite files.
-    """
-    if not os.path.exists(path):
-        raise HTTPException(status_code=404, detail=f"Database not found at {path}")
-    
-    conn = sqlite3.connect(path)
-    conn.row_factory = sqlite3.Row
-    return conn
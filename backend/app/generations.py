@@ -0,0 +1,205 @@
+# app/generations.py
+"""
+Sales import generations behind /api/sales/import-csv and undo-import.
+
+An import never rewrites the live sales table. It loads the CSV into a new
+table sales_g<n> beside it, with the same columns and indexes, and then
+swaps the two in one short transaction: sales is renamed to
+sales_g<previous> and sales_g<n> to sales. Undo swaps back the same way, so
+both cost a couple of renames whatever the row count, and readers always
+see one complete table: a query running during the swap finishes on the
+table it started on (the SQLite WAL snapshot, the PostgreSQL table lock).
+
+sales_generations records every generation and which one is live. The
+settings.SALES_IMPORT_GENERATIONS generations before the live one are kept
+for undo and older ones are dropped after each import, as are generations
+that were undone and then replaced by a new import.
+"""
+
+import datetime
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import changes, schema, storage
+from .config import settings
+from .db import transaction
+
+TABLE = "sales_generations"
+LIVE = "sales"
+
+# Where imports kept the one table undo could restore before there were generations
+LEGACY_BACKUP_PATH = storage.legacy_path("sales").replace(".db", "_backup.db")
+LEGACY_BACKUP_TABLE = "sales_import_backup"
+
+@schema.migration("sales", 5, "sales import generations")
+def create_generations(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            generation INTEGER PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            row_count INTEGER,
+            source TEXT,
+            live INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    if conn.execute(f"SELECT 1 FROM {TABLE}").fetchone() is None and _adopt_legacy_backup(conn):
+        # An import made before the upgrade stays undoable
+        conn.execute(f"INSERT INTO {TABLE} (generation, created_at, live) VALUES (0, ?, 0), (1, ?, 1)", (_now(), _now()))
+
+def _adopt_legacy_backup(conn) -> bool:
+    """Turn the pre-generation undo copy of sales, if any, into table sales_g0; whether there was one."""
+    target = table_name(0)
+    if not storage.is_sqlite():
+        if not schema.table_exists(conn, LEGACY_BACKUP_TABLE):
+            return False
+        conn.execute(f'ALTER TABLE {LEGACY_BACKUP_TABLE} RENAME TO "{target}"')
+        return True
+    if not os.path.exists(LEGACY_BACKUP_PATH):
+        return False
+    conn.commit()
+    conn.execute("ATTACH DATABASE ? AS legacy_backup", (LEGACY_BACKUP_PATH,))
+    try:
+        kept = {row[1] for row in conn.execute("PRAGMA legacy_backup.table_info(sales)").fetchall()}
+        columns = ", ".join(f'"{row[1]}"' for row in conn.execute(f"PRAGMA table_info({LIVE})").fetchall() if row[1] in kept)
+        if not columns:
+            return False
+        _create_like_live(conn, target)
+        conn.execute(f'INSERT INTO "{target}" ({columns}) SELECT {columns} FROM legacy_backup.sales')
+        _copy_indexes(conn, target, 0)
+        conn.execute(f'ANALYZE "{target}"')
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE legacy_backup")
+    return True
+
+def table_name(generation: int) -> str:
+    return f"sales_g{generation}"
+
+def _now() -> str:
+    return datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+def _state(conn) -> Tuple[int, List[int]]:
+    """(live generation, every recorded generation); the sales table found first is generation 0."""
+    rows = conn.execute(f"SELECT generation, live FROM {TABLE} ORDER BY generation").fetchall()
+    if not rows:
+        conn.execute(f"INSERT INTO {TABLE} (generation, created_at, live) VALUES (0, ?, 1)", (_now(),))
+        return 0, [0]
+    live = next((row[0] for row in rows if row[1]), rows[-1][0])
+    return live, [row[0] for row in rows]
+
+# --- Building a generation ---
+_NAME = r'("[^"]+"|[^\s(]+)'
+
+def _create_like_live(conn, target: str):
+    """Empty copy of the live table: same columns and keys (and, on PostgreSQL, indexes)."""
+    if not storage.is_sqlite():
+        conn.execute(f'CREATE TABLE "{target}" (LIKE {LIVE} INCLUDING ALL)')
+        return
+    ddl = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (LIVE,)).fetchone()[0]
+    conn.execute(re.sub(rf"^CREATE TABLE\s+{_NAME}", f'CREATE TABLE "{target}"', ddl, count=1))
+
+def _copy_indexes(conn, target: str, generation: int):
+    """The live table's SQLite indexes on `target`; index names are per database, so each gets a _g<n> suffix."""
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (LIVE,)
+    ).fetchall()
+    for name, sql in rows:
+        index = f"{re.sub(r'_g[0-9]+$', '', name)}_g{generation}"
+        conn.execute(re.sub(
+            rf"^CREATE (UNIQUE )?INDEX (IF NOT EXISTS )?{_NAME} ON {_NAME}",
+            lambda m: f'CREATE {m.group(1) or ""}INDEX "{index}" ON "{target}"', sql, count=1,
+        ))
+
+def _build(df, generation: int) -> str:
+    """Load `df` into the table of a new generation, next to the live one; its name."""
+    target = table_name(generation)
+    conn = storage.connect("sales")
+    try:
+        conn.execute(f'DROP TABLE IF EXISTS "{target}"')  # left over from an import that failed
+        like_live = schema.table_exists(conn, LIVE)
+        if like_live:
+            _create_like_live(conn, target)
+        conn.commit()
+        storage.write_frame(df, target, conn, if_exists="append")
+        if like_live and storage.is_sqlite():
+            _copy_indexes(conn, target, generation)
+            conn.execute(f'ANALYZE "{target}"')
+        conn.commit()
+    finally:
+        conn.close()
+    return target
+
+# --- Switching generations ---
+def _rename(conn, old: str, new: str):
+    conn.execute(f'ALTER TABLE "{old}" RENAME TO "{new}"')
+    if storage.is_sqlite() and schema.table_exists(conn, "sqlite_stat1"):
+        # Planner statistics are keyed by table name and do not follow a rename,
+        # unlike the name of a primary key's automatic index
+        before, after = f"sqlite_autoindex_{old}_", f"sqlite_autoindex_{new}_"
+        conn.execute(
+            "UPDATE sqlite_stat1 SET tbl = ?, idx = CASE WHEN substr(idx, 1, ?) = ? THEN ? || substr(idx, ?) ELSE idx END"
+            " WHERE tbl = ?",
+            (new, len(before), before, after, len(before) + 1, old),
+        )
+
+def _activate(conn, live: int, generation: int, details: Dict[str, Any]):
+    """Make `generation` the sales table inside the caller's transaction, and log it as a reload."""
+    if schema.table_exists(conn, LIVE):
+        _rename(conn, LIVE, table_name(live))
+    else:
+        conn.execute(f"DELETE FROM {TABLE} WHERE generation = ?", (live,))  # nothing to go back to
+    _rename(conn, table_name(generation), LIVE)
+    conn.execute(f"UPDATE {TABLE} SET live = CASE WHEN generation = ? THEN 1 ELSE 0 END", (generation,))
+    changes.record(conn, None, "reload", {"generation": live}, {"generation": generation, **details})
+
+def load(df, source: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Replace the sales table with `df` as a new generation:
+    {"generation", "rows", "pruned": [generations dropped]}. Callers
+    serialize imports and undos (the "sales_import" job lease).
+    """
+    schema.ensure("sales")
+    with transaction("sales") as conn:
+        _, known = _state(conn)
+    generation = max(known) + 1
+    _build(df, generation)
+    with transaction("sales") as conn:
+        live, _ = _state(conn)
+        conn.execute(
+            f"INSERT INTO {TABLE} (generation, created_at, row_count, source, live) VALUES (?, ?, ?, ?, 0)",
+            (generation, _now(), len(df), source),
+        )
+        _activate(conn, live, generation, {"rows": len(df), "source": source})
+    schema.imported("sales")
+    return {"generation": generation, "rows": len(df), "pruned": prune()}
+
+def undo() -> Optional[Dict[str, Any]]:
+    """Make the generation before the live one the sales table again; None when none is kept."""
+    schema.ensure("sales")
+    with transaction("sales") as conn:
+        live, known = _state(conn)
+        previous = [g for g in known if g < live]
+        if not previous:
+            return None
+        _activate(conn, live, previous[-1], {"undone": live})
+    return {"generation": previous[-1], "undone": live}
+
+def prune() -> List[int]:
+    """Drop generations beyond the kept ones, and any undone generation; the generations dropped."""
+    with transaction("sales") as conn:
+        live, known = _state(conn)
+        older = [g for g in known if g < live]
+        dropped = older[:max(len(older) - settings.SALES_IMPORT_GENERATIONS, 0)] + [g for g in known if g > live]
+        for generation in dropped:
+            conn.execute(f'DROP TABLE IF EXISTS "{table_name(generation)}"')
+            conn.execute(f"DELETE FROM {TABLE} WHERE generation = ?", (generation,))
+    return dropped
+
+def undo_steps() -> int:
+    """How many times undo() can step back from the live generation."""
+    if not storage.has_table("sales", TABLE):
+        return 0
+    rows = storage.query("sales", f"SELECT generation, live FROM {TABLE}")
+    live = next((row["generation"] for row in rows if row["live"]), None)
+    return 0 if live is None else sum(1 for row in rows if row["generation"] < live)
@@ -0,0 +1,83 @@
+# app/jobs.py
+"""
+Single-runner coordination for work that must not run in several workers at
+once: the ABC syncs (hammering the ABC API from every process and racing on
+the same upserts) and the schema fix-ups run at startup.
+
+A lease is a row in the shared cache database (app.cache) naming the holder
+(host:pid:thread) and an expiry, so a worker that dies mid-sync blocks the job for
+at most settings.JOB_LEASE_SECONDS.
+"""
+
+import functools
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from fastapi import HTTPException
+
+from . import cache
+from .config import settings
+
+def _holder() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+def _ensure_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS job_leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """)
+
+def try_acquire(name: str, seconds: float) -> bool:
+    """Take the lease unless a live holder (any other worker or thread) has it."""
+    conn = cache.connect()
+    _ensure_table(conn)
+    now = time.time()
+    with conn:
+        cur = conn.execute("""
+            INSERT INTO job_leases (name, holder, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+            WHERE job_leases.expires_at <= ?
+        """, (name, _holder(), now + seconds, now))
+    return cur.rowcount == 1
+
+def release(name: str):
+    conn = cache.connect()
+    with conn:
+        conn.execute("DELETE FROM job_leases WHERE name = ? AND holder = ?", (name, _holder()))
+
+@contextmanager
+def lease(name: str, wait: float = 0, seconds: Optional[float] = None) -> Iterator[bool]:
+    """
+    Hold the named lease for the block. Yields False (and runs nothing under
+    the lease) when another worker still holds it after `wait` seconds.
+    """
+    seconds = settings.JOB_LEASE_SECONDS if seconds is None else seconds
+    deadline = time.monotonic() + wait
+    acquired = try_acquire(name, seconds)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.25)
+        acquired = try_acquire(name, seconds)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            release(name)
+
+def exclusive(name: str):
+    """Endpoint decorator: 409 when another worker is already running this job."""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with lease(name) as acquired:
+                if not acquired:
+                    raise HTTPException(status_code=409, detail=f"{name} is already running in another worker")
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,291 @@
+# app/kpi.py
+"""
+Month-to-date progress against the KPI goals, behind /api/kpi/progress.
+
+Every kpi_goals.metric_name the dashboards track is registered in GOALS with
+the measures it adds up (MEASURES: New Business and Promotion cash,
+front-end PT, new EFT value, collections, ...) and the days of the week it
+covers: GM goals the whole week or Monday to Thursday, AGM and weekend
+fitness director goals Friday to Sunday. evaluate() returns actual, goal,
+pace and the projected month end of all of them in one pass, so the pages no
+longer download the month's sales to redo that arithmetic in the browser.
+
+Measures are kept per day. An evaluation reads count and total per day and
+profit center for the range (one grouped query the sales date index answers
+on its own) and revalues only the days whose figures changed since this
+worker last looked, so an import of yesterday's sales re-reads yesterday.
+Measures valued per sale (membership prices, staff ownership) also revalue
+every day when the membership prices or the sales staff change, and every
+day after a sales write through the API in any worker (the cache
+generation moved with the "sales" topic), since an edit of only the plan,
+main item or commission employees leaves count and total as they were.
+
+update_goals() is the batched, all-or-nothing write of goal values behind
+/api/kpi/goals/bulk-update.
+"""
+
+import datetime
+import logging
+import math
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from . import aggregates, cache, lookups, storage
+from .aggregates import PT_NEW_CENTERS, PT_RENEW_CENTERS, UPGRADE_ITEMS
+
+logger = logging.getLogger(__name__)
+
+# Python weekdays (Monday = 0) each goal's days cover
+DAY_SETS: Dict[str, FrozenSet[int]] = {
+    "all": frozenset(range(7)),
+    "mon-thu": frozenset({0, 1, 2, 3}),
+    "fri-sun": frozenset({4, 5, 6}),
+}
+
+@dataclass
+class _Indexes:
+    prices: lookups.PlanPriceIndex
+    staff: lookups.SalesStaffIndex
+
+@dataclass
+class Measure:
+    description: str
+    centers: Callable[[str], bool]  # the profit centers that feed the measure
+    value: Optional[Callable[[Dict[str, Any], _Indexes], float]] = None  # per sale; None sums total_amount
+
+def _one_of(*centers: str) -> Callable[[str], bool]:
+    names = set(centers)
+    return lambda center: center in names
+
+def is_upgrade(main_item: Optional[str]) -> bool:
+    main = (main_item or '').strip().lower()
+    return main.startswith('upg') or any(main == item.lower() for item in UPGRADE_ITEMS)
+
+def _front_end_pt(sale: Dict[str, Any], indexes: _Indexes) -> float:
+    """PT sold without a commission employee or by (at least) one of the sales staff."""
+    employees = sale["commission_employees"] or ''
+    if employees.strip():
+        owners = [lookups.normalize_name(n) for n in employees.split(',')]
+        if not any(owner in indexes.staff for owner in owners if owner):
+            return 0.0
+    return sale["total_amount"] or 0.0
+
+def _new_eft(sale: Dict[str, Any], indexes: _Indexes) -> float:
+    """List price of New Business plans; the full amount of Promotion upgrades."""
+    if (sale["profit_center"] or '').strip() == 'New Business':
+        return float(indexes.prices.list_price((sale["agreement_payment_plan"] or '').strip()) or 0.0)
+    return (sale["total_amount"] or 0.0) if is_upgrade(sale["main_item"]) else 0.0
+
+MEASURES: Dict[str, Measure] = {
+    "nb_promo": Measure("New Business and Promotion cash", _one_of('New Business', 'Promotion')),
+    "front_end_pt": Measure("Personal training sold by the sales team",
+                            _one_of(*PT_NEW_CENTERS, *PT_RENEW_CENTERS), _front_end_pt),
+    "pt_new": Measure("New personal training cash", _one_of(*PT_NEW_CENTERS)),
+    "pt_renew": Measure("Renewed personal training cash", _one_of(*PT_RENEW_CENTERS)),
+    "new_eft": Measure("New EFT value: plan list prices plus upgrades",
+                       lambda center: center.strip() in ('New Business', 'Promotion'), _new_eft),
+    "collections": Measure("POS dues and downgrade fees",
+                           lambda center: 'pos dues' in center.strip().lower()
+                           or center.lower() in ('downgrade fee', 'downgrade fees')),
+    "pif_renewals": Measure("PIF renewals", _one_of('PIF Renewals')),
+    "abc_dues": Measure("ABC dues (profit centers A, B and C)", _one_of('A', 'B', 'C')),
+}
+
+@dataclass
+class Goal:
+    measures: Sequence[str]
+    days: str = "all"  # key of DAY_SETS
+    description: str = ""
+
+GOALS: Dict[str, Goal] = {
+    "nbpromo_quota_gm": Goal(["nb_promo"], "all", "NB/Promo, GM"),
+    "nbpromo_quota_agm": Goal(["nb_promo"], "fri-sun", "NB/Promo, AGM"),
+    "fept_quota_gm": Goal(["front_end_pt"], "mon-thu", "Front-end PT, GM"),
+    "fept_quota_agm": Goal(["front_end_pt"], "fri-sun", "Front-end PT, AGM"),
+    "pt_quota_new_fd": Goal(["pt_new"], "mon-thu", "New PT, fitness director"),
+    "pt_quota_renew_fd": Goal(["pt_renew"], "mon-thu", "Renewed PT, fitness director"),
+    "pt_quota_new_wfd": Goal(["pt_new"], "fri-sun", "New PT, weekend fitness director"),
+    "pt_quota_renew_wfd": Goal(["pt_renew"], "fri-sun", "Renewed PT, weekend fitness director"),
+    "neweft_quota_gm": Goal(["new_eft"], "all", "New EFT, GM"),
+    "neweft_quota_agm": Goal(["new_eft"], "fri-sun", "New EFT, AGM"),
+    "collections_quota": Goal(["collections"], "all", "Collections"),
+    "pif_renewals_quota": Goal(["pif_renewals"], "all", "PIF renewals"),
+    "abc_dues_quota": Goal(["abc_dues"], "all", "ABC dues"),
+    "coordinator_bonus_quota": Goal(["collections", "pif_renewals"], "all", "Coordinator bonus"),
+}
+
+# --- Goal values ---
+def _goal_value(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+def update_goals(items: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Set goal_value for every {"metric_name", "goal_value"} item with one
+    executemany in one transaction. One result per item, in order, with
+    status "updated", "not_found" (no such goal) or "invalid" (no name, or a
+    goal that is not a number). Nothing is written when any item is invalid
+    (the valid ones are "skipped") or the write fails.
+    """
+    from .db import transaction
+    results, updates = [], []
+    for item in items:
+        name, value = item.get("metric_name"), _goal_value(item.get("goal_value"))
+        results.append({"metric_name": name, "goal_value": value, "status": None if name and value is not None else "invalid"})
+    if any(r["status"] == "invalid" for r in results):
+        for result in results:
+            result["status"] = result["status"] or "skipped"
+        return results
+    names = sorted({r["metric_name"] for r in results})
+    with transaction("kpi") as conn:
+        known = {row[0] for row in conn.execute(
+            f"SELECT metric_name FROM kpi_goals WHERE metric_name IN ({', '.join('?' for _ in names)})", tuple(names)
+        ).fetchall()} if names else set()
+        for result in results:
+            result["status"] = "updated" if result["metric_name"] in known else "not_found"
+            if result["status"] == "updated":
+                updates.append((result["goal_value"], result["metric_name"]))
+        if updates:
+            conn.executemany(
+                "UPDATE kpi_goals SET goal_value = ?, updated_at = CURRENT_TIMESTAMP WHERE metric_name = ?", updates
+            )
+    return results
+
+# --- Daily values ---
+Fingerprint = Tuple[Tuple[Any, int, float], ...]
+
+_lock = threading.Lock()
+_days: Dict[str, Tuple[Fingerprint, Dict[str, float]]] = {}  # day -> (its groups, value per measure)
+_indexed: Tuple[Optional[Dict[str, Any]], Optional[set]] = (None, None)  # prices and staff last valued with
+_generation: Optional[int] = None  # cache generation _days was last checked against
+
+def _sales_written(since: Optional[int]) -> Tuple[bool, Optional[int]]:
+    """Whether a sales write went through the API after generation `since`, and the current generation."""
+    try:
+        generation = cache.generation()
+        return since is None or "sales" in cache.changed_topics(since), generation
+    except Exception:
+        return False, since  # treat an unreadable cache database as "unchanged"
+
+def _sales(days: List[str], centers: List[str]) -> List[Dict[str, Any]]:
+    end = datetime.date.fromisoformat(max(days)) + datetime.timedelta(days=1)
+    return storage.query("sales", f"""
+        SELECT {storage.date_bucket('day', 'latest_payment_date')} AS day, profit_center,
+               commission_employees, agreement_payment_plan, main_item, total_amount
+        FROM sales
+        WHERE latest_payment_date >= ? AND latest_payment_date < ?
+          AND profit_center IN ({', '.join('?' for _ in centers)})
+    """, (min(days), end.isoformat(), *centers))
+
+def daily_values(start: datetime.date, end: datetime.date) -> Dict[str, Dict[str, float]]:
+    """{day: {measure: value}} for the days start..end that have sales."""
+    global _indexed, _generation
+    indexes = _Indexes(lookups.plan_prices(), lookups.sales_staff())
+    written, generation = _sales_written(_generation)
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for row in aggregates.sales_totals(start, end, ["day", "profit_center"]):
+        groups.setdefault(row["day"], []).append(row)
+    fingerprints = {
+        day: tuple((r["profit_center"], r["sales"], r["total"]) for r in rows) for day, rows in groups.items()
+    }
+    by_sale = {name: m for name, m in MEASURES.items() if m.value is not None}
+
+    with _lock:
+        if written or _indexed != (indexes.prices.list_prices, indexes.staff.names):
+            _days.clear()
+            _indexed = (indexes.prices.list_prices, indexes.staff.names)
+        _generation = generation
+        dirty = sorted(day for day, fp in fingerprints.items() if _days.get(day, (None,))[0] != fp)
+        for day in dirty:
+            values = dict.fromkeys(MEASURES, 0.0)
+            for row in groups[day]:
+                center = row["profit_center"] or ''
+                for name, measure in MEASURES.items():
+                    if measure.value is None and measure.centers(center):
+                        values[name] += row["total"]
+            _days[day] = (fingerprints[day], values)
+        centers = sorted({
+            row["profit_center"] for day in dirty for row in groups[day]
+            if row["profit_center"] and any(m.centers(row["profit_center"]) for m in by_sale.values())
+        })
+        if centers:
+            wanted = set(dirty)
+            for sale in _sales(dirty, centers):
+                if sale["day"] not in wanted:
+                    continue
+                values = _days[sale["day"]][1]
+                for name, measure in by_sale.items():
+                    if measure.centers(sale["profit_center"] or ''):
+                        values[name] += measure.value(sale, indexes)
+        # Days whose sales were all deleted
+        first, last = start.isoformat(), end.isoformat()
+        for day in [d for d in _days if first <= d <= last and d not in fingerprints]:
+            del _days[day]
+        if dirty:
+            logger.debug("kpi: revalued %d day(s) of %s..%s", len(dirty), first, last)
+        return {day: dict(_days[day][1]) for day in fingerprints}
+
+# --- Progress ---
+def _month_days(first: datetime.date) -> List[datetime.date]:
+    days, day = [], first
+    while day.month == first.month:
+        days.append(day)
+        day += datetime.timedelta(days=1)
+    return days
+
+def _percent(value: float, goal: Optional[float]) -> Optional[float]:
+    return round(value / goal * 100, 1) if goal else None
+
+def evaluate(goals: Dict[str, Optional[float]], as_of: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """
+    Progress of every registered goal for the month of `as_of` (default today)
+    against the goal values in `goals` (metric_name -> goal_value; missing or
+    null goals leave the percentages null). Pace is the actual per elapsed
+    day of the goal's days, today included as on the dashboards; the
+    projection carries that pace over all of the goal's days in the month.
+    """
+    as_of = as_of or datetime.date.today()
+    yesterday, first = aggregates.yesterday_and_first_of_month(as_of)
+    values = daily_values(min(first, yesterday), as_of)
+    month = _month_days(first)
+
+    def total(measures: Sequence[str], days: Sequence[datetime.date]) -> float:
+        return sum(values.get(d.isoformat(), {}).get(m, 0.0) for d in days for m in measures)
+
+    progress = {}
+    for name, goal in GOALS.items():
+        weekdays = DAY_SETS[goal.days]
+        relevant = [d for d in month if d.weekday() in weekdays]
+        elapsed = [d for d in relevant if d <= as_of]
+        target = goals.get(name)
+        actual = total(goal.measures, elapsed)
+        pace = actual / len(elapsed) if elapsed else 0.0
+        projected = pace * len(relevant)
+        remaining = len(relevant) - len(elapsed)
+        progress[name] = {
+            "description": goal.description,
+            "measures": list(goal.measures),
+            "days": goal.days,
+            "goal": target,
+            "actual": round(actual, 2),
+            "yesterday": round(total(goal.measures, [yesterday]), 2) if yesterday.weekday() in weekdays else 0.0,
+            "percent": _percent(actual, target),
+            "pace": round(pace, 2),
+            "projected": round(projected, 2),
+            "projected_percent": _percent(projected, target),
+            "required_pace": round(max(target - actual, 0.0) / remaining, 2) if target and remaining else None,
+            "days_elapsed": len(elapsed),
+            "days_total": len(relevant),
+        }
+    return {
+        "as_of": as_of.isoformat(),
+        "month_start": first.isoformat(),
+        "goals": progress,
+        "totals": {name: round(total([name], [d for d in month if d <= as_of]), 2) for name in MEASURES},
+    }
@@ -0,0 +1,115 @@
+# app/logs.py
+"""
+Logging setup for the API.
+
+Call sites only ever put a record on a queue (QueueHandler); a single
+listener thread does the formatting and the actual stdout/file writes, so a
+burst of log lines never blocks a request. Levels are set per module
+(settings.LOG_LEVEL plus LOG_LEVELS overrides such as
+"app.routers.first_workouts=DEBUG"), and per-row debug traces go through
+sampled(), which logs one row in LOG_SAMPLE_EVERY and costs a single
+attribute check when DEBUG is off.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from .config import settings
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+# Attributes every LogRecord has; anything else came in through extra={...}
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, any extra fields, exc."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """'app.routers.sales=DEBUG, app.perf=WARNING' -> {'app.routers.sales': 10, 'app.perf': 30}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+def configure_logging():
+    """Route the root logger through the queue and apply the configured levels. Safe to call twice."""
+    global _listener
+    if _listener is not None:
+        return
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if settings.LOG_FILE:
+        handlers.append(logging.FileHandler(settings.LOG_FILE))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    if settings.PERF_SLOW_QUERY_LOG:
+        slow_log = logging.FileHandler(settings.PERF_SLOW_QUERY_LOG)
+        slow_log.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        slow_log.addFilter(logging.Filter("app.perf.slow_queries"))
+        handlers.append(slow_log)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """Flush whatever is still queued and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+class _SampledTrace:
+    __slots__ = ("logger", "every", "seen")
+
+    def __init__(self, logger: logging.Logger, every: int):
+        self.logger = logger
+        self.every = max(every, 1)
+        self.seen = 0
+
+    def __call__(self, msg: str, *args):
+        if self.seen % self.every == 0:
+            self.logger.debug(msg, *args, extra={"sampled": self.every})
+        self.seen += 1
+
+def _no_trace(msg: str, *args):
+    pass
+
+def sampled(logger: logging.Logger, every: Optional[int] = None):
+    """
+    Per-row debug trace for one pass over a result set: logs the first row and
+    then one in every `every` (LOG_SAMPLE_EVERY by default). Returns a no-op
+    when DEBUG is disabled for the logger, so the loop pays nothing for it.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return _no_trace
+    return _SampledTrace(logger, settings.LOG_SAMPLE_EVERY if every is None else every)
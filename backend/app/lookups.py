@@ -0,0 +1,333 @@
+# app/lookups.py
+"""
+Shared lookup indexes: staff name matching and membership plan prices.
+
+Several dashboards match free-text names from sales and event exports against
+the employees table, and price agreement plans against the memberships table.
+Each used to re-query its roster and re-run the fuzzy match for every row of
+every request. The indexes here are built once per worker (by the warm-up, or
+on first use) and memoize every match, so a name or plan seen before costs a
+dict lookup.
+
+An index is rebuilt when cache.generation() moves, which happens after every
+successful write in any worker, and at the latest after
+settings.CACHE_TTL_SECONDS so imports run outside the API are picked up too.
+"""
+
+import logging
+import sqlite3
+import string
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import cache
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# --- Normalization and matching rules ---
+def normalize_name(name: str) -> str:
+    """Lower-cased "first last", also accepting "Last, First" and stray whitespace."""
+    if not name:
+        return ""
+    name = ' '.join(name.split())
+    if "," in name:
+        parts = name.split(",", 1)
+        last = parts[0].strip()
+        first = parts[1].strip() if len(parts) > 1 else ""
+        return f"{first} {last}".lower()
+    return name.lower()
+
+def normalize_plan(plan):
+    if not plan:
+        return ''
+    # Lowercase, strip whitespace, remove trailing punctuation (periods, etc.)
+    plan = plan.strip().lower()
+    plan = plan.rstrip(string.punctuation + ' ')
+    return plan
+
+def canonicalize(raw: str, official: List[str]) -> str:
+    """
+    The official name `raw` most likely refers to, scoring whole-word, initial
+    and prefix matches in both directions; the normalized input when nothing
+    scores at least 15.
+    """
+    n = normalize_name(raw)
+    if not n:
+        return ''
+    direct = next((o for o in official if o.lower() == n.lower()), None)
+    if direct:
+        return direct
+    normalized = n.lower()
+    parts = normalized.split()
+    best_match = None
+    best_score = 0
+    for official_name in official:
+        official_lower = official_name.lower()
+        official_parts = official_lower.split()
+        score = 0
+        all_parts_found = True
+        for part in parts:
+            if len(part) < 2:
+                continue
+            part_found = False
+            for official_part in official_parts:
+                if part == official_part:
+                    score += 10
+                    part_found = True
+                    break
+                if len(part) == 1 and official_part.startswith(part):
+                    score += 5
+                    part_found = True
+                    break
+                if len(part) >= 3 and official_part.startswith(part):
+                    score += 7
+                    part_found = True
+                    break
+            if not part_found and len(part) >= 3:
+                all_parts_found = False
+        if parts and official_parts:
+            last_part = parts[-1]
+            official_last = official_parts[-1]
+            if last_part == official_last:
+                score += 15
+        if all_parts_found or score > 0:
+            reverse_match = True
+            for official_part in official_parts:
+                if len(official_part) == 1:
+                    continue
+                found = False
+                for part in parts:
+                    if (
+                        official_part == part or
+                        (len(part) >= 3 and official_part.startswith(part)) or
+                        (len(official_part) >= 3 and part.startswith(official_part))
+                    ):
+                        found = True
+                        break
+                if not found and len(official_part) >= 3:
+                    reverse_match = False
+            if reverse_match:
+                score += 5
+        if score > best_score:
+            best_score = score
+            best_match = official_name
+    return best_match if best_score >= 15 and best_match else n
+
+def match_to_sales_staff(employee_name: str, sales_mapping: Dict[str, str]) -> Optional[str]:
+    """
+    Match an employee name to a sales staff member.
+    Returns the original sales staff name if matched, or None if not.
+    """
+    if not employee_name:
+        return None
+    normalized_emp = normalize_name(employee_name)
+    if normalized_emp in sales_mapping:
+        return sales_mapping[normalized_emp]
+    # Any significant word that is itself a key
+    emp_words = normalized_emp.split()
+    for word in emp_words:
+        if len(word) > 2 and word in sales_mapping:
+            return sales_mapping[word]
+    # The name contains, or is contained in, a full staff name
+    for sales_key, sales_original in sales_mapping.items():
+        if ' ' in sales_key:
+            if normalized_emp in sales_key or sales_key in normalized_emp:
+                return sales_original
+    # Last resort: same first or same last name
+    if len(emp_words) >= 2:
+        first_name = emp_words[0]
+        last_name = emp_words[-1]
+        for sales_key, sales_original in sales_mapping.items():
+            sales_words = sales_key.split()
+            if len(sales_words) >= 2:
+                if (first_name == sales_words[0] or last_name == sales_words[-1]):
+                    return sales_original
+    return None
+
+# --- Indexes ---
+class TrainerIndex:
+    """Normalized trainer names with a memoized canonicalize()."""
+    def __init__(self, names: List[str]):
+        self.names = names
+        self._known = set(names)
+        self._canonical: Dict[str, str] = {}
+
+    def canonicalize(self, raw: str) -> str:
+        canon = self._canonical.get(raw)
+        if canon is None:
+            canon = self._canonical[raw] = canonicalize(raw, self.names)
+        return canon
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._known
+
+class SalesStaffIndex:
+    """Normalized names (and their significant words) -> sales staff name, with memoized matches."""
+    def __init__(self, mapping: Dict[str, str]):
+        self.mapping = mapping
+        self.names = {normalize_name(original) for original in mapping.values()}
+        self._matches: Dict[str, Optional[str]] = {}
+
+    def match(self, employee_name: str) -> Optional[str]:
+        if employee_name in self._matches:
+            return self._matches[employee_name]
+        matched = self._matches[employee_name] = match_to_sales_staff(employee_name, self.mapping)
+        return matched
+
+    def __contains__(self, name: str) -> bool:
+        """Whether a (normalized) name is a sales staff member's full name."""
+        return name in self.names
+
+class PlanPriceIndex:
+    """
+    Membership prices keyed for the two ways plans are priced: EFT matching
+    (exact, case-insensitive, containment, then shared words; pay-in-full
+    plans count $0) and the normalized list price the EFT entries page shows.
+    """
+    def __init__(self, memberships: List[Dict[str, Any]]):
+        self.eft_prices: Dict[str, float] = {}
+        self.list_prices: Dict[str, Any] = {}
+        for membership in memberships:
+            membership_type = (membership.get('membership_type') or '').strip()
+            price = membership.get('price', 0)
+            self.list_prices[normalize_plan(membership_type)] = price
+            # Pay in Full / PIF = $0 EFT
+            if 'pif' in membership_type.lower() or 'pay in full' in membership_type.lower():
+                price = 0
+            if membership_type:
+                self.eft_prices[membership_type] = float(price)
+        self._lowered = [(t, t.lower(), set(t.lower().split()), p) for t, p in self.eft_prices.items()]
+        self._matches: Dict[str, Tuple[Optional[str], float]] = {}
+
+    def list_price(self, plan: str) -> float:
+        if not plan:
+            return 0.0
+        return self.list_prices.get(normalize_plan(plan), 0.0)
+
+    def match(self, plan: str) -> Tuple[Optional[str], float]:
+        """(membership type, EFT price) for an agreement payment plan; (None, 0) when nothing matches."""
+        hit = self._matches.get(plan)
+        if hit is None:
+            hit = self._matches[plan] = self._match(plan)
+        return hit
+
+    def _match(self, plan: str) -> Tuple[Optional[str], float]:
+        if plan in self.eft_prices:
+            return plan, self.eft_prices[plan]
+        plan_lower = plan.lower()
+        for membership_type, lowered, _, price in self._lowered:
+            if plan_lower == lowered:
+                return membership_type, price
+        for membership_type, lowered, _, price in self._lowered:
+            if plan_lower in lowered or lowered in plan_lower:
+                return membership_type, price
+        # Most significant (3+ letter) words in common; ties keep the first plan
+        plan_words = set(plan_lower.split())
+        best, best_score = (None, 0), 0
+        for membership_type, _, words, price in self._lowered:
+            score = len([w for w in plan_words.intersection(words) if len(w) > 2])
+            if score > best_score:
+                best, best_score = (membership_type, price), score
+        return best
+
+# --- Loaders ---
+class _Lookup:
+    """One lazily built index, rebuilt when the cache generation moves or it outlives the TTL."""
+    def __init__(self, name: str, build: Callable[[], Any], fallback: Optional[Callable[[], Any]] = None):
+        self.name = name
+        self._build = build
+        self._fallback = fallback
+        self._lock = threading.Lock()
+        self._value = None
+        self._generation = None
+        self._built_at = 0.0
+
+    def _current_generation(self) -> Optional[int]:
+        try:
+            return cache.generation()
+        except sqlite3.Error:
+            return self._generation  # treat an unreadable cache database as "unchanged"
+
+    def _fresh(self, generation) -> bool:
+        return (self._value is not None and generation == self._generation
+                and time.monotonic() - self._built_at < settings.CACHE_TTL_SECONDS)
+
+    def get(self):
+        generation = self._current_generation()
+        if self._fresh(generation):
+            return self._value
+        with self._lock:
+            if not self._fresh(generation):
+                try:
+                    value = self._build()
+                except Exception:
+                    if self._fallback is None:
+                        raise
+                    logger.exception("building the %s index failed", self.name)
+                    return self._fallback()  # not kept: the next call tries again
+                self._value, self._generation, self._built_at = value, generation, time.monotonic()
+            return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+
+def _build_trainers() -> TrainerIndex:
+    from .db import query_employees
+    rows = query_employees(
+        "SELECT Name AS name FROM employees WHERE Position LIKE '%Trainer%' OR Position LIKE '%Fitness Director%'"
+    )
+    return TrainerIndex([normalize_name(r['name']) for r in rows if r.get('name')])
+
+def _build_sales_staff() -> SalesStaffIndex:
+    from .db import query_employees
+    # Try with capitalized column names first (Name, Position), then lowercase
+    try:
+        rows = query_employees("SELECT Name, Position FROM employees WHERE Position LIKE 'Sales%'")
+        name_field = 'Name'
+    except Exception:
+        rows = query_employees("SELECT name, position FROM employees WHERE position LIKE 'Sales%'")
+        name_field = 'name'
+    mapping = {}
+    for row in rows:
+        if row.get(name_field):
+            original = row[name_field].strip()
+            normalized = normalize_name(original)
+            mapping[normalized] = original
+            # Also add individual words as keys for partial matching
+            for word in normalized.split():
+                if len(word) > 2 and word not in mapping:  # Skip short words like "jr", "de", etc.
+                    mapping[word] = original
+    return SalesStaffIndex(mapping)
+
+def _build_plan_prices() -> PlanPriceIndex:
+    from .db import query_memberships
+    return PlanPriceIndex(query_memberships("SELECT * FROM memberships"))
+
+_trainers = _Lookup("trainers", _build_trainers, fallback=lambda: TrainerIndex([]))
+_sales_staff = _Lookup("sales staff", _build_sales_staff, fallback=lambda: SalesStaffIndex({}))
+_plan_prices = _Lookup("plan prices", _build_plan_prices)
+
+def trainers() -> TrainerIndex:
+    """Trainers and fitness directors; empty (and retried next call) when employees cannot be read."""
+    return _trainers.get()
+
+def sales_staff() -> SalesStaffIndex:
+    """Sales staff; empty (and retried next call) when employees cannot be read."""
+    return _sales_staff.get()
+
+def plan_prices() -> PlanPriceIndex:
+    """Membership plan prices; raises when the memberships table cannot be read."""
+    return _plan_prices.get()
+
+def build_all():
+    """Build every index now (the warm-up step)."""
+    trainers()
+    sales_staff()
+    plan_prices()
+
+def reset():
+    for lookup in (_trainers, _sales_staff, _plan_prices):
+        lookup.reset()
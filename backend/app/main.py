@@ -1,6 +1,10 @@
+from app import warmup  # first, so its clock covers the rest of the boot
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.logs import configure_logging
+configure_logging()
+
 from app.routers import employees, sales, eft, memberships, guests, kpi, first_workouts, tools, eft_calculations, thirtyday_reprograms, events, upload
 from app.routers import attrition
 from app.routers import coachees_table
@@ -8,6 +12,13 @@ from app.routers import members
 from app.routers import api_events
 from app.routers import member_tracker
 from app.routers import transactions_api
+from app.routers import debug
+from app.routers import health
+from app.routers import timeseries
+from app.routers import changes
+from app.routers import live
+from app import cache, jobs, perf, recording, schema
+from app.config import settings
 
 
 app = FastAPI()
@@ -21,10 +32,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.PERF_ENABLED:
+    app.middleware("http")(perf.timing_middleware)
+if settings.RECORD_SESSION:
+    app.middleware("http")(recording.recording_middleware)
+# Even with the response cache off, writes bump the generation the app.lookups indexes rebuild on
+app.middleware("http")(cache.invalidation_middleware)
+
 @app.on_event("startup")
 def ensure_dbs():
     # import app.db so missing-file errors happen right away
-    import app.db  # noqa
+    from app import db  # noqa
+    # Every worker runs this; the lease makes the others wait instead of racing on the DDL,
+    # then find every migration recorded and only mark their schema ready. Starting without
+    # the lease would serve requests against a half-migrated schema, so fail the worker instead
+    with jobs.lease("startup_schema", wait=120) as acquired:
+        if not acquired:
+            raise RuntimeError("another worker is still migrating the schema after 120s; not starting")
+        schema.bootstrap()
+    warmup.start(app)
+
+@app.on_event("shutdown")
+def stop_db_executors():
+    from app.db import shutdown_executors
+    shutdown_executors()
 
 # register all routers
 app.include_router(employees.router)
@@ -44,4 +75,9 @@ app.include_router(coachees_table.router)
 app.include_router(members.router)
 app.include_router(api_events.router)
 app.include_router(member_tracker.router)
-app.include_router(transactions_api.router)
\ No newline at end of file
+app.include_router(transactions_api.router)
+app.include_router(debug.router)
+app.include_router(health.router)
+app.include_router(timeseries.router)
+app.include_router(changes.router)
+app.include_router(live.router)
\ No newline at end of file
@@ -0,0 +1,331 @@
+# app/perf.py
+"""
+Request and query timing.
+
+Every HTTP request is timed into a latency histogram per route template, and
+every SQL statement run through app.storage / app.db (SQLite or pooled
+PostgreSQL) is timed per fingerprint: the statement with its literals and
+placeholders collapsed, so `WHERE id = 3` and `WHERE id = 7` are counted
+together. Statements slower than settings.PERF_SLOW_QUERY_MS go to the
+slow-query log. /api/debug/perf returns the numbers as JSON and /metrics in the
+Prometheus text format.
+
+The numbers are per worker process: every series carries a worker="<pid>"
+label and each worker reports its start time, so a scrape that lands on
+another worker reads as a different series instead of a counter reset.
+Sum over the worker label for whole-server totals.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .config import settings
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT_SLOW_QUERIES = 100
+
+# app.logs sends this logger to settings.PERF_SLOW_QUERY_LOG
+slow_query_logger = logging.getLogger("app.perf.slow_queries")
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (None past the last bucket)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(LATENCY_BUCKETS, self.buckets):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+class _QueryStat:
+    __slots__ = ("count", "rows", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+
+_lock = threading.Lock()
+_routes: Dict[Tuple[str, str], _Histogram] = {}
+_responses: Dict[Tuple[str, str, int], int] = {}
+_queries: Dict[str, _QueryStat] = {}
+_slow_queries: Deque[Dict[str, Any]] = deque(maxlen=RECENT_SLOW_QUERIES)
+_slow_query_total = 0
+_started_at = datetime.now()
+_process_started = time.time()
+
+def _forked():
+    # Workers forked from a preloading master start their own clock
+    global _process_started
+    _process_started = time.time()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forked)
+
+# "GET /api/sales" of the request being served, for the slow-query log
+current_request: ContextVar[Optional[str]] = ContextVar("current_request", default=None)
+
+# --- SQL fingerprints ---
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):[A-Za-z_]\w*|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql: str) -> str:
+    """Statement text with literals and placeholders replaced by ?, whitespace collapsed."""
+    text = _PARAM.sub("?", _LITERAL.sub("?", sql))
+    text = _IN_LIST.sub("(?, ...)", text)
+    return _SPACE.sub(" ", text).strip()[:500]
+
+# --- Recording ---
+def record_request(method: str, route: str, status: int, seconds: float):
+    with _lock:
+        histogram = _routes.get((method, route))
+        if histogram is None:
+            histogram = _routes[(method, route)] = _Histogram()
+        histogram.observe(seconds)
+        key = (method, route, status)
+        _responses[key] = _responses.get(key, 0) + 1
+
+class StatementTimer:
+    """
+    Accumulates the time one statement spends in execute and the fetches after
+    it (SQLite does most of a SELECT's work while rows are fetched).
+    """
+    __slots__ = ("key", "stat", "elapsed", "logged")
+
+    def __init__(self, sql: str):
+        self.key = fingerprint(sql)
+        self.elapsed = 0.0
+        self.logged = False
+        with _lock:
+            stat = _queries.get(self.key)
+            if stat is None:
+                stat = _queries[self.key] = _QueryStat()
+            stat.count += 1
+        self.stat = stat
+
+    def add(self, seconds: float, rows: int = 0):
+        self.elapsed += seconds
+        with _lock:
+            self.stat.total += seconds
+            self.stat.rows += rows
+            self.stat.max = max(self.stat.max, self.elapsed)
+        if not self.logged and self.elapsed * 1000 >= settings.PERF_SLOW_QUERY_MS:
+            self.logged = True
+            _record_slow_query(self.key, self.elapsed)
+
+def _record_slow_query(key: str, seconds: float):
+    global _slow_query_total
+    entry = {
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "ms": round(seconds * 1000, 1),
+        "request": current_request.get(),
+        "query": key,
+    }
+    with _lock:
+        _slow_queries.append(entry)
+        _slow_query_total += 1
+    slow_query_logger.warning("%.1fms [%s] %s", entry["ms"], entry["request"] or "-", key)
+
+# --- Timed sqlite3 classes (pass factory=CONNECTION_FACTORY to sqlite3.connect) ---
+class ProfiledCursor(sqlite3.Cursor):
+    _timer = None
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._timer.add(time.perf_counter() - started)
+
+    def execute(self, sql, parameters=()):
+        self._timer = StatementTimer(sql)
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._timer = StatementTimer(sql)
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        if self._timer:
+            self._timer.add(time.perf_counter() - started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if self._timer:
+            self._timer.add(time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        if self._timer:
+            self._timer.add(time.perf_counter() - started, len(rows))
+        return rows
+
+class ProfiledConnection(sqlite3.Connection):
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+CONNECTION_FACTORY = ProfiledConnection if settings.PERF_ENABLED else sqlite3.Connection
+
+# --- Middleware ---
+async def timing_middleware(request, call_next):
+    """Time each request under its route template (e.g. /api/kpi/{id}), not the raw path."""
+    started = time.perf_counter()
+    token = current_request.set(f"{request.method} {request.url.path}")
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        current_request.reset(token)
+        route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+        record_request(request.method, route, status, time.perf_counter() - started)
+
+# --- Reporting ---
+def snapshot(limit: int = 50) -> Dict[str, Any]:
+    """Routes by total time, the `limit` most expensive query fingerprints, recent slow queries."""
+    with _lock:
+        routes = [
+            {
+                "method": method,
+                "route": route,
+                "count": h.count,
+                "total_ms": round(h.total * 1000, 1),
+                "avg_ms": round(h.total / h.count * 1000, 2),
+                "p50_ms": _ms(h.quantile(0.5)),
+                "p95_ms": _ms(h.quantile(0.95)),
+                "p99_ms": _ms(h.quantile(0.99)),
+                "max_ms": round(h.max * 1000, 1),
+                "responses": {str(s): n for (m, r, s), n in _responses.items() if m == method and r == route},
+            }
+            for (method, route), h in _routes.items()
+        ]
+        queries = [
+            {
+                "query": key,
+                "count": q.count,
+                "rows": q.rows,
+                "total_ms": round(q.total * 1000, 1),
+                "avg_ms": round(q.total / q.count * 1000, 2) if q.count else 0,
+                "max_ms": round(q.max * 1000, 1),
+            }
+            for key, q in _queries.items()
+        ]
+        slow = list(_slow_queries)
+    routes.sort(key=lambda r: r["total_ms"], reverse=True)
+    queries.sort(key=lambda q: q["total_ms"], reverse=True)
+    return {
+        "worker": os.getpid(),
+        "since": _started_at.isoformat(timespec="seconds"),
+        "slow_query_ms": settings.PERF_SLOW_QUERY_MS,
+        "routes": routes,
+        "queries": queries[:limit],
+        "query_fingerprints": len(queries),
+        "slow_queries": slow[::-1],
+    }
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+def reset():
+    global _slow_query_total, _started_at
+    with _lock:
+        _routes.clear()
+        _responses.clear()
+        _queries.clear()
+        _slow_queries.clear()
+        _slow_query_total = 0
+        _started_at = datetime.now()
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def render_prometheus() -> str:
+    """Prometheus text exposition (version 0.0.4) of the same counters snapshot() reports."""
+    lines: List[str] = []
+    worker = f'worker="{os.getpid()}"'
+    with _lock:
+        lines += [
+            "# HELP ecab_process_start_time_seconds Start of the worker process that answered this scrape.",
+            "# TYPE ecab_process_start_time_seconds gauge",
+            f"ecab_process_start_time_seconds{{{worker}}} {_process_started:.3f}",
+            "# HELP ecab_http_request_duration_seconds Request latency by route template.",
+            "# TYPE ecab_http_request_duration_seconds histogram",
+        ]
+        for (method, route), h in sorted(_routes.items()):
+            labels = f'{worker},method="{method}",route="{_label(route)}"'
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, h.buckets):
+                cumulative += n
+                lines.append(f'ecab_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'ecab_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"ecab_http_request_duration_seconds_sum{{{labels}}} {h.total:.6f}")
+            lines.append(f"ecab_http_request_duration_seconds_count{{{labels}}} {h.count}")
+
+        lines += ["# HELP ecab_http_responses_total Responses by route and status.", "# TYPE ecab_http_responses_total counter"]
+        for (method, route, status), n in sorted(_responses.items()):
+            lines.append(f'ecab_http_responses_total{{{worker},method="{method}",route="{_label(route)}",status="{status}"}} {n}')
+
+        query_metrics = (
+            ("ecab_db_queries_total", "counter", "Statements executed by fingerprint.", lambda q: q.count),
+            ("ecab_db_query_rows_total", "counter", "Rows fetched by fingerprint.", lambda q: q.rows),
+            ("ecab_db_query_seconds_total", "counter", "Time spent executing and fetching by fingerprint.",
+             lambda q: f"{q.total:.6f}"),
+            ("ecab_db_query_max_seconds", "gauge", "Slowest single statement by fingerprint.", lambda q: f"{q.max:.6f}"),
+        )
+        for name, kind, help_text, value in query_metrics:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for key, q in _queries.items():
+                lines.append(f'{name}{{{worker},query="{_label(key)}"}} {value(q)}')
+
+        lines += [
+            f"# HELP ecab_db_slow_queries_total Statements slower than {settings.PERF_SLOW_QUERY_MS}ms.",
+            "# TYPE ecab_db_slow_queries_total counter",
+            f"ecab_db_slow_queries_total{{{worker}}} {_slow_query_total}",
+        ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,121 @@
+# app/pos.py
+"""
+The typed pos_transactions projection of the raw POS API archive.
+
+app/scripts/import_abc_api_raw.py stores every fetched transaction as JSON
+in api_transactions_raw and upserts its flattened row here, keyed on
+transaction_id so re-imports are idempotent; /api/transactions pages through
+it by timestamp. Pos schema v1 creates the table and fills it from the raw
+archive, so installs that imported before the projection existed get it on
+the next startup.
+"""
+
+import json
+from typing import Any, Dict, Iterable
+
+from . import schema
+
+RAW_TABLE = "api_transactions_raw"
+TABLE = "pos_transactions"
+_BACKFILL_BATCH = 1000
+
+def create_table(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            transaction_id TEXT PRIMARY KEY,
+            transactionTimestamp TEXT,
+            memberId TEXT,
+            homeClub TEXT,
+            employeeId TEXT,
+            receiptNumber TEXT,
+            stationName TEXT,
+            is_return INTEGER DEFAULT 0,
+            item_count INTEGER DEFAULT 0,
+            subtotal REAL DEFAULT 0,
+            tax REAL DEFAULT 0,
+            raw_json TEXT
+        )
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_pos_transactions_timestamp ON {TABLE} (transactionTimestamp)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_pos_transactions_member ON {TABLE} (memberId)")
+
+@schema.migration("pos", 1, "pos_transactions projection")
+def create_projection(conn):
+    create_table(conn)
+    if schema.table_exists(conn, RAW_TABLE):
+        backfill(conn)
+
+def _to_float(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _tx_items(tx) -> list:
+    # The POS API nests line items as {"items": {"item": [...]}}; older samples use a flat list
+    items = tx.get("items") or []
+    if isinstance(items, dict):
+        items = items.get("item") or []
+    return items if isinstance(items, list) else []
+
+def project_transaction(tx) -> tuple:
+    """Flatten one POS transaction into a pos_transactions row."""
+    items = _tx_items(tx)
+    is_return = tx.get("return")
+    if isinstance(is_return, str):
+        is_return = is_return.strip().lower() == "true"
+    return (
+        tx.get("transactionId"),
+        tx.get("transactionTimestamp", ""),
+        tx.get("memberId"),
+        tx.get("homeClub"),
+        tx.get("employeeId"),
+        tx.get("receiptNumber"),
+        tx.get("stationName"),
+        1 if is_return else 0,
+        len(items),
+        round(sum(_to_float(i.get("subtotal")) for i in items), 2),
+        round(sum(_to_float(i.get("tax")) for i in items), 2),
+        json.dumps(tx),
+    )
+
+def upsert_pos_transactions(conn, transactions: Iterable[Dict[str, Any]]) -> int:
+    """Insert or refresh typed rows for the given transactions. Returns the number of rows written."""
+    rows = [project_transaction(tx) for tx in transactions if tx.get("transactionId")]
+    if not rows:
+        return 0
+    conn.executemany(f"""
+        INSERT INTO {TABLE} (
+            transaction_id, transactionTimestamp, memberId, homeClub, employeeId, receiptNumber,
+            stationName, is_return, item_count, subtotal, tax, raw_json
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(transaction_id) DO UPDATE SET
+            transactionTimestamp = excluded.transactionTimestamp,
+            memberId = excluded.memberId,
+            homeClub = excluded.homeClub,
+            employeeId = excluded.employeeId,
+            receiptNumber = excluded.receiptNumber,
+            stationName = excluded.stationName,
+            is_return = excluded.is_return,
+            item_count = excluded.item_count,
+            subtotal = excluded.subtotal,
+            tax = excluded.tax,
+            raw_json = excluded.raw_json
+    """, rows)
+    return len(rows)
+
+def backfill(conn) -> int:
+    """
+    Project every row stored in api_transactions_raw into pos_transactions,
+    in batches; safe to re-run. The number of rows written.
+    """
+    projected, batch = 0, []
+    for row in conn.execute(f"SELECT raw_json FROM {RAW_TABLE} ORDER BY id").fetchall():
+        try:
+            batch.append(json.loads(row[0]))
+        except (TypeError, ValueError):
+            continue
+        if len(batch) >= _BACKFILL_BATCH:
+            projected += upsert_pos_transactions(conn, batch)
+            batch = []
+    return projected + upsert_pos_transactions(conn, batch)
@@ -0,0 +1,51 @@
+# app/recording.py
+"""
+Dashboard session recorder.
+
+With settings.RECORD_SESSION pointing at a file, every GET the frontend makes
+is appended to it as one JSON line: the offset in seconds from the first
+recorded request, the URL path and query string, the route template it
+matched, and the status and duration seen while recording. Open the dashboard
+in a browser, click through a typical morning, then unset RECORD_SESSION;
+benchmarks/loadtest.py replays the file at N concurrent users. Writes are
+not recorded: replaying them would mutate the data being measured.
+"""
+
+import json
+import threading
+import time
+from typing import Optional
+
+from . import warmup
+from .config import settings
+
+# Tooling endpoints that are not part of a dashboard session
+SKIP_PREFIXES = ("/api/debug", "/api/health", "/api/live", "/metrics", "/docs", "/redoc", "/openapi.json")
+
+_lock = threading.Lock()
+_first_request_at: Optional[float] = None
+
+def _append(entry: dict):
+    global _first_request_at
+    with _lock:
+        if _first_request_at is None:
+            _first_request_at = entry["t"]
+        entry["t"] = round(entry["t"] - _first_request_at, 3)
+        with open(settings.RECORD_SESSION, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+async def recording_middleware(request, call_next):
+    if request.method != "GET" or request.url.path.startswith(SKIP_PREFIXES) or warmup.HEADER in request.headers:
+        return await call_next(request)
+    started_at = time.time()
+    started = time.perf_counter()
+    response = await call_next(request)
+    _append({
+        "t": started_at,
+        "path": request.url.path,
+        "query": request.url.query,
+        "route": getattr(request.scope.get("route"), "path", None) or request.url.path,
+        "status": response.status_code,
+        "ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+    return response
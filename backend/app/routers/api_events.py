@@ -1,10 +1,12 @@
 from fastapi import APIRouter, HTTPException, Query
-from app.db import insert_api_events, get_api_events, insert_structured_events, query_structured_events
+from app.db import insert_api_events, get_api_events, insert_structured_events, query_structured_events, get_structured_events
 from app.config import settings
-import requests
+from app.jobs import exclusive
+import logging
 from datetime import datetime, timedelta
 import re
-import json
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/api-events", tags=["api-events"])
 
@@ -27,7 +29,9 @@ def format_event_date_range(eventDateRange: str) -> str:
     return eventDateRange.rstrip(',')
 
 @router.post("/fetch", summary="Fetch all events from Jan to July of the current year, store in DB, and return new events")
+@exclusive("abc_sync")
 def fetch_and_store_api_events():
+    import requests
     all_new_events = []
     year = datetime.now().year
     # Loop from January to July (inclusive)
@@ -46,31 +50,31 @@ def fetch_and_store_api_events():
                 'app_id': settings.APP_ID,
                 'app_key': settings.APP_KEY,
             }
-            print(f"Fetching {full_url}")
+            logger.debug("Fetching %s", full_url)
             try:
                 response = requests.get(full_url, headers=headers)
             except Exception as e:
-                print(f"Request error for {full_url}: {e}")
+                logger.error("Request error for %s: %s", full_url, e)
                 raise HTTPException(status_code=502, detail=f"Request error: {e}")
-            print(f"Raw response for {full_url}: {response.text[:500]}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw response for %s: %s", full_url, response.text[:500])
             try:
                 data = response.json()
             except Exception as e:
-                print(f"JSON decode error for {full_url}: {e}\nRaw response: {response.text[:500]}")
+                logger.error("JSON decode error for %s: %s\nRaw response: %s", full_url, e, response.text[:500])
                 raise HTTPException(status_code=502, detail={
                     "error": f"JSON decode error: {e}",
                     "raw_response": response.text[:500],
                     "url": full_url
                 })
             events = data if isinstance(data, list) else data.get('events', [])
-            print(f"  -> Got {len(events)} events for {eventDateRange} page {page}")
+            logger.info("Got %d events for %s page %d", len(events), eventDateRange, page)
             if not events:
-                print(f"  -> No events for {eventDateRange} page {page}, stopping.")
                 break
             try:
                 insert_api_events(events)
             except Exception as e:
-                print(f"DB insert error for page {page}: {e}")
+                logger.exception("DB insert error for page %d", page)
                 raise HTTPException(status_code=500, detail=f"DB insert error: {e}")
             all_new_events.extend(events)
             page += 1
@@ -79,33 +83,17 @@ def fetch_and_store_api_events():
 @router.get("/db", summary="Get all stored API events from DB")
 def get_api_events_db(
     start_date: str = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: str = Query(None, description="End date (YYYY-MM-DD)")
+    end_date: str = Query(None, description="End date (YYYY-MM-DD)"),
+    event_name: str = Query(None, description="Only events with this eventName"),
+    status: str = Query(None, description="Only events with this status"),
 ):
-    raw = get_api_events()
-    # Filter by eventTimestamp if dates are provided
-    if start_date or end_date:
-        def in_range(event):
-            ts = event.get("eventTimestamp")
-            if not ts:
-                return False
-            date = ts[:10]
-            if start_date and date < start_date:
-                return False
-            if end_date and date > end_date:
-                return False
-            return True
-        filtered = [e for e in raw if in_range(e)]
-    else:
-        filtered = raw
-    if filtered and isinstance(filtered[0], str):
-        return [json.loads(e) for e in filtered]
-    elif filtered and isinstance(filtered[0], dict) and 'event_json' in filtered[0]:
-        return [json.loads(e['event_json']) for e in filtered]
-    else:
-        return filtered
+    # Filtering happens on the indexed generated columns; only matching rows are decoded
+    return get_api_events(start_date, end_date, event_name, status)
 
 @router.post("/structured-events/fetch", summary="Fetch all events from Jan to July of the current year, store in structured_events.db, and return new events")
+@exclusive("abc_sync")
 def fetch_and_store_structured_events():
+    import requests
     all_new_events = []
     year = datetime.now().year
     # Loop from January to July (inclusive)
@@ -124,31 +112,31 @@ def fetch_and_store_structured_events():
                 'app_id': settings.APP_ID,
                 'app_key': settings.APP_KEY,
             }
-            print(f"Fetching {full_url}")
+            logger.debug("Fetching %s", full_url)
             try:
                 response = requests.get(full_url, headers=headers)
             except Exception as e:
-                print(f"Request error for {full_url}: {e}")
+                logger.error("Request error for %s: %s", full_url, e)
                 raise HTTPException(status_code=502, detail=f"Request error: {e}")
-            print(f"Raw response for {full_url}: {response.text[:500]}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw response for %s: %s", full_url, response.text[:500])
             try:
                 data = response.json()
             except Exception as e:
-                print(f"JSON decode error for {full_url}: {e}\nRaw response: {response.text[:500]}")
+                logger.error("JSON decode error for %s: %s\nRaw response: %s", full_url, e, response.text[:500])
                 raise HTTPException(status_code=502, detail={
                     "error": f"JSON decode error: {e}",
                     "raw_response": response.text[:500],
                     "url": full_url
                 })
             events = data if isinstance(data, list) else data.get('events', [])
-            print(f"  -> Got {len(events)} events for {eventDateRange} page {page}")
+            logger.info("Got %d events for %s page %d", len(events), eventDateRange, page)
             if not events:
-                print(f"  -> No events for {eventDateRange} page {page}, stopping.")
                 break
             try:
                 insert_structured_events(events)
             except Exception as e:
-                print(f"DB insert error for page {page}: {e}")
+                logger.exception("DB insert error for page %d", page)
                 raise HTTPException(status_code=500, detail=f"DB insert error: {e}")
             all_new_events.extend(events)
             page += 1
@@ -157,30 +145,11 @@ def fetch_and_store_structured_events():
 @router.get("/structured-events/db", summary="Get all stored structured events from DB, with optional date filtering")
 def get_structured_events_db(
     start_date: str = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: str = Query(None, description="End date (YYYY-MM-DD)")
+    end_date: str = Query(None, description="End date (YYYY-MM-DD), inclusive"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(0, ge=0, le=5000, description="Events per page. 0 returns every matching event."),
 ):
-    # Build base query
-    query = "SELECT * FROM events"
-    params = []
-    if start_date or end_date:
-        query += " WHERE 1=1"
-        if start_date:
-            query += " AND eventTimestamp >= ?"
-            params.append(start_date)
-        if end_date:
-            query += " AND eventTimestamp <= ?"
-            params.append(end_date)
-    query += " ORDER BY eventTimestamp DESC"
-    events = query_structured_events(query, tuple(params))
-    # For each event, fetch its members
-    for event in events:
-        event_id = event.get("eventId")
-        members = query_structured_events(
-            "SELECT memberId, firstName, lastName FROM event_members WHERE eventId = ?",
-            (event_id,)
-        )
-        event["members"] = members
-    return events
+    return get_structured_events(start_date, end_date, page, page_size)
 
 @router.get("/monthly-completions", summary="Get total completed 1st Workouts and 30 Day Reprograms in a date range")
 def get_monthly_completions(
@@ -189,17 +158,17 @@ def get_monthly_completions(
 ):
     # Query for completed 1st Workouts
     fw_query = """
-        SELECT COUNT(*) FROM events
+        SELECT COUNT(*) AS count FROM events
         WHERE eventName = '1st Workout' AND status = 'Completed'
         AND eventTimestamp >= ? AND eventTimestamp <= ?
     """
     tr_query = """
-        SELECT COUNT(*) FROM events
+        SELECT COUNT(*) AS count FROM events
         WHERE eventName = '30 Day Reprogram' AND status = 'Completed'
         AND eventTimestamp >= ? AND eventTimestamp <= ?
     """
-    fw_count = query_structured_events(fw_query, (start_date, end_date))[0]["COUNT(*)"]
-    tr_count = query_structured_events(tr_query, (start_date, end_date))[0]["COUNT(*)"]
+    fw_count = query_structured_events(fw_query, (start_date, end_date))[0]["count"]
+    tr_count = query_structured_events(tr_query, (start_date, end_date))[0]["count"]
     return {
         "first_workouts_completed": fw_count,
         "thirty_day_reprograms_completed": tr_count
@@ -1,230 +1,124 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
 import sqlite3
-from pathlib import Path
+from typing import List, Optional
+from app import schema, storage
+from app.cache import cached
 
-router = APIRouter()
+router = APIRouter(prefix="/api/attrition", tags=["attrition"])
 
-DB_PATH = Path(__file__).parent.parent.parent / 'attrition.db'
+CHAMPIONS_CLUB = "membership_type = 'CHAMPIONS CLUB'"
+ALL_OTHER = "membership_type != 'CHAMPIONS CLUB'"
 
-@router.get('/count_champions_club_cancelled')
-def count_champions_club_cancelled():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = """
-        SELECT COUNT(*) FROM attrition
-        WHERE membership_type = 'CHAMPIONS CLUB' AND status = 'Cancelled'
-    """
-    c.execute(query)
-    count = c.fetchone()[0]
-    conn.close()
-    return {"count": count}
-
-@router.get('/champions_club_cancelled_summary')
-def champions_club_cancelled_summary():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = """
-        SELECT COUNT(*), SUM(CAST(draft AS FLOAT)) FROM attrition
-        WHERE membership_type = 'CHAMPIONS CLUB' AND status = 'Cancelled'
-    """
-    c.execute(query)
-    count, draft_sum = c.fetchone()
-    conn.close()
-    return {"count": count, "draft_sum": draft_sum}
-
-@router.get('/champions_club_cancelled_details')
-def champions_club_cancelled_details():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = """
-        SELECT member_name, agreement_number, status_reason, draft FROM attrition
-        WHERE membership_type = 'CHAMPIONS CLUB' AND status = 'Cancelled'
-    """
-    c.execute(query)
-    rows = c.fetchall()
-    conn.close()
-    details = [
-        {
-            "member_name": row[0],
-            "agreement_number": str(row[1]).split('.')[0] if row[1] is not None else '',
-            "status_reason": row[2],
-            "draft": float(row[3]) if row[3] is not None and str(row[3]).replace('.', '', 1).replace('-', '', 1).isdigit() else row[3]
-        }
-        for row in rows
-    ]
-    return {"details": details}
+# Every bucket the dashboard shows, as a SQL predicate over the attrition table.
+# The buckets overlap: a cancelled membership returned for collection counts
+# as both cancelled and rfc, in the summary and in the details alike.
+# Cancelled and expired key off status, rfc off status_reason; in the ABC export
+# status Expired always comes with reason Expired, so both clubs use status.
+ATTRITION_BUCKETS = {
+    "champions_club_cancelled": f"{CHAMPIONS_CLUB} AND status = 'Cancelled'",
+    "champions_club_expired": f"{CHAMPIONS_CLUB} AND status = 'Expired'",
+    "champions_club_rfc": f"{CHAMPIONS_CLUB} AND status_reason = 'Returned for collection'",
+    "all_other_canceled": f"{ALL_OTHER} AND status = 'Cancelled'",
+    "all_other_expired": f"{ALL_OTHER} AND status = 'Expired'",
+    "all_other_rfc": f"{ALL_OTHER} AND status_reason = 'Returned for collection'",
+}
 
-@router.get('/champions_club_expired_summary')
-def champions_club_expired_summary():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = """
-        SELECT COUNT(*), SUM(CAST(draft AS FLOAT)) FROM attrition
-        WHERE membership_type = 'CHAMPIONS CLUB' AND status_reason = 'Expired'
+@schema.migration("attrition", 1, "draft stored as REAL")
+def type_attrition_draft(conn):
     """
-    c.execute(query)
-    count, draft_sum = c.fetchone()
-    conn.close()
-    return {"count": count, "draft_sum": draft_sum}
-
-@router.get('/champions_club_expired_details')
-def champions_club_expired_details():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = """
-        SELECT member_name, agreement_number, status_reason, draft FROM attrition
-        WHERE membership_type = 'CHAMPIONS CLUB' AND status_reason = 'Expired'
-    """
-    c.execute(query)
-    rows = c.fetchall()
-    conn.close()
-    details = [
-        {
-            "member_name": row[0],
-            "agreement_number": str(row[1]).split('.')[0] if row[1] is not None else '',
-            "status_reason": row[2],
-            "draft": float(row[3]) if row[3] is not None and str(row[3]).replace('.', '', 1).replace('-', '', 1).isdigit() else row[3]
-        }
-        for row in rows
-    ]
-    return {"details": details}
-
-@router.get('/champions_club_rfc_summary')
-def champions_club_rfc_summary():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = """
-        SELECT COUNT(*), SUM(CAST(draft AS FLOAT)) FROM attrition
-        WHERE membership_type = 'CHAMPIONS CLUB' AND status_reason = 'Returned for collection'
-    """
-    c.execute(query)
-    count, draft_sum = c.fetchone()
-    conn.close()
-    return {"count": count, "draft_sum": draft_sum}
-
-@router.get('/champions_club_rfc_details')
-def champions_club_rfc_details():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = """
-        SELECT member_name, agreement_number, status_reason, draft FROM attrition
-        WHERE membership_type = 'CHAMPIONS CLUB' AND status_reason = 'Returned for collection'
+    Older imports stored draft as TEXT, which forced a CAST on every read.
+    Rebuild the table once with draft as REAL; a no-op when it already is.
+    Deferred until an import has created the table.
     """
-    c.execute(query)
-    rows = c.fetchall()
-    conn.close()
-    details = [
-        {
-            "member_name": row[0],
-            "agreement_number": str(row[1]).split('.')[0] if row[1] is not None else '',
-            "status_reason": row[2],
-            "draft": float(row[3]) if row[3] is not None and str(row[3]).replace('.', '', 1).replace('-', '', 1).isdigit() else row[3]
-        }
-        for row in rows
-    ]
-    return {"details": details}
+    if not schema.table_exists(conn, "attrition"):
+        return False
+    if not storage.is_sqlite():
+        # PostgreSQL can retype the migrated column in place
+        columns = {c["name"]: c["type"] for c in storage.table_info("attrition", "attrition")}
+        if columns.get("draft", "double precision") == "text":
+            conn.execute("""
+                ALTER TABLE attrition ALTER COLUMN draft TYPE double precision
+                USING CASE WHEN TRIM(COALESCE(draft, '')) = '' THEN NULL ELSE CAST(draft AS double precision) END
+            """)
+        return
+    columns = {row[1]: row[2].upper() for row in conn.execute("PRAGMA table_info(attrition)").fetchall()}
+    if columns.get("draft", "REAL") != "REAL":
+        others = [c for c in columns if c != "draft"]
+        column_defs = ", ".join(f"{c} {columns[c] or 'TEXT'}" for c in others)
+        column_list = ", ".join(others)
+        conn.executescript(f"""
+            BEGIN;
+            CREATE TABLE attrition_typed ({column_defs}, draft REAL);
+            INSERT INTO attrition_typed ({column_list}, draft)
+                SELECT {column_list},
+                       CASE WHEN TRIM(COALESCE(draft, '')) = '' THEN NULL ELSE CAST(draft AS REAL) END
+                FROM attrition;
+            DROP TABLE attrition;
+            ALTER TABLE attrition_typed RENAME TO attrition;
+            COMMIT;
+        """)
 
-@router.get('/all_other_canceled_summary')
-def all_other_canceled_summary():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = """
-        SELECT COUNT(*), SUM(CAST(draft AS FLOAT)) FROM attrition
-        WHERE membership_type != 'CHAMPIONS CLUB' AND status = 'Cancelled'
+@router.get('/summary')
+@cached()
+def attrition_summary():
     """
-    c.execute(query)
-    count, draft_sum = c.fetchone()
-    conn.close()
-    return {"count": count, "draft_sum": draft_sum}
-
-@router.get('/all_other_canceled_details')
-def all_other_canceled_details():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = """
-        SELECT member_name, agreement_number, status_reason, draft FROM attrition
-        WHERE membership_type != 'CHAMPIONS CLUB' AND status = 'Cancelled'
+    Count and draft_sum for every attrition bucket, computed in a single scan.
     """
-    c.execute(query)
-    rows = c.fetchall()
+    select = ",\n".join(
+        f"SUM(CASE WHEN {predicate} THEN 1 ELSE 0 END) AS {name}_count, "
+        f"SUM(CASE WHEN {predicate} THEN draft END) AS {name}_draft_sum"
+        for name, predicate in ATTRITION_BUCKETS.items()
+    )
+    conn = storage.connect("attrition")
+    conn.row_factory = sqlite3.Row
+    row = conn.execute(f"SELECT {select} FROM attrition").fetchone()
     conn.close()
-    details = [
-        {
-            "member_name": row[0],
-            "agreement_number": str(row[1]).split('.')[0] if row[1] is not None else '',
-            "status_reason": row[2],
-            "draft": float(row[3]) if row[3] is not None and str(row[3]).replace('.', '', 1).replace('-', '', 1).isdigit() else row[3]
-        }
-        for row in rows
-    ]
-    return {"details": details}
+    return {
+        name: {"count": row[f"{name}_count"] or 0, "draft_sum": row[f"{name}_draft_sum"]}
+        for name in ATTRITION_BUCKETS
+    }
 
-@router.get('/all_other_expired_summary')
-def all_other_expired_summary():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = """
-        SELECT COUNT(*), SUM(CAST(draft AS FLOAT)) FROM attrition
-        WHERE membership_type != 'CHAMPIONS CLUB' AND status = 'Expired'
+@router.get('/details')
+@cached()
+def attrition_details(
+    bucket: Optional[List[str]] = Query(None, description="Bucket(s) to include; defaults to all"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(0, ge=0, le=5000, description="Rows per page. 0 returns every matching row."),
+):
     """
-    c.execute(query)
-    count, draft_sum = c.fetchone()
-    conn.close()
-    return {"count": count, "draft_sum": draft_sum}
-
-@router.get('/all_other_expired_details')
-def all_other_expired_details():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = """
-        SELECT member_name, agreement_number, status_reason, draft FROM attrition
-        WHERE membership_type != 'CHAMPIONS CLUB' AND status = 'Expired'
+    Member rows for the requested buckets. Each row carries the bucket it
+    matched, and appears once per requested bucket it belongs to.
     """
-    c.execute(query)
-    rows = c.fetchall()
-    conn.close()
-    details = [
-        {
-            "member_name": row[0],
-            "agreement_number": str(row[1]).split('.')[0] if row[1] is not None else '',
-            "status_reason": row[2],
-            "draft": float(row[3]) if row[3] is not None and str(row[3]).replace('.', '', 1).replace('-', '', 1).isdigit() else row[3]
-        }
-        for row in rows
-    ]
-    return {"details": details}
+    names = list(dict.fromkeys(bucket or ATTRITION_BUCKETS))
+    unknown = [n for n in names if n not in ATTRITION_BUCKETS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown bucket(s): {', '.join(unknown)}")
 
-@router.get('/all_other_rfc_summary')
-def all_other_rfc_summary():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = """
-        SELECT COUNT(*), SUM(CAST(draft AS FLOAT)) FROM attrition
-        WHERE membership_type != 'CHAMPIONS CLUB' AND status_reason = 'Returned for collection'
-    """
-    c.execute(query)
-    count, draft_sum = c.fetchone()
-    conn.close()
-    return {"count": count, "draft_sum": draft_sum}
+    # One SELECT per bucket, so a row in several buckets is listed under each, as /summary counts it
+    matched = " UNION ALL ".join(
+        f"SELECT '{n}' AS bucket, member_name, agreement_number, status_reason, draft "
+        f"FROM attrition WHERE {ATTRITION_BUCKETS[n]}"
+        for n in names
+    )
+    query = f"{matched} ORDER BY bucket, member_name"
+    params = []
+    if page_size:
+        query += " LIMIT ? OFFSET ?"
+        params.extend([page_size, (page - 1) * page_size])
 
-@router.get('/all_other_rfc_details')
-def all_other_rfc_details():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    query = """
-        SELECT member_name, agreement_number, status_reason, draft FROM attrition
-        WHERE membership_type != 'CHAMPIONS CLUB' AND status_reason = 'Returned for collection'
-    """
-    c.execute(query)
-    rows = c.fetchall()
+    conn = storage.connect("attrition")
+    conn.row_factory = sqlite3.Row
+    total = conn.execute(f"SELECT COUNT(*) FROM ({matched}) AS matched").fetchone()[0]
+    rows = conn.execute(query, params).fetchall()
     conn.close()
     details = [
         {
-            "member_name": row[0],
-            "agreement_number": str(row[1]).split('.')[0] if row[1] is not None else '',
-            "status_reason": row[2],
-            "draft": float(row[3]) if row[3] is not None and str(row[3]).replace('.', '', 1).replace('-', '', 1).isdigit() else row[3]
+            "bucket": row["bucket"],
+            "member_name": row["member_name"],
+            "agreement_number": str(row["agreement_number"]).split('.')[0] if row["agreement_number"] is not None else '',
+            "status_reason": row["status_reason"],
+            "draft": row["draft"],
         }
         for row in rows
     ]
-    return {"details": details} 
\ No newline at end of file
+    return {"details": details, "total": total}
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Query
+from typing import Any, Dict
+
+from app import changes, storage
+
+router = APIRouter(prefix="/api/changes", tags=["changes"])
+
+MAX_LIMIT = 500
+
+@router.get("", summary="Sales changes after a sequence number, oldest first")
+def get_changes(
+    since: int = Query(0, ge=0, description="Last sequence number already applied (0: from the start)"),
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+) -> Dict[str, Any]:
+    """
+    Inserts, updates and deletes of sales (imports and edits alike), each
+    with its sequence number, the recorded old and new values and the sale
+    as it is now; a "reload" (no sale_id) means an import or its undo
+    replaced the whole table, so re-read /api/sales/all before going on.
+    Pass the returned `next` as `since` to continue; `more` is true while
+    changes are left after this page. Consumers keep `next` and poll with it
+    instead of re-reading /api/sales/all.
+    """
+    if not storage.has_table("sales", changes.TABLE):
+        return {"since": since, "next": since, "latest": 0, "more": False, "changes": []}
+    page = changes.since(since, limit)
+    latest = changes.latest()
+    last = page[-1]["seq"] if page else since
+    return {
+        "since": since,
+        "next": last,
+        "latest": latest,
+        "more": last < latest,
+        "changes": page,
+    }
@@ -1,32 +1,15 @@
 from fastapi import APIRouter, Query
 import sqlite3
-import os
 from datetime import datetime, timedelta
 from typing import Dict
 import re
-from app.db import DB_PATH, query_employees
+from app import aggregates, lookups, storage
+from app.aggregates import PT_NEW_CENTERS, PT_RENEW_CENTERS
+from app.lookups import normalize_name
+from app.cache import cached
 
 router = APIRouter(prefix="/api/coachees-table", tags=["coachees-table"])
 
-PT_NEW_CENTERS = [
-    'PT Postdate - New',
-    'Personal Training - NEW',
-]
-PT_RENEW_CENTERS = [
-    'PT Postdate - Renew',
-    'Personal Training - RENEW',
-]
-
-def normalize_name(name: str) -> str:
-    if not name:
-        return ""
-    name = ' '.join(name.split())
-    if "," in name:
-        parts = name.split(",", 1)
-        last = parts[0].strip()
-        first = parts[1].strip() if len(parts) > 1 else ""
-        return f"{first} {last}".lower()
-    return name.lower()
 
 def get_yesterday_and_first_of_month():
     today = datetime.now().date()
@@ -34,112 +17,19 @@ def get_yesterday_and_first_of_month():
     first_of_month = today.replace(day=1)
     return yesterday, first_of_month
 
-def canonicalize(raw: str, official: list) -> str:
-    n = normalize_name(raw)
-    if not n:
-        return ''
-    direct_match = next((o for o in official if o.lower() == n.lower()), None)
-    if direct_match:
-        return direct_match
-    normalized = n.lower()
-    parts = normalized.split()
-    best_match = None
-    best_score = 0
-    for official_name in official:
-        official_lower = official_name.lower()
-        official_parts = official_lower.split()
-        score = 0
-        all_parts_found = True
-        for part in parts:
-            if len(part) < 2:
-                continue
-            part_found = False
-            for official_part in official_parts:
-                if part == official_part:
-                    score += 10
-                    part_found = True
-                    break
-                if len(part) == 1 and official_part.startswith(part):
-                    score += 5
-                    part_found = True
-                    break
-                if len(part) >= 3 and official_part.startswith(part):
-                    score += 7
-                    part_found = True
-                    break
-            if not part_found and len(part) >= 3:
-                all_parts_found = False
-        if parts and official_parts:
-            last_part = parts[-1]
-            official_last = official_parts[-1]
-            if last_part == official_last:
-                score += 15
-        if all_parts_found or score > 0:
-            reverse_match = True
-            for official_part in official_parts:
-                if len(official_part) == 1:
-                    continue
-                found = False
-                for part in parts:
-                    if (
-                        official_part == part or
-                        (len(part) >= 3 and official_part.startswith(part)) or
-                        (len(official_part) >= 3 and part.startswith(official_part))
-                    ):
-                        found = True
-                        break
-                if not found and len(official_part) >= 3:
-                    reverse_match = False
-            if reverse_match:
-                score += 5
-        if score > best_score:
-            best_score = score
-            best_match = official_name
-    return best_match if best_score >= 15 and best_match else n
-
 @router.get("/summary", summary="Get New PT and Renew PT totals for CoachesTable")
+@cached()
 def get_coachees_table_summary() -> Dict[str, float]:
-    if not os.path.exists(DB_PATH):
+    if not storage.has_table("sales", "sales"):
         return {}
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
     yesterday, first_of_month = get_yesterday_and_first_of_month()
-    # New PT
-    cur.execute(
-        f"""
-        SELECT SUM(total_amount) as total FROM sales
-        WHERE profit_center IN ({','.join(['?']*len(PT_NEW_CENTERS))})
-          AND latest_payment_date = ?
-        """, PT_NEW_CENTERS + [yesterday.isoformat()]
-    )
-    new_pt_today = cur.fetchone()["total"] or 0.0
-    cur.execute(
-        f"""
-        SELECT SUM(total_amount) as total FROM sales
-        WHERE profit_center IN ({','.join(['?']*len(PT_NEW_CENTERS))})
-          AND latest_payment_date >= ?
-        """, PT_NEW_CENTERS + [first_of_month.isoformat()]
-    )
-    new_pt_mtd = cur.fetchone()["total"] or 0.0
-    # Renew PT
-    cur.execute(
-        f"""
-        SELECT SUM(total_amount) as total FROM sales
-        WHERE profit_center IN ({','.join(['?']*len(PT_RENEW_CENTERS))})
-          AND latest_payment_date = ?
-        """, PT_RENEW_CENTERS + [yesterday.isoformat()]
-    )
-    renew_pt_today = cur.fetchone()["total"] or 0.0
-    cur.execute(
-        f"""
-        SELECT SUM(total_amount) as total FROM sales
-        WHERE profit_center IN ({','.join(['?']*len(PT_RENEW_CENTERS))})
-          AND latest_payment_date >= ?
-        """, PT_RENEW_CENTERS + [first_of_month.isoformat()]
-    )
-    renew_pt_mtd = cur.fetchone()["total"] or 0.0
-    conn.close()
+    pt = aggregates.SalesFilter(profit_centers=PT_NEW_CENTERS + PT_RENEW_CENTERS)
+    today = {r["profit_center"]: r["total"] for r in aggregates.sales_totals(yesterday, yesterday, ["profit_center"], pt)}
+    mtd = {r["profit_center"]: r["total"] for r in aggregates.sales_totals(first_of_month, None, ["profit_center"], pt)}
+    new_pt_today = sum(today.get(c, 0.0) for c in PT_NEW_CENTERS)
+    new_pt_mtd = sum(mtd.get(c, 0.0) for c in PT_NEW_CENTERS)
+    renew_pt_today = sum(today.get(c, 0.0) for c in PT_RENEW_CENTERS)
+    renew_pt_mtd = sum(mtd.get(c, 0.0) for c in PT_RENEW_CENTERS)
     return {
         'new_pt_today': round(new_pt_today, 2),
         'new_pt_mtd': round(new_pt_mtd, 2),
@@ -150,13 +40,14 @@ def get_coachees_table_summary() -> Dict[str, float]:
     }
 
 @router.get("/sales", summary="Get sales details for New PT, Renew PT, or Total PT")
+@cached()
 def get_sales_details(
     type: str = Query('new', enum=['new', 'renew', 'total']),
     period: str = Query('today', enum=['today', 'mtd'])
 ):
-    if not os.path.exists(DB_PATH):
+    if not storage.has_table("sales", "sales"):
         return []
-    conn = sqlite3.connect(DB_PATH)
+    conn = storage.connect("sales")
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
     yesterday, first_of_month = get_yesterday_and_first_of_month()
@@ -183,9 +74,7 @@ def get_sales_details(
         profit_centers + [date_val]
     )
     sales = [dict(row) for row in cur.fetchall()]
-    # Get all trainers from employees DB
-    trainer_rows = query_employees('SELECT "Name" FROM employees WHERE "Position" LIKE "%Trainer%" OR "Position" LIKE "%Fitness Director%"')
-    trainer_names = [normalize_name(row['Name']) for row in trainer_rows if row.get('Name')]
+    trainers = lookups.trainers()
     # For each sale, filter commission_employees to only trainers
     filtered_sales = []
     for sale in sales:
@@ -193,8 +82,8 @@ def get_sales_details(
         names = [normalize_name(n) for n in re.split(r',|;', raw) if n.strip()]
         filtered = []
         for n in names:
-            canon = canonicalize(n, trainer_names)
-            if canon in trainer_names:
+            canon = trainers.canonicalize(n)
+            if canon in trainers:
                 filtered.append(canon)
         sale['commission_employees'] = ', '.join(filtered)
         if sale['commission_employees']:
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import PlainTextResponse
+from app import perf
+
+router = APIRouter(tags=["debug"])
+
+@router.get("/api/debug/perf")
+def get_perf(limit: int = Query(50, ge=1, le=1000, description="Query fingerprints to return, most total time first")):
+    """
+    Per-route latency (count, avg, p50/p95/p99 from the histogram buckets, max),
+    the most expensive SQL fingerprints and the most recent slow queries.
+    """
+    return perf.snapshot(limit)
+
+@router.delete("/api/debug/perf")
+def reset_perf():
+    perf.reset()
+    return {"success": True}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """The same counters in the Prometheus text format."""
+    return PlainTextResponse(perf.render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -4,19 +4,23 @@ from fastapi import APIRouter, HTTPException
 from datetime import datetime, timedelta
 from collections import defaultdict
 from typing import Dict, List, Any
-import sqlite3
-import os
+import logging
 
-from ..db import query_db, query_memberships
+from .. import lookups, storage
+from ..db import query_db, query_memberships, run_analytic
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/eft-calculations", tags=["eft-calculations"])
 
 @router.get("/counts")  
-def get_eft_counts():
+async def get_eft_counts():
     """EFT calculation with condensed logging and name normalization"""
+    return await run_analytic(compute_eft_counts)
+
+def compute_eft_counts():
+    """Blocking body of /counts; runs on the analytic executor."""
     try:
-        print("EFT CALCULATION START")
-        
         # Step 1: Get New Business sales this month
         today = datetime.now().date()
         first_of_month = today.replace(day=1)
@@ -40,24 +44,10 @@ def get_eft_counts():
                 except:
                     pass
         
-        print(f"Found {len(this_month_sales)} New Business sales this month")
-        
-        # Step 2: Create membership lookup (exclude PIF/Pay in Full = $0 EFT)
-        memberships = query_memberships("SELECT * FROM memberships")
-        membership_lookup = {}
-        
-        for membership in memberships:
-            membership_type = membership.get('membership_type', '').strip()
-            price = membership.get('price', 0)
-            
-            # Pay in Full / PIF = $0 EFT
-            if 'pif' in membership_type.lower() or 'pay in full' in membership_type.lower():
-                price = 0
-            
-            if membership_type:
-                membership_lookup[membership_type] = float(price)
+        logger.debug("Found %d New Business sales this month", len(this_month_sales))
         
-        print(f"Created membership lookup with {len(membership_lookup)} entries")
+        # Step 2: Membership price index (PIF/Pay in Full = $0 EFT), shared and prebuilt at warm-up
+        prices = lookups.plan_prices()
         
         # Helper function to normalize employee names (remove extra spaces, handle formatting)
         def normalize_employee_name(name):
@@ -80,52 +70,8 @@ def get_eft_counts():
             if not agreement_plan or not commission_employees:
                 continue
             
-            # Enhanced matching logic
-            matched_price = 0
-            matched_membership = None
-            
-            # 1. Exact match
-            if agreement_plan in membership_lookup:
-                matched_price = membership_lookup[agreement_plan]
-                matched_membership = agreement_plan
-            else:
-                # 2. Case-insensitive exact match
-                for membership_type, price in membership_lookup.items():
-                    if agreement_plan.lower() == membership_type.lower():
-                        matched_price = price
-                        matched_membership = membership_type
-                        break
-                
-                if not matched_membership:
-                    # 3. Contains match (both directions)
-                    agreement_lower = agreement_plan.lower()
-                    for membership_type, price in membership_lookup.items():
-                        membership_lower = membership_type.lower()
-                        if (agreement_lower in membership_lower or 
-                            membership_lower in agreement_lower):
-                            matched_price = price
-                            matched_membership = membership_type
-                            break
-                
-                if not matched_membership:
-                    # 4. Word-based fuzzy matching
-                    agreement_words = set(agreement_plan.lower().split())
-                    best_match_score = 0
-                    
-                    for membership_type, price in membership_lookup.items():
-                        membership_words = set(membership_type.lower().split())
-                        # Calculate match score based on common words
-                        common_words = agreement_words.intersection(membership_words)
-                        significant_words = [w for w in common_words if len(w) > 2]
-                        
-                        if len(significant_words) > best_match_score:
-                            best_match_score = len(significant_words)
-                            matched_price = price
-                            matched_membership = membership_type
-                    
-                    # Only use fuzzy match if we found significant overlap
-                    if best_match_score == 0:
-                        matched_membership = None
+            # Exact, case-insensitive, containment, then shared-word match
+            matched_membership, matched_price = prices.match(agreement_plan)
             
             if matched_membership:
                 matched_count += 1
@@ -151,24 +97,24 @@ def get_eft_counts():
             eft_totals[employee]['today'] = round(eft_totals[employee]['today'], 2)
             eft_totals[employee]['mtd'] = round(eft_totals[employee]['mtd'], 2)
         
-        print(f"MATCHED: {matched_count}/{len(this_month_sales)} sales")
-        if unmatched_plans:
-            print(f"UNMATCHED: {len(unmatched_plans)} unique plans")
-        print(f"EFT TOTALS: {len(eft_totals)} employees")
-        for employee, totals in list(eft_totals.items())[:5]:  # Show first 5
-            print(f"  {employee}: Today=${totals['today']}, MTD=${totals['mtd']}")
-        if len(eft_totals) > 5:
-            print(f"  ... and {len(eft_totals) - 5} more")
+        logger.debug(
+            "EFT counts: matched %d/%d sales, %d unmatched plans, %d employees",
+            matched_count, len(this_month_sales), len(unmatched_plans), len(eft_totals)
+        )
         
         return eft_totals
         
-    except Exception as e:
-        print(f"EFT ERROR: {e}")
+    except Exception:
+        logger.exception("EFT calculation failed")
         return {}
 
 @router.get("/details/{employee}/{period}")
-def get_eft_details(employee: str, period: str):
+async def get_eft_details(employee: str, period: str):
     """Get detailed EFT entries for a specific employee and period"""
+    return await run_analytic(compute_eft_details, employee, period)
+
+def compute_eft_details(employee: str, period: str):
+    """Blocking body of /details; runs on the analytic executor."""
     try:
         if period not in ['today', 'mtd']:
             return {'details': []}
@@ -186,20 +132,8 @@ def get_eft_details(employee: str, period: str):
             WHERE profit_center = 'New Business'
         """)
         
-        # Get membership EFT lookup
-        memberships = query_memberships("SELECT * FROM memberships")
-        membership_lookup = {}
-        
-        for membership in memberships:
-            membership_type = membership.get('membership_type', '').strip()
-            price = membership.get('price', 0)
-            
-            # Pay in Full / PIF = $0 EFT
-            if 'pif' in membership_type.lower() or 'pay in full' in membership_type.lower():
-                price = 0
-            
-            if membership_type:
-                membership_lookup[membership_type] = float(price)
+        # Membership EFT price index
+        prices = lookups.plan_prices()
         
         # Helper function to normalize employee names
         def normalize_employee_name(name):
@@ -247,49 +181,7 @@ def get_eft_details(employee: str, period: str):
                 continue
             
             # Calculate EFT amount using same matching logic as main function
-            matched_price = 0
-            matched_membership = None
-            
-            # Enhanced matching logic (same as in get_eft_counts)
-            if agreement_payment_plan in membership_lookup:
-                matched_price = membership_lookup[agreement_payment_plan]
-                matched_membership = agreement_payment_plan
-            else:
-                # Case-insensitive exact match
-                for membership_type, price in membership_lookup.items():
-                    if agreement_payment_plan.lower() == membership_type.lower():
-                        matched_price = price
-                        matched_membership = membership_type
-                        break
-                
-                if not matched_membership:
-                    # Contains match (both directions)
-                    agreement_lower = agreement_payment_plan.lower()
-                    for membership_type, price in membership_lookup.items():
-                        membership_lower = membership_type.lower()
-                        if (agreement_lower in membership_lower or 
-                            membership_lower in agreement_lower):
-                            matched_price = price
-                            matched_membership = membership_type
-                            break
-                
-                if not matched_membership:
-                    # Word-based fuzzy matching
-                    agreement_words = set(agreement_payment_plan.lower().split())
-                    best_match_score = 0
-                    
-                    for membership_type, price in membership_lookup.items():
-                        membership_words = set(membership_type.lower().split())
-                        common_words = agreement_words.intersection(membership_words)
-                        significant_words = [w for w in common_words if len(w) > 2]
-                        
-                        if len(significant_words) > best_match_score:
-                            best_match_score = len(significant_words)
-                            matched_price = price
-                            matched_membership = membership_type
-                    
-                    if best_match_score == 0:
-                        matched_membership = None
+            matched_membership, matched_price = prices.match(agreement_payment_plan)
             
             # Calculate EFT per employee
             eft_per_employee = matched_price / len(employees) if employees else matched_price
@@ -307,8 +199,8 @@ def get_eft_details(employee: str, period: str):
         
         return {'details': results}
         
-    except Exception as e:
-        print(f"Error getting EFT details: {e}")
+    except Exception:
+        logger.exception("Error getting EFT details")
         return {'details': []}
 
 @router.get("/debug/membership-plans")
@@ -335,7 +227,7 @@ def debug_sales_structure():
     """Debug endpoint to see sales_data table structure and sample data"""
     try:
         # Get table structure
-        structure = query_db("PRAGMA table_info(sales_data)")
+        structure = storage.table_info("sales", "sales_data")
         
         # Get sample New Business sales
         sample_sales = query_db("""
@@ -362,7 +254,7 @@ def debug_membership_structure():
     """Debug endpoint to see memberships table structure and sample data"""
     try:
         # Get table structure
-        structure = query_memberships("PRAGMA table_info(memberships)")
+        structure = storage.table_info("memberships", "memberships")
         
         # Get sample memberships
         sample_memberships = query_memberships("SELECT * FROM memberships LIMIT 10")
@@ -1,99 +1,18 @@
 from fastapi import APIRouter, Query
 from typing import List, Optional, Dict, Any
 import sqlite3
-import os
 from datetime import datetime, timedelta
-import requests
 from fastapi.responses import JSONResponse
+from app import lookups, storage
+from app.lookups import normalize_name
 from app.db import insert_abc_events, get_abc_events
+from app.cache import cached
+from app.jobs import exclusive
 
 router = APIRouter(prefix="/api/events", tags=["events"])
 
-DB_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'events.db')  # backend/events.db
-
-# --- Name normalization/canonicalization helpers ---
-def normalize_name(name: str) -> str:
-    if not name:
-        return ""
-    name = ' '.join(name.split())
-    if "," in name:
-        parts = name.split(",", 1)
-        last = parts[0].strip()
-        first = parts[1].strip() if len(parts) > 1 else ""
-        return f"{first} {last}".lower()
-    return name.lower()
-
-def canonicalize(raw: str, official: List[str]) -> str:
-    n = normalize_name(raw)
-    if not n:
-        return ''
-    direct = next((o for o in official if o.lower() == n.lower()), None)
-    if direct:
-        return direct
-    normalized = n.lower()
-    parts = normalized.split()
-    best_match = None
-    best_score = 0
-    for official_name in official:
-        official_lower = official_name.lower()
-        official_parts = official_lower.split()
-        score = 0
-        all_parts_found = True
-        for part in parts:
-            if len(part) < 2:
-                continue
-            part_found = False
-            for official_part in official_parts:
-                if part == official_part:
-                    score += 10
-                    part_found = True
-                    break
-                if len(part) == 1 and official_part.startswith(part):
-                    score += 5
-                    part_found = True
-                    break
-                if len(part) >= 3 and official_part.startswith(part):
-                    score += 7
-                    part_found = True
-                    break
-            if not part_found and len(part) >= 3:
-                all_parts_found = False
-        if parts and official_parts:
-            last_part = parts[-1]
-            official_last = official_parts[-1]
-            if last_part == official_last:
-                score += 15
-        if all_parts_found or score > 0:
-            reverse_match = True
-            for official_part in official_parts:
-                if len(official_part) == 1:
-                    continue
-                found = False
-                for part in parts:
-                    if (
-                        official_part == part or
-                        (len(part) >= 3 and official_part.startswith(part)) or
-                        (len(official_part) >= 3 and part.startswith(official_part))
-                    ):
-                        found = True
-                        break
-                if not found and len(official_part) >= 3:
-                    reverse_match = False
-            if reverse_match:
-                score += 5
-        if score > best_score:
-            best_score = score
-            best_match = official_name
-    return best_match if best_score >= 15 and best_match else n
-
-# --- Helper to get official trainers list ---
-def get_trainer_names() -> List[str]:
-    try:
-        from app.db import query_employees
-        rows = query_employees('''SELECT "Name" AS name FROM employees WHERE "Position" LIKE "%Trainer%" OR "Position" LIKE "%Fitness Director%"''')
-        return [normalize_name(r['name']) for r in rows if r.get('name')]
-    except Exception:
-        return []
+# CSV-imported events (backend/events.db, or csv_events in the unified database)
+EVENTS_TABLE = storage.table("csv_events", "events")
 
 # --- Event type filters ---
 FIRST_WORKOUT_TYPES = ["1st Workout", "First Workout"]
@@ -109,16 +28,16 @@ def get_dates():
 
 # --- Core event filter/count logic ---
 def get_event_counts(event_types: List[str]) -> Dict[str, Dict[str, int]]:
-    if not os.path.exists(DB_PATH):
+    if not storage.has_table("csv_events", "events"):
         return {}
-    conn = sqlite3.connect(DB_PATH)
+    conn = storage.connect("csv_events")
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
-    cur.execute("SELECT * FROM events WHERE event_type IN ({})".format(
+    cur.execute(f"SELECT * FROM {EVENTS_TABLE} WHERE event_type IN ({{}})".format(
         ','.join('?' for _ in event_types)), event_types)
     rows = cur.fetchall()
     conn.close()
-    trainer_names = get_trainer_names()
+    trainers = lookups.trainers()
     counts = {}
     today, yesterday, first_of_month = get_dates()
     for row in rows:
@@ -128,8 +47,8 @@ def get_event_counts(event_types: List[str]) -> Dict[str, Dict[str, int]]:
             event_date = datetime.strptime(event_date_str, '%Y-%m-%d').date()
         except Exception:
             continue
-        mapped = canonicalize(emp_raw, trainer_names)
-        key = mapped if mapped in trainer_names else 'Other'
+        mapped = trainers.canonicalize(emp_raw)
+        key = mapped if mapped in trainers else 'Other'
         if key not in counts:
             counts[key] = {'today': 0, 'mtd': 0}
         if event_date == yesterday:
@@ -139,16 +58,16 @@ def get_event_counts(event_types: List[str]) -> Dict[str, Dict[str, int]]:
     return counts
 
 def get_event_details(event_types: List[str], trainer: Optional[str], period: str) -> List[Dict[str, Any]]:
-    if not os.path.exists(DB_PATH):
+    if not storage.has_table("csv_events", "events"):
         return []
-    conn = sqlite3.connect(DB_PATH)
+    conn = storage.connect("csv_events")
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
-    cur.execute("SELECT * FROM events WHERE event_type IN ({})".format(
+    cur.execute(f"SELECT * FROM {EVENTS_TABLE} WHERE event_type IN ({{}})".format(
         ','.join('?' for _ in event_types)), event_types)
     rows = cur.fetchall()
     conn.close()
-    trainer_names = get_trainer_names()
+    trainers = lookups.trainers()
     today, yesterday, first_of_month = get_dates()
     results = []
     for row in rows:
@@ -158,8 +77,8 @@ def get_event_details(event_types: List[str], trainer: Optional[str], period: st
             event_date = datetime.strptime(event_date_str, '%Y-%m-%d').date()
         except Exception:
             continue
-        mapped = canonicalize(emp_raw, trainer_names)
-        key = mapped if mapped in trainer_names else 'Other'
+        mapped = trainers.canonicalize(emp_raw)
+        key = mapped if mapped in trainers else 'Other'
         # Filter by trainer
         if trainer:
             if trainer == 'Other' and key != 'Other':
@@ -176,6 +95,7 @@ def get_event_details(event_types: List[str], trainer: Optional[str], period: st
 
 # --- API endpoints ---
 @router.get("/first-workout/counts", summary="Get 1st Workout event counts by trainer")
+@cached()
 def first_workout_counts():
     return get_event_counts(FIRST_WORKOUT_TYPES)
 
@@ -184,6 +104,7 @@ def first_workout_details(trainer: Optional[str] = Query(None), period: str = Qu
     return get_event_details(FIRST_WORKOUT_TYPES, trainer, period)
 
 @router.get("/thirtyday-reprogram/counts", summary="Get 30 Day Reprogram event counts by trainer")
+@cached()
 def thirtyday_reprogram_counts():
     return get_event_counts(THIRTYDAY_REPROGRAM_TYPES)
 
@@ -192,6 +113,7 @@ def thirtyday_reprogram_details(trainer: Optional[str] = Query(None), period: st
     return get_event_details(THIRTYDAY_REPROGRAM_TYPES, trainer, period)
 
 @router.get("/other-reprogram/counts", summary="Get Other Reprogram event counts by trainer")
+@cached()
 def other_reprogram_counts():
     return get_event_counts(OTHER_REPROGRAM_TYPES)
 
@@ -201,12 +123,12 @@ def other_reprogram_details(trainer: Optional[str] = Query(None), period: str =
 
 @router.get("/", summary="List all events")
 def list_events(event_type: Optional[str] = Query(None), employee: Optional[str] = Query(None)):
-    if not os.path.exists(DB_PATH):
+    if not storage.has_table("csv_events", "events"):
         return {"events": []}
-    conn = sqlite3.connect(DB_PATH)
+    conn = storage.connect("csv_events")
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
-    query = "SELECT * FROM events WHERE 1=1"
+    query = f"SELECT * FROM {EVENTS_TABLE} WHERE 1=1"
     params = []
     if event_type:
         query += " AND event_type = ?"
@@ -224,17 +146,18 @@ def list_events(event_type: Optional[str] = Query(None), employee: Optional[str]
 
 @router.get("/types", summary="List unique event types")
 def list_event_types():
-    if not os.path.exists(DB_PATH):
+    if not storage.has_table("csv_events", "events"):
         return {"types": []}
-    conn = sqlite3.connect(DB_PATH)
+    conn = storage.connect("csv_events")
     cur = conn.cursor()
-    cur.execute("SELECT DISTINCT event_type FROM events")
+    cur.execute(f"SELECT DISTINCT event_type FROM {EVENTS_TABLE}")
     types = [row[0] for row in cur.fetchall()]
     conn.close()
     return {"types": types} 
 
 @router.get("/abcfinancial", summary="Get events from ABC Financial external API")
 def get_abcfinancial_events():
+    import requests
     url = "https://api.abcfinancial.com/rest/40059/calendars/events?eventDateRange=2025-06-01&page=1"
     headers = {
         "Accept": "application/json;charset=UTF-8",
@@ -249,7 +172,9 @@ def get_abcfinancial_events():
     return data
 
 @router.post("/abcfinancial/fetch", summary="Fetch from ABC Financial API, store in DB, and return data")
+@exclusive("abc_sync")
 def fetch_and_store_abcfinancial_events():
+    import requests
     url = "https://api.abcfinancial.com/rest/40059/calendars/events?eventDateRange=2025-06-01&page=1"
     headers = {
         "Accept": "application/json;charset=UTF-8",
@@ -266,5 +191,10 @@ def fetch_and_store_abcfinancial_events():
     return events
 
 @router.get("/abcfinancial/db", summary="Get all stored ABC Financial events from DB")
-def get_abcfinancial_events_db():
-    return get_abc_events() 
\ No newline at end of file
+def get_abcfinancial_events_db(
+    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    event_name: Optional[str] = Query(None, description="Only events with this eventName"),
+    status: Optional[str] = Query(None, description="Only events with this status"),
+):
+    return get_abc_events(start_date, end_date, event_name, status) 
\ No newline at end of file
@@ -2,106 +2,19 @@
 
 from fastapi import APIRouter
 from datetime import datetime, timedelta
+import logging
 import sqlite3
-import os
 from typing import Dict, List, Set, Tuple
+from app import logs, lookups, storage
+from app.lookups import match_to_sales_staff, normalize_name
 
-router = APIRouter(prefix="/api/first-workouts", tags=["first-workouts"])
+logger = logging.getLogger(__name__)
 
-def normalize_name(name: str) -> str:
-    """Normalize a name for matching purposes"""
-    if not name:
-        return ""
-    
-    # Remove extra spaces and strip
-    name = ' '.join(name.split())
-    
-    # Handle "Last, First" format
-    if "," in name:
-        parts = name.split(",", 1)
-        last = parts[0].strip()
-        first = parts[1].strip() if len(parts) > 1 else ""
-        return f"{first} {last}".lower()
-    
-    return name.lower()
+router = APIRouter(prefix="/api/first-workouts", tags=["first-workouts"])
 
 def get_sales_staff_mapping() -> Dict[str, str]:
-    """Get a mapping of normalized names to original sales staff names"""
-    try:
-        from app.db import query_employees
-        # Try with capitalized column names first (Name, Position)
-        try:
-            sales_staff_rows = query_employees("SELECT Name, Position FROM employees WHERE Position LIKE 'Sales%'")
-            name_field = 'Name'
-        except:
-            # Fallback to lowercase
-            sales_staff_rows = query_employees("SELECT name, position FROM employees WHERE position LIKE 'Sales%'")
-            name_field = 'name'
-        
-        # Create a mapping of normalized names to original names
-        mapping = {}
-        for row in sales_staff_rows:
-            if row.get(name_field):
-                original = row[name_field].strip()
-                normalized = normalize_name(original)
-                mapping[normalized] = original
-                
-                # Also add individual words as keys for partial matching
-                words = normalized.split()
-                for word in words:
-                    if len(word) > 2:  # Skip short words like "jr", "de", etc.
-                        if word not in mapping:
-                            mapping[word] = original
-        
-        print(f"Sales staff mapping: {mapping}")
-        return mapping
-    except Exception as e:
-        print(f"Error getting sales staff: {e}")
-        return {}
-
-def match_to_sales_staff(employee_name: str, sales_mapping: Dict[str, str]) -> str:
-    """
-    Match an employee name to a sales staff member.
-    Returns the original sales staff name if matched, or None if not.
-    """
-    if not employee_name:
-        return None
-    
-    # Normalize the employee name (removes extra spaces)
-    normalized_emp = normalize_name(employee_name)
-    
-    # Check for exact match
-    if normalized_emp in sales_mapping:
-        return sales_mapping[normalized_emp]
-    
-    # Split into words for partial matching
-    emp_words = normalized_emp.split()
-    
-    # Check if any word matches a key in the mapping
-    for word in emp_words:
-        if len(word) > 2 and word in sales_mapping:
-            return sales_mapping[word]
-    
-    # Check for partial matches - if the employee name contains or is contained in a sales staff name
-    for sales_key, sales_original in sales_mapping.items():
-        # Skip single word keys for this check to avoid false positives
-        if ' ' in sales_key:
-            if normalized_emp in sales_key or sales_key in normalized_emp:
-                return sales_original
-    
-    # Last resort: check if first or last name matches
-    if len(emp_words) >= 2:
-        # Try matching just first name or just last name
-        first_name = emp_words[0]
-        last_name = emp_words[-1]
-        
-        for sales_key, sales_original in sales_mapping.items():
-            sales_words = sales_key.split()
-            if len(sales_words) >= 2:
-                if (first_name == sales_words[0] or last_name == sales_words[-1]):
-                    return sales_original
-    
-    return None
+    """Normalized names (and their significant words) -> sales staff name, from the shared index."""
+    return lookups.sales_staff().mapping
 
 @router.get("/counts")
 def get_workout_counts():
@@ -110,39 +23,37 @@ def get_workout_counts():
         today = datetime.now().date()
         yesterday = today - timedelta(days=1)
         first_of_month = today.replace(day=1)
-        print(f"[DEBUG] Today: {today}, Yesterday: {yesterday}, First of month: {first_of_month}")
-        db_path = "firstWorkouts.db"
-        if not os.path.exists(db_path):
+        logger.debug("Today: %s, Yesterday: %s, First of month: %s", today, yesterday, first_of_month)
+        if not storage.has_table("first_workouts", "first_workouts"):
             return {}
-        conn = sqlite3.connect(db_path)
+        conn = storage.connect("first_workouts")
         conn.row_factory = sqlite3.Row
         cur = conn.cursor()
         cur.execute("""
-            SELECT Employee, [Event Date], [Event Status]
-            FROM [first_workouts]
-            WHERE [Event Status] = 'Completed'
+            SELECT Employee, "Event Date", "Event Status"
+            FROM first_workouts
+            WHERE "Event Status" = 'Completed'
         """)
         rows = cur.fetchall()
         conn.close()
-        sales_mapping = get_sales_staff_mapping()
-        print(f"[DEBUG] Sales staff mapping: {sales_mapping}")
+        staff = lookups.sales_staff()
+        trace = logs.sampled(logger)
         raw_counts = {}
         for row in rows:
             employee_raw = row['Employee'] if row['Employee'] else ''
             event_date_str = row['Event Date']
-            print(f"[DEBUG] Row: Employee='{employee_raw}', Event Date='{event_date_str}'")
             if not event_date_str:
                 continue
             try:
                 event_date = datetime.strptime(event_date_str, '%m/%d/%Y').date()
             except Exception as e:
-                print(f"[DEBUG] Could not parse date: {event_date_str} ({e})")
+                trace("Could not parse date: %s (%s)", event_date_str, e)
                 continue
             # if event_date < first_of_month:
             #     print(f"[DEBUG] Skipping event before first of month: {event_date}")
             #     continue
-            matched_staff = match_to_sales_staff(employee_raw, sales_mapping)
-            print(f"[DEBUG] Matched '{employee_raw}' to '{matched_staff}'")
+            matched_staff = staff.match(employee_raw)
+            trace("Row: Employee=%r, Event Date=%r matched %r", employee_raw, event_date_str, matched_staff)
             if matched_staff:
                 employee_key = matched_staff
             else:
@@ -165,10 +76,10 @@ def get_workout_counts():
                 else:
                     normalized_key = key
             counts[normalized_key] = value
-        print(f"[DEBUG] Final counts: {counts}")
+        logger.debug("Final counts: %s", counts)
         return counts
-    except Exception as e:
-        print(f"Error in get_workout_counts: {e}")
+    except Exception:
+        logger.exception("get_workout_counts failed")
         return {}
 
 @router.get("/details/{employee}/{period}")
@@ -184,26 +95,25 @@ def get_workout_details(employee: str, period: str):
         first_of_month = today.replace(day=1)
         
         # Connect to database
-        db_path = "firstWorkouts.db"
-        if not os.path.exists(db_path):
+        if not storage.has_table("first_workouts", "first_workouts"):
             return {'details': []}
         
-        conn = sqlite3.connect(db_path)
+        conn = storage.connect("first_workouts")
         conn.row_factory = sqlite3.Row
         cur = conn.cursor()
         
         # Get all completed workouts with all needed fields
         cur.execute("""
-            SELECT rowid, [Agreement #], [Member Name (last, first)], Employee, [Event Date], [Event Status]
-            FROM [first_workouts]
-            WHERE [Event Status] = 'Completed'
+            SELECT rowid, "Agreement #", "Member Name (last, first)", Employee, "Event Date", "Event Status"
+            FROM first_workouts
+            WHERE "Event Status" = 'Completed'
         """)
         
         rows = cur.fetchall()
         conn.close()
         
         # Get sales staff mapping
-        sales_mapping = get_sales_staff_mapping()
+        staff = lookups.sales_staff()
         
         # Filter and process results
         results = []
@@ -231,7 +141,7 @@ def get_workout_details(employee: str, period: str):
             #     continue
             
             # Match employee
-            matched_staff = match_to_sales_staff(emp_raw, sales_mapping)
+            matched_staff = staff.match(emp_raw)
             
             # Normalize the matched staff name to "First Last" format for comparison
             if matched_staff and matched_staff != 'Other':
@@ -265,10 +175,8 @@ def get_workout_details(employee: str, period: str):
         
         return {'details': results}
         
-    except Exception as e:
-        print(f"Error getting workout details: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Error getting workout details")
         return {'details': []}
 
 @router.get("/debug/sales-staff")
@@ -303,17 +211,16 @@ def debug_matching():
             sales_staff_list = []
         
         # Get some workout employees
-        db_path = "firstWorkouts.db"
-        if not os.path.exists(db_path):
+        if not storage.has_table("first_workouts", "first_workouts"):
             return {'error': 'Database not found'}
         
-        conn = sqlite3.connect(db_path)
+        conn = storage.connect("first_workouts")
         conn.row_factory = sqlite3.Row
         cur = conn.cursor()
         
         cur.execute("""
             SELECT DISTINCT Employee
-            FROM [first_workouts]
+            FROM first_workouts
             WHERE Employee IS NOT NULL AND Employee != ''
             LIMIT 20
         """)
@@ -352,16 +259,15 @@ def reassign_workout(workout_data: dict):
             return {'success': False, 'error': 'workout_id and new_employee are required'}
         
         # Connect to database
-        db_path = "firstWorkouts.db"
-        if not os.path.exists(db_path):
+        if not storage.has_table("first_workouts", "first_workouts"):
             return {'success': False, 'error': 'Database not found'}
         
-        conn = sqlite3.connect(db_path)
+        conn = storage.connect("first_workouts")
         cur = conn.cursor()
         
         # Update the employee
         cur.execute("""
-            UPDATE [first_workouts]
+            UPDATE first_workouts
             SET Employee = ?
             WHERE rowid = ?
         """, (new_employee, int(workout_id)))
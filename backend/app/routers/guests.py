@@ -3,20 +3,21 @@
 from fastapi import APIRouter, HTTPException
 from typing import Dict, List, Any
 import sqlite3
-import os
 import datetime
 
-from app.db import GUESTS_DB_PATH  # make sure this points at your guests.db
+from app import storage
+from app.cache import cached
 
 router = APIRouter(prefix="/api/guests", tags=["guests"])
 
 @router.get("/visit-types", response_model=Dict[str, Any])
+@cached()
 def get_guest_visit_type_counts():
     try:
-        if not os.path.exists(GUESTS_DB_PATH):
+        if not storage.has_table("guests", "guests"):
             raise HTTPException(status_code=404, detail="Guests database not found.")
         
-        conn = sqlite3.connect(GUESTS_DB_PATH)
+        conn = storage.connect("guests")
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -61,9 +62,10 @@ def get_guest_visit_type_counts():
 # backend/app/routers/guests.py
 
 @router.get("/by-source")
+@cached()
 def get_guests_by_source(day: str, source: str):
     try:
-        if not os.path.exists(GUESTS_DB_PATH):
+        if not storage.has_table("guests", "guests"):
             raise HTTPException(status_code=404, detail="Database not found.")
 
         source_map = {
@@ -84,7 +86,7 @@ def get_guests_by_source(day: str, source: str):
             date_str = datetime.datetime.now() - datetime.timedelta(days=1)
             query_date_filter = f"AND SUBSTR(created_at, 1, 10) = '{date_str.strftime('%Y-%m-%d')}'"
 
-        conn = sqlite3.connect(GUESTS_DB_PATH)
+        conn = storage.connect("guests")
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -106,10 +108,10 @@ def get_guests_by_source(day: str, source: str):
 def get_all_guests():
     """Get all guest entries"""
     try:
-        if not os.path.exists(GUESTS_DB_PATH):
+        if not storage.has_table("guests", "guests"):
             raise HTTPException(status_code=404, detail="Guests database not found.")
         
-        conn = sqlite3.connect(GUESTS_DB_PATH)
+        conn = storage.connect("guests")
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse
+from app import warmup
+
+router = APIRouter(prefix="/api/health", tags=["health"])
+
+@router.get("/ready")
+def readiness(warm: bool = Query(False, description="Also wait for the optional warm-up steps (heavy imports)")):
+    """
+    503 until the startup hook (schema migrations) and the required warm-up
+    (connections, lookup indexes, dashboard snapshot) have finished, 200 after.
+    The body reports boot time and each warm-up step's progress.
+    """
+    status = warmup.status()
+    ready = status["status"] == "ready" and (status["warmed"] or not warm)
+    return JSONResponse(status, status_code=200 if ready else 503)
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, Body
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Body, Query
+from typing import List, Dict, Any, Optional
+import datetime
 import sqlite3
 
-from app.db import query_kpi, execute_kpi
+from app import kpi, storage
+from app.db import query_kpi, execute_kpi, aquery_kpi
+from app.cache import cached
 
 router = APIRouter(
     prefix="/api/kpi",
@@ -11,16 +14,17 @@ router = APIRouter(
 )
 
 @router.get("/goals")
-def get_kpi_goals():
+@cached()
+async def get_kpi_goals():
     try:
-        return query_kpi("SELECT * FROM kpi_goals ORDER BY id")
+        return await aquery_kpi("SELECT * FROM kpi_goals ORDER BY id")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/goals/{metric_name}")
-def get_kpi_goal_by_metric(metric_name: str):
+async def get_kpi_goal_by_metric(metric_name: str):
     try:
-        results = query_kpi(
+        results = await aquery_kpi(
             "SELECT * FROM kpi_goals WHERE metric_name = ?",
             (metric_name,)
         )
@@ -77,40 +81,53 @@ def delete_kpi_goal(metric_name: str):
 
 @router.post("/goals/bulk-update")
 def bulk_update_kpi_goals(data: List[Dict[str, Any]] = Body(...)):
+    """
+    Update every {"metric_name", "goal_value"} item in one transaction, with
+    a result per item. Any invalid item rejects the whole batch (400) before
+    anything is written; unknown metric names are reported as not_found. The
+    response cache is cleared once, after the commit.
+    """
     try:
-        for item in data:
-            name = item.get("metric_name")
-            val  = item.get("goal_value")
-            if name and val is not None:
-                execute_kpi(
-                    """
-                    UPDATE kpi_goals
-                    SET goal_value = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE metric_name = ?
-                    """,
-                    (val, name)
-                )
-        return {"success": True, "updated_count": len(data)}
+        results = kpi.update_goals(data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if any(r["status"] == "invalid" for r in results):
+        raise HTTPException(status_code=400, detail={"error": "metric_name and a numeric goal_value are required",
+                                                     "results": results})
+    return {
+        "success": True,
+        "updated_count": sum(r["status"] == "updated" for r in results),
+        "results": results,
+    }
 
 @router.get("/pt-quotas")
-def get_pt_quotas():
+@cached()
+async def get_pt_quotas():
     try:
-        quota_keys = [
-            "nbpromo_quota_gm", "nbpromo_quota_agm",
-            "fept_quota_gm", "fept_quota_agm",
-            "pt_quota_new_fd", "pt_quota_renew_fd",
-            "pt_quota_new_wfd", "pt_quota_renew_wfd",
-            "neweft_quota_gm", "neweft_quota_agm",
-            "collections_quota", "pif_renewals_quota",
-            "abc_dues_quota",
-            "coordinator_bonus_quota"
-        ]
-        results = query_kpi(
+        quota_keys = list(kpi.GOALS)
+        results = await aquery_kpi(
             f"SELECT metric_name, goal_value FROM kpi_goals WHERE metric_name IN ({','.join(['?']*len(quota_keys))})",
             tuple(quota_keys)
         )
         return {row["metric_name"]: row["goal_value"] for row in results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/progress", summary="Month-to-date actual, pace and projection for every KPI goal")
+@cached()
+def get_kpi_progress(
+    as_of: Optional[datetime.date] = Query(None, description="Day to report on (default: today)"),
+) -> Dict[str, Any]:
+    """
+    One entry per quota in `goals`: the goal value, the month-to-date actual
+    over the goal's days of the week, yesterday's figure, pace per elapsed
+    day and the projected month end, with both as a percent of the goal.
+    `totals` has every measure month to date over all days; `unmapped`
+    lists goals in kpi_goals that no measure is registered for.
+    """
+    if not storage.has_table("sales", "sales"):
+        raise HTTPException(status_code=404, detail="No sales data imported yet.")
+    goals = {row["metric_name"]: row["goal_value"] for row in query_kpi("SELECT metric_name, goal_value FROM kpi_goals")}
+    result = kpi.evaluate(goals, as_of)
+    result["unmapped"] = sorted(set(goals) - set(kpi.GOALS))
+    return result
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional
+import asyncio
+import json
+
+from app import bus, cache
+from app.config import settings
+
+router = APIRouter(prefix="/api/live", tags=["live"])
+
+# Reconnect delay EventSource clients are told to use
+RETRY_MS = 5000
+
+def _event(name: str, generation: int, data: dict) -> str:
+    return f"id: {generation}\nevent: {name}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("", summary="Server-Sent Events stream announcing data changes")
+async def live_updates(
+    topics: Optional[str] = Query(None, description=f"Comma-separated, any of: {', '.join(bus.TOPICS)} (default: all)"),
+    since: Optional[int] = Query(None, description="Also announce changes after this generation (as Last-Event-ID)"),
+    last_event_id: Optional[int] = Header(None),
+):
+    """
+    A `ready` event with the current cache generation, then a `change`
+    event {"topic", "generation"} when a topic's data changes; changes to a
+    topic the client has not read yet fold into one. Event ids are
+    generations, so a reconnecting EventSource resumes with the topics it
+    missed. Clients refetch what a topic covers; sales consumers can ask
+    /api/changes for the exact rows.
+    """
+    wanted = {t.strip() for t in topics.split(",") if t.strip()} if topics else None
+    unknown = sorted((wanted or set()) - set(bus.TOPICS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topics {', '.join(unknown)}. Available: {', '.join(bus.TOPICS)}")
+    subscriber = bus.subscribe(wanted)
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many live clients.")
+    try:
+        generation = await asyncio.to_thread(cache.generation)
+        resume = last_event_id if last_event_id is not None else since
+        if resume is not None and resume < generation:
+            for topic, changed in (await asyncio.to_thread(cache.changed_topics, resume)).items():
+                subscriber.offer(topic, changed)
+            # Until the replayed changes are read, a reconnect has to ask for them again
+            ready_id = resume
+        else:
+            ready_id = generation
+    except Exception:
+        bus.unsubscribe(subscriber)
+        raise
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            yield f"retry: {RETRY_MS}\n" + _event("ready", ready_id, {"generation": generation, "topics": sorted(wanted or bus.TOPICS)})
+            while True:
+                messages = await subscriber.next(settings.LIVE_HEARTBEAT_SECONDS)
+                if not messages:
+                    yield ": ping\n\n"
+                for message in messages:
+                    yield _event("change", message["generation"], message)
+        finally:
+            bus.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
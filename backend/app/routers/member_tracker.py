@@ -1,43 +1,31 @@
-from fastapi import APIRouter, Query, Depends
+from fastapi import APIRouter, Query
 from typing import List, Dict, Any, Optional
-from app.db import get_db_session, _connect_sqlite
-from app.config import settings
-from sqlalchemy.orm import Session
+from contextlib import contextmanager
+from app.db import run_analytic
+from app import storage
 import sqlite3
-import os
 
 router = APIRouter(
     prefix="/api/member-tracker",
     tags=["Member Tracker"],
 )
 
-def get_db_connection():
+@contextmanager
+def member_tracker_connection():
     """
-    Dependency that provides a database connection.
-    - For production (PostgreSQL), it yields a SQLAlchemy session.
-    - For local dev (SQLite), it yields a standard sqlite3 connection with members.db attached.
+    Provide one connection that sees events and members: a pooled PostgreSQL
+    connection in production, a SQLite connection locally.
+    The connection is opened and closed on the thread that runs the query.
     """
-    if settings.DATABASE_URL:
-        # Production: Use the PostgreSQL session from the connection pool
-        db = next(get_db_session())
-        try:
-            yield db
-        finally:
-            db.close()
-    else:
-        # Local development: Use the original SQLite connection method
-        db_path = os.path.join(os.path.dirname(__file__), '..', '..', 'structured_events.db')
-        members_db_path = os.path.join(os.path.dirname(__file__), '..', '..', 'members.db')
-
-        conn = _connect_sqlite(db_path)
-        conn.execute(f"ATTACH DATABASE '{members_db_path}' AS members_db")
-        try:
-            yield conn
-        finally:
-            conn.close()
+    conn = storage.connect("structured_events", "members", must_exist=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        conn.close()
 
 @router.get("/data", summary="Get comprehensive, paginated data for the Member Tracker")
-def get_member_tracker_data(
+async def get_member_tracker_data(
     page: Optional[int] = Query(1, description="Page number for pagination"),
     page_size: Optional[int] = Query(25, description="Page size for pagination. Set to a very high number or 0 to fetch all."),
     sort_by: Optional[str] = Query('dateEnrolled'),
@@ -45,13 +33,27 @@ def get_member_tracker_data(
     selected_month: Optional[str] = Query(None),
     selected_year: Optional[int] = Query(None),
     search_term: Optional[str] = Query(None),
-    conn: Session = Depends(get_db_connection)
 ):
     """
     This high-performance endpoint drives the Member Tracker page.
     - It joins members with their events directly in the database.
     - It supports pagination, sorting, and filtering by month, year, and search term.
+    The query runs on the analytic executor so it cannot starve cheap lookups.
     """
+    return await run_analytic(
+        load_member_tracker_data, page, page_size, sort_by, sort_order,
+        selected_month, selected_year, search_term
+    )
+
+def load_member_tracker_data(
+    page: Optional[int],
+    page_size: Optional[int],
+    sort_by: Optional[str],
+    sort_order: Optional[str],
+    selected_month: Optional[str],
+    selected_year: Optional[int],
+    search_term: Optional[str],
+) -> Dict[str, Any]:
     # Base query joining members with their various events using LEFT JOINs
     # This is the most critical part of the performance enhancement.
     query = """
@@ -134,12 +136,12 @@ def get_member_tracker_data(
     if selected_year:
         if selected_month and selected_month != 'All' and selected_month in months_map:
             # Filter by specific month and year
-            filters.append("strftime('%m', m.sinceDate) = :month AND strftime('%Y', m.sinceDate) = :year")
+            filters.append(f"{storage.date_part('month', 'm.sinceDate')} = :month AND {storage.date_part('year', 'm.sinceDate')} = :year")
             params['month'] = months_map[selected_month]
             params['year'] = str(selected_year)
         else:
             # Filter by year only (when "All" months is selected)
-            filters.append("strftime('%Y', m.sinceDate) = :year")
+            filters.append(f"{storage.date_part('year', 'm.sinceDate')} = :year")
             params['year'] = str(selected_year)
 
     # Exclude membershipType = 'Prospect'
@@ -147,7 +149,11 @@ def get_member_tracker_data(
 
     # Search term filtering
     if search_term:
-        filters.append("(m.firstName LIKE :search OR m.lastName LIKE :search OR m.agreementNumber LIKE :search OR m.primaryPhone LIKE :search)")
+        like = storage.like()
+        filters.append(
+            f"(m.firstName {like} :search OR m.lastName {like} :search "
+            f"OR m.agreementNumber {like} :search OR m.primaryPhone {like} :search)"
+        )
         params['search'] = f"%{search_term}%"
 
     if filters:
@@ -174,20 +180,21 @@ def get_member_tracker_data(
         params['page_size'] = page_size
         params['offset'] = offset
 
-    # Execute main query
-    cursor = conn.execute(query, params)
-    rows = [dict(row) for row in cursor.fetchall()]
+    with member_tracker_connection() as conn:
+        # Execute main query
+        cursor = conn.execute(query, params)
+        rows = [dict(row) for row in cursor.fetchall()]
+
+        # --- Total Count Query (for pagination) ---
+        count_query = "SELECT COUNT(m.memberId) FROM members AS m"
+        if filters:
+            # We must remove the parameter bindings that are not used in the count query
+            count_params = {k: v for k, v in params.items() if k not in ['page_size', 'offset']}
+            count_query += " WHERE " + " AND ".join(filters)
+            cursor.execute(count_query, count_params)
+        else:
+            cursor.execute(count_query)
+
+        total_records = cursor.fetchone()[0]
 
-    # --- Total Count Query (for pagination) ---
-    count_query = "SELECT COUNT(m.memberId) FROM members AS m"
-    if filters:
-        # We must remove the parameter bindings that are not used in the count query
-        count_params = {k: v for k, v in params.items() if k not in ['page_size', 'offset']}
-        count_query += " WHERE " + " AND ".join(filters)
-        cursor.execute(count_query, count_params)
-    else:
-        cursor.execute(count_query)
-        
-    total_records = cursor.fetchone()[0]
-    
     return {"data": rows, "total": total_records} 
\ No newline at end of file
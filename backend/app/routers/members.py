@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Query
 from app.db import insert_members, get_members, get_members_paginated, search_members
-import requests
+from app.jobs import exclusive
 
 router = APIRouter(prefix="/api/members", tags=["members"])
 
@@ -10,7 +10,9 @@ APP_KEY = 'cdfeca15a4deee7bfe9c2962238b777c'
 MEMBER_SINCE_DATE_RANGE = '2022-03-01'
 
 @router.post("/fetch", summary="Fetch all members from ABC Financial API, store in DB, and return new members")
+@exclusive("abc_sync")
 def fetch_and_store_members():
+    import requests
     page = 1
     all_new_members = []
     while True:
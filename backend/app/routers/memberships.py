@@ -1,18 +1,20 @@
 from fastapi import APIRouter, HTTPException, Body
 from typing import List, Dict, Any
-from app.db import query_memberships, execute_memberships
+from app.db import query_memberships, execute_memberships, aquery_memberships
+from app.cache import cached
 
 router = APIRouter(prefix="/api/memberships", tags=["memberships"])
 
 @router.get("", response_model=List[Dict[str, Any]])
-def list_memberships():
-    return query_memberships(
+@cached()
+async def list_memberships():
+    return await aquery_memberships(
         "SELECT id, membership_type, price, other_names FROM memberships ORDER BY id"
     )
 
 @router.get("/{membership_id}", response_model=Dict[str, Any])
-def get_membership(membership_id: int):
-    rows = query_memberships(
+async def get_membership(membership_id: int):
+    rows = await aquery_memberships(
         "SELECT id, membership_type, price, other_names FROM memberships WHERE id = ?",
         (membership_id,)
     )
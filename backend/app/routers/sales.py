@@ -1,16 +1,17 @@
 # app/routers/sales.py
 
-from fastapi import APIRouter, HTTPException, Body, UploadFile, File, Form
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Body, UploadFile, File, Form, Query
+from typing import List, Dict, Any, Optional
 import sqlite3
 import datetime
-from app.db import DB_PATH, query_db, execute_db
+from app import aggregates, changes, generations, storage
+from app.db import query_db, transaction
+from app.jobs import exclusive
 from fastapi.responses import StreamingResponse, JSONResponse
+from app.cache import cached
 import io
 import csv
-import pandas as pd
 import os
-import shutil
 
 router = APIRouter(prefix="/api/sales", tags=["sales"])
 
@@ -22,6 +23,7 @@ ALLOWED_CSVS = {
 }
 
 @router.get("/stats")
+@cached()
 def get_summary():
     return query_db("""
         SELECT
@@ -91,12 +93,13 @@ def load_raw(csv_path: str = Body(..., embed=True)):
         raise HTTPException(status_code=404, detail="CSV file not found")
     df = pd.read_csv(csv_path)
     df["source_date"] = datetime.date.today().isoformat()
-    conn = sqlite3.connect(DB_PATH)
-    df.to_sql("raw_sales", conn, if_exists="append", index=False)
+    conn = storage.connect("sales")
+    storage.write_frame(df, "raw_sales", conn, if_exists="append")
     conn.close()
     return {"success": True, "rows_loaded": len(df)}
 
 @router.get("/nb-cash-entries")
+@cached()
 def nb_cash_entries():
     """
     Return all sales for NB Cash tracking:
@@ -122,9 +125,14 @@ def nb_cash_entries():
     """)
 
 @router.get("/all")
+@cached()
 def all_sales():
     return query_db("SELECT * FROM sales ORDER BY sale_id")
 
+def _sale(conn, sale_id: str) -> Optional[Dict[str, Any]]:
+    row = conn.execute("SELECT * FROM sales WHERE sale_id = ?", (sale_id,)).fetchone()
+    return dict(row) if row is not None else None
+
 @router.put("/{sale_id}")
 def update_sale(sale_id: str, data: Dict[str, Any] = Body(...)):
     allowed = {
@@ -142,7 +150,11 @@ def update_sale(sale_id: str, data: Dict[str, Any] = Body(...)):
     if not updates:
         raise HTTPException(status_code=400, detail="Nothing valid to update.")
     vals.append(sale_id)
-    execute_db(f"UPDATE sales SET {', '.join(updates)} WHERE sale_id = ?", tuple(vals))
+    with transaction("sales") as conn:
+        old = _sale(conn, sale_id)
+        conn.execute(f"UPDATE sales SET {', '.join(updates)} WHERE sale_id = ?", tuple(vals))
+        if old is not None:
+            changes.record(conn, sale_id, "update", old, _sale(conn, sale_id))
     return {"success": True}
 
 @router.post("")
@@ -152,80 +164,96 @@ def create_sale(data: Dict[str, Any] = Body(...)):
         raise HTTPException(status_code=400, detail="Missing required sale fields.")
     cols, vals = list(data.keys()), list(data.values())
     placeholders = ",".join("?" for _ in cols)
-    execute_db(f"INSERT INTO sales ({','.join(cols)}) VALUES ({placeholders})", tuple(vals))
+    with transaction("sales") as conn:
+        conn.execute(f"INSERT INTO sales ({','.join(cols)}) VALUES ({placeholders})", tuple(vals))
+        sale_id = data.get("sale_id")
+        new = _sale(conn, sale_id) if sale_id is not None else None
+        changes.record(conn, sale_id, "insert", None, new or data)
     return {"success": True}
 
 @router.delete("/{sale_id}")
 def delete_sale(sale_id: str):
-    execute_db("DELETE FROM sales WHERE sale_id = ?", (sale_id,))
+    with transaction("sales") as conn:
+        old = _sale(conn, sale_id)
+        conn.execute("DELETE FROM sales WHERE sale_id = ?", (sale_id,))
+        if old is not None:
+            changes.record(conn, sale_id, "delete", old, None)
     return {"success": True}
 
+@router.get("/aggregate")
+@cached()
+def aggregate_sales(
+    start: Optional[datetime.date] = Query(None, description="First payment date (default: first of end's month)"),
+    end: Optional[datetime.date] = Query(None, description="Last payment date, inclusive (default: today)"),
+    group_by: Optional[str] = Query(None, description="Comma-separated: profit_center, sales_person, main_item, day, week, month"),
+    profit_center: List[str] = Query([]),
+    sales_person: List[str] = Query([]),
+    main_item: List[str] = Query([]),
+    main_item_prefix: List[str] = Query([]),
+    exclude_main_item: List[str] = Query([], description="Drop sales whose main item contains this"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+):
+    """
+    Count and total of sales between two payment dates, optionally grouped and
+    filtered; repeat a filter parameter to match any of several values. Rows
+    come back in group order; `total` covers the whole range.
+    """
+    end = end or datetime.date.today()
+    start = start or end.replace(day=1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start is after end.")
+    groups = [g.strip() for g in group_by.split(",") if g.strip()] if group_by else []
+    where = aggregates.SalesFilter(
+        profit_centers=profit_center, sales_people=sales_person, main_items=main_item,
+        main_item_prefixes=main_item_prefix, exclude_main_items=exclude_main_item,
+        min_amount=min_amount, max_amount=max_amount,
+    )
+    try:
+        rows = aggregates.sales_totals(start, end, groups, where)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "group_by": groups,
+        "rows": rows,
+        "sales": sum(r["sales"] for r in rows),
+        "total": round(sum(r["total"] for r in rows), 2),
+    }
+
 @router.get("/nb-promo")
+@cached()
 def get_nb_promo_totals():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    mtd = cur.execute(
-        "SELECT SUM(total_amount) AS mtd_total FROM sales WHERE profit_center='New Business'"
-    ).fetchone()["mtd_total"] or 0.0
-    yesterday = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
-    yesterday_total = cur.execute(
-        """
-        SELECT SUM(total_amount) AS yesterday_total
-        FROM sales
-        WHERE profit_center='New Business'
-          AND latest_payment_date = ?
-        """, (yesterday,)
-    ).fetchone()["yesterday_total"] or 0.0
-    conn.close()
-    return {"mtd": round(mtd,2), "nb_yesterday": round(yesterday_total,2)}
+    yesterday, first_of_month = aggregates.yesterday_and_first_of_month()
+    new_business = aggregates.SalesFilter(profit_centers=["New Business"])
+    return {
+        "mtd": aggregates.sales_total(first_of_month, None, new_business),
+        "nb_yesterday": aggregates.sales_total(yesterday, yesterday, new_business),
+    }
 
 @router.get("/promo-only")
+@cached()
 def get_promo_totals():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    mtd = cur.execute(
-        """
-        SELECT SUM(total_amount) AS mtd_total FROM sales
-        WHERE profit_center='Promotion'
-          AND (main_item IS NULL OR main_item NOT LIKE '%Downgrade%')
-        """
-    ).fetchone()["mtd_total"] or 0.0
-    yesterday = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
-    yesterday_total = cur.execute(
-        """
-        SELECT SUM(total_amount) AS yesterday_total
-        FROM sales
-        WHERE profit_center='Promotion'
-          AND latest_payment_date = ?
-          AND (main_item IS NULL OR main_item NOT LIKE '%Downgrade%')
-        """,
-        (yesterday,)
-    ).fetchone()["yesterday_total"] or 0.0
-    conn.close()
-    return {"mtd": round(mtd,2), "promo_yesterday": round(yesterday_total,2)}
+    yesterday, first_of_month = aggregates.yesterday_and_first_of_month()
+    promotions = aggregates.SalesFilter(profit_centers=["Promotion"], exclude_main_items=["Downgrade"])
+    return {
+        "mtd": aggregates.sales_total(first_of_month, None, promotions),
+        "promo_yesterday": aggregates.sales_total(yesterday, yesterday, promotions),
+    }
 
 @router.get("/abc-sections", response_model=Dict[str, float])
 def get_abc_sections():
     """
     Return MTD totals for profit_centers A, B, and C—and their combined sum.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    first_of_month = datetime.date.today().replace(day=1).isoformat()
-
-    results: Dict[str, float] = {}
-    for section in ["A", "B", "C"]:
-        cur.execute(
-            "SELECT SUM(total_amount) AS total_mtd "
-            "FROM sales "
-            "WHERE profit_center = ? AND latest_payment_date >= ?",
-            (section, first_of_month)
-        )
-        val = cur.fetchone()["total_mtd"] or 0.0
-        results[f"total_{section}_mtd"] = float(val)
+    _, first_of_month = aggregates.yesterday_and_first_of_month()
+    sections = ["A", "B", "C"]
+    rows = aggregates.sales_totals(
+        first_of_month, None, ["profit_center"], aggregates.SalesFilter(profit_centers=sections)
+    )
+    totals = {r["profit_center"]: r["total"] for r in rows}
+    results: Dict[str, float] = {f"total_{section}_mtd": float(totals.get(section, 0.0)) for section in sections}
 
     # Add combined A+B+C total
     results["total_abc_mtd"] = (
@@ -233,8 +261,6 @@ def get_abc_sections():
       + results["total_B_mtd"]
       + results["total_C_mtd"]
     )
-
-    conn.close()
     return results
 
 # Debug endpoint to check what's in the database
@@ -305,7 +331,7 @@ def export_sales_csv():
     """
     Export the entire sales table as a CSV file.
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = storage.connect("sales")
     cur = conn.cursor()
     cur.execute("SELECT * FROM sales")
     rows = cur.fetchall()
@@ -330,57 +356,49 @@ def export_sales_csv():
     })
 
 @router.post("/import-csv")
+@exclusive("sales_import")
 def import_sales_csv(file: UploadFile = File(...)):
     """
-    Replace the sales table with the uploaded CSV file. Backs up the DB file before replacing.
+    Replace the sales table with the uploaded CSV file. The table it replaces
+    is kept as an earlier generation for /undo-import (app/generations.py).
     """
+    import pandas as pd
     try:
-        # Backup DB file first
-        db_path = DB_PATH
-        backup_path = db_path.replace('.db', '_backup.db')
-        if os.path.exists(db_path):
-            shutil.copy2(db_path, backup_path)
         # Read uploaded file into DataFrame
         df = pd.read_csv(file.file)
         # Validate required columns
         required_cols = {"sale_id", "agreement_number", "member_name", "sales_person", "profit_center", "main_item", "transaction_count", "total_amount", "commission_employees", "latest_payment_date"}
         if not required_cols.issubset(df.columns):
             return JSONResponse(status_code=400, content={"error": f"CSV missing required columns: {required_cols - set(df.columns)}"})
-        # Replace table
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        cur.execute("DELETE FROM sales")
-        conn.commit()
-        df.to_sql("sales", conn, if_exists="append", index=False)
-        conn.close()
-        return {"success": True, "rows": len(df), "undo_available": True}
+        result = generations.load(df, source=file.filename)
+        return {"success": True, "rows": result["rows"], "generation": result["generation"],
+                "undo_available": generations.undo_steps() > 0}
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @router.post("/undo-import")
+@exclusive("sales_import")
 def undo_import():
     """
-    Restore the last backup of the sales DB (undo last import).
+    Make the sales table from before the last import live again; repeat to go
+    further back, up to settings.SALES_IMPORT_GENERATIONS imports.
     """
-    db_path = DB_PATH
-    backup_path = db_path.replace('.db', '_backup.db')
-    if not os.path.exists(backup_path):
-        return JSONResponse(status_code=404, content={"error": "No backup available to restore."})
     try:
-        # Replace the DB file with the backup
-        shutil.copy2(backup_path, db_path)
-        return {"success": True}
+        result = generations.undo()
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
+    if result is None:
+        return JSONResponse(status_code=404, content={"error": "No backup available to restore."})
+    return {"success": True, "generation": result["generation"]}
 
 @router.get("/undo-available")
 def undo_available():
     """
-    Returns {available: true/false} if a backup DB exists for undo.
+    {available, steps}: whether /undo-import has an earlier sales table to
+    restore, and how many times it can be undone in a row.
     """
-    db_path = DB_PATH
-    backup_path = db_path.replace('.db', '_backup.db')
-    return {"available": os.path.exists(backup_path)}
+    steps = generations.undo_steps()
+    return {"available": steps > 0, "steps": steps}
 
 @router.post("/upload-csv")
 def upload_csv(file: UploadFile = File(...), filename: str = Form(...)):
@@ -406,62 +424,29 @@ def check_csv(filename: str):
         return JSONResponse(status_code=404, content={"exists": False})
 
 @router.get("/collections-dues")
+@cached()
 def get_collections_dues():
     """
     Return sum of total_amount for all sales with profit_center containing 'POS Dues' (case-insensitive)
     for yesterday (today) and month-to-date (mtd).
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    yesterday = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
-    first_of_month = datetime.date.today().replace(day=1).isoformat()
-    # Case-insensitive, trimmed match for 'POS Dues'
-    mtd = cur.execute(
-        """
-        SELECT SUM(total_amount) AS mtd_total FROM sales
-        WHERE LOWER(TRIM(profit_center)) LIKE '%pos dues%'
-          AND latest_payment_date >= ?
-        """,
-        (first_of_month,)
-    ).fetchone()["mtd_total"] or 0.0
-    today = cur.execute(
-        """
-        SELECT SUM(total_amount) AS today_total FROM sales
-        WHERE LOWER(TRIM(profit_center)) LIKE '%pos dues%'
-          AND latest_payment_date = ?
-        """,
-        (yesterday,)
-    ).fetchone()["today_total"] or 0.0
-    conn.close()
-    return {"today": round(today, 2), "mtd": round(mtd, 2)}
+    yesterday, first_of_month = aggregates.yesterday_and_first_of_month()
+    pos_dues = aggregates.SalesFilter(profit_center_contains=["pos dues"])
+    return {
+        "today": aggregates.sales_total(yesterday, yesterday, pos_dues),
+        "mtd": aggregates.sales_total(first_of_month, None, pos_dues),
+    }
 
 @router.get("/pif-renewals-dues")
+@cached()
 def get_pif_renewals_dues():
     """
     Return sum of total_amount for all sales with profit_center = 'PIF Renewals'
     for yesterday (today) and month-to-date (mtd).
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    yesterday = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
-    first_of_month = datetime.date.today().replace(day=1).isoformat()
-    mtd = cur.execute(
-        """
-        SELECT SUM(total_amount) AS mtd_total FROM sales
-        WHERE profit_center = 'PIF Renewals'
-          AND latest_payment_date >= ?
-        """,
-        (first_of_month,)
-    ).fetchone()["mtd_total"] or 0.0
-    today = cur.execute(
-        """
-        SELECT SUM(total_amount) AS today_total FROM sales
-        WHERE profit_center = 'PIF Renewals'
-          AND latest_payment_date = ?
-        """,
-        (yesterday,)
-    ).fetchone()["today_total"] or 0.0
-    conn.close()
-    return {"today": round(today, 2), "mtd": round(mtd, 2)}
\ No newline at end of file
+    yesterday, first_of_month = aggregates.yesterday_and_first_of_month()
+    pif_renewals = aggregates.SalesFilter(profit_centers=["PIF Renewals"])
+    return {
+        "today": aggregates.sales_total(yesterday, yesterday, pif_renewals),
+        "mtd": aggregates.sales_total(first_of_month, None, pif_renewals),
+    }
\ No newline at end of file
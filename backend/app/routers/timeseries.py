@@ -0,0 +1,73 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Any, Dict, Optional
+import datetime
+
+from app import storage, timeseries
+from app.cache import cached
+
+router = APIRouter(prefix="/api/timeseries", tags=["timeseries"])
+
+# Buckets returned when no start is given
+DEFAULT_BUCKETS = 30
+MAX_BUCKETS = 1000
+
+def _default_start(end: datetime.date, interval: str) -> datetime.date:
+    first = timeseries.bucket_start(end, interval)
+    if interval == "day":
+        return first - datetime.timedelta(days=DEFAULT_BUCKETS - 1)
+    if interval == "week":
+        return first - datetime.timedelta(weeks=DEFAULT_BUCKETS - 1)
+    months = first.year * 12 + first.month - 1 - (DEFAULT_BUCKETS - 1)
+    return datetime.date(months // 12, months % 12 + 1, 1)
+
+@router.get("", summary="List the available time series")
+def list_metrics() -> Dict[str, str]:
+    return {name: metric.description for name, metric in timeseries.METRICS.items()}
+
+@router.get("/{metric}", summary="Dense daily, weekly or monthly series with the same range a year earlier")
+@cached()
+def get_timeseries(
+    metric: str,
+    start: Optional[datetime.date] = Query(None, description=f"First day (default: {DEFAULT_BUCKETS} buckets before end)"),
+    end: Optional[datetime.date] = Query(None, description="Last day, inclusive (default: today)"),
+    interval: str = Query("day", description="day, week (Monday-based) or month"),
+    compare: bool = Query(True, description="Also return the same range a year earlier"),
+) -> Dict[str, Any]:
+    """
+    One value per bucket for every series of the metric: cash totals for the
+    sales metrics, counts for guests (one series per source) and completed
+    events. Buckets are labelled with their first day; the previous-year block
+    lines up bucket for bucket.
+    """
+    if metric not in timeseries.METRICS:
+        raise HTTPException(status_code=404, detail=f"Unknown metric {metric}. Available: {', '.join(timeseries.METRICS)}")
+    if interval not in timeseries.INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(timeseries.INTERVALS)}")
+    end = end or datetime.date.today()
+    start = start or _default_start(end, interval)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start is after end.")
+    if len(timeseries.buckets(start, end, interval)) > MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"More than {MAX_BUCKETS} buckets; use a wider interval.")
+
+    source = timeseries.METRICS[metric]
+    if not storage.has_table(source.domain, source.table):
+        raise HTTPException(status_code=404, detail=f"No {source.table} data imported yet.")
+    timeseries.ensure_fresh(metric)
+
+    result = {
+        "metric": metric,
+        "description": source.description,
+        "interval": interval,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        **timeseries.read(metric, start, end, interval),
+    }
+    if compare:
+        prev_start, prev_end = timeseries.previous_year(start, end, interval)
+        result["previous_year"] = {
+            "start": prev_start.isoformat(),
+            "end": prev_end.isoformat(),
+            **timeseries.read(metric, prev_start, prev_end, interval),
+        }
+    return result
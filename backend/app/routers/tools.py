@@ -1,13 +1,24 @@
 from fastapi import APIRouter
-from app.scripts import process_guests, process_sales  # ✅ correct import
-
+from app import schema
 
+# The processors pull in pandas and openpyxl, so each is imported on first run rather than at startup
 router = APIRouter(prefix="/api/tools", tags=["tools"])
 
 @router.post("/process-guests")
 def run_guest_processor():
+    from app.scripts import process_guests
     return process_guests.run()
 
 @router.post("/process-sales")
 def run_sales_processor():
-    return process_sales.run()
\ No newline at end of file
+    from app.scripts import process_sales
+    result = process_sales.run()
+    schema.imported("sales")  # the first import creates the tables the sales indexes wait for
+    return result
+
+@router.post("/process-attrition")
+def run_attrition_ingest():
+    from app.scripts import ingest_attrition
+    result = ingest_attrition.run()
+    schema.imported("attrition")  # the draft retype waits for the first import
+    return result
@@ -1,37 +1,44 @@
 from fastapi import APIRouter, Query
-import sqlite3
 import json
-import os
 from typing import Optional
+from app import pos, storage
+from app.db import prefix_upper_bound
 
 router = APIRouter(prefix="/api/transactions", tags=["transactions"])
 
-DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../sales_data_api.db"))
-MEMBERS_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../members.db"))
-
 @router.get("")
-def get_all_transactions(date: Optional[str] = Query(None, description="Filter by transaction date (YYYY-MM-DD)")):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("SELECT raw_json FROM api_transactions_raw")
-    rows = cur.fetchall()
-    transactions = [json.loads(row[0]) for row in rows]
-    conn.close()
-
-    # Filter by date if provided
+def get_all_transactions(
+    date: Optional[str] = Query(None, description="Filter by transaction date (YYYY-MM-DD) or any timestamp prefix"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(0, ge=0, le=5000, description="Rows per page. 0 returns every matching row."),
+):
+    # pos schema v1 creates and backfills the projection once the POS archive exists
+    if not storage.has_table("pos", pos.TABLE):
+        return []
+    query = f"""
+        SELECT p.raw_json,
+               TRIM(COALESCE(m.firstName, '') || ' ' || COALESCE(m.lastName, '')) AS memberName
+        FROM {pos.TABLE} AS p
+        LEFT JOIN members AS m ON m.memberId = p.memberId
+    """
+    params = []
+    # Filter by date if provided (index range scan on transactionTimestamp)
     if date:
-        transactions = [tx for tx in transactions if tx.get("transactionTimestamp", "").startswith(date)]
+        query += " WHERE p.transactionTimestamp >= ? AND p.transactionTimestamp < ?"
+        params.extend([date, prefix_upper_bound(date)])
+    query += " ORDER BY p.transactionTimestamp, p.transaction_id"
+    if page_size:
+        query += " LIMIT ? OFFSET ?"
+        params.extend([page_size, (page - 1) * page_size])
 
-    # Build memberId -> name lookup
-    members_conn = sqlite3.connect(MEMBERS_DB_PATH)
-    members_cur = members_conn.cursor()
-    members_cur.execute("SELECT memberId, firstName, lastName FROM members")
-    member_lookup = {row[0]: f"{row[1]} {row[2]}".strip() for row in members_cur.fetchall()}
-    members_conn.close()
-
-    # Add memberName to each transaction
-    for tx in transactions:
-        member_id = tx.get("memberId")
-        tx["memberName"] = member_lookup.get(member_id, "")
+    conn = storage.connect("pos", "members")
+    rows = conn.execute(query, params).fetchall()
+    conn.close()
 
-    return transactions 
\ No newline at end of file
+    # Only the rows on this page are decoded
+    transactions = []
+    for raw_json, member_name in rows:
+        tx = json.loads(raw_json)
+        tx["memberName"] = member_name
+        transactions.append(tx)
+    return transactions
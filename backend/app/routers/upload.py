@@ -12,6 +12,7 @@ ALLOWED_CSVS = {
     "firstWorkouts.csv": "firstWorkouts.csv",
     "thirtydayreprograms.csv": "thirtydayreprograms.csv",
     "events.csv": os.path.join("app", "scripts", "events.csv"),
+    "attrition.xlsx": "attrition.xlsx",
 }
 
 @router.post("/upload-csv")
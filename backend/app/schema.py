@@ -0,0 +1,139 @@
+# app/schema.py
+"""
+Versioned schema migrations, applied once at startup.
+
+Modules register the DDL their tables need with @migration(domain, version,
+name). bootstrap(), run from the ensure_dbs startup hook, applies every
+pending migration in version order and records it in the domain database's
+schema_versions table; after that a domain is marked ready in memory and
+ensure(domain) costs a set lookup, so request handlers never run DDL or open
+a connection just to check for it.
+
+A migration may return False when it cannot run yet (its table is created by
+an import script that has not run); it then stays pending, and the domain is
+remembered as deferred so ensure() does not retry it on every call. The
+import that creates the table calls imported(domain) to retry it; anything
+else (an import run by a script, or by another worker) is picked up at the
+next startup. Scripts that use app.db without the API get the same
+migrations on first use through ensure().
+"""
+
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from . import storage
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_TABLE = "schema_versions"
+
+# Databases that ensure() may create when missing; the rest 404 as before
+CREATE_ON_DEMAND = {"members", "api_events"}
+
+@dataclass
+class Migration:
+    domain: str
+    version: int
+    name: str
+    apply: Callable[..., Optional[bool]]
+
+MIGRATIONS: Dict[str, List[Migration]] = {}
+
+_ready = set()
+_deferred = set()  # domains with a migration waiting for an import to create its table
+_lock = threading.Lock()
+
+def migration(domain: str, version: int, name: str):
+    """Register fn(conn) as `version` of the domain's schema."""
+    if domain not in storage.DOMAIN_FILES:
+        raise KeyError(f"Unknown storage domain: {domain}")
+
+    def register(fn: Callable[..., Optional[bool]]):
+        steps = MIGRATIONS.setdefault(domain, [])
+        if any(m.version == version for m in steps):
+            raise ValueError(f"{domain} already has a schema version {version}")
+        steps.append(Migration(domain, version, name, fn))
+        steps.sort(key=lambda m: m.version)
+        return fn
+    return register
+
+def table_exists(conn, name: str) -> bool:
+    """Table check on an open connection, for migrations that depend on imported tables."""
+    if storage.is_sqlite():
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    else:
+        sql = "SELECT 1 FROM information_schema.tables WHERE table_schema = current_schema() AND table_name = ?"
+    return conn.execute(sql, (name,)).fetchone() is not None
+
+def _applied(conn, domain: str) -> set:
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} (
+            domain TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            name TEXT,
+            applied_at TEXT,
+            PRIMARY KEY (domain, version)
+        )
+    """)
+    conn.commit()
+    rows = conn.execute(f"SELECT version FROM {VERSIONS_TABLE} WHERE domain = ?", (domain,)).fetchall()
+    return {row[0] for row in rows}
+
+def _migrate(domain: str) -> bool:
+    """Apply the domain's pending migrations; True when none is left pending."""
+    conn = storage.connect(domain, must_exist=domain not in CREATE_ON_DEMAND)
+    try:
+        applied = _applied(conn, domain)
+        for step in MIGRATIONS.get(domain, []):
+            if step.version in applied:
+                continue
+            if step.apply(conn) is False:
+                conn.rollback()
+                logger.info("schema %s v%d (%s) deferred", domain, step.version, step.name)
+                return False
+            conn.execute(
+                f"INSERT INTO {VERSIONS_TABLE} (domain, version, name, applied_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (domain, version) DO NOTHING",
+                (domain, step.version, step.name, datetime.now().isoformat()),
+            )
+            conn.commit()
+            logger.info("schema %s v%d (%s) applied", domain, step.version, step.name)
+        return True
+    finally:
+        conn.close()
+
+def ensure(domain: str):
+    """Bring the domain's schema up to date unless this process already has, or found it waiting on an import."""
+    if domain in _ready or domain in _deferred:
+        return
+    with _lock:
+        if domain in _ready or domain in _deferred:
+            return
+        if _migrate(domain):
+            _ready.add(domain)
+        else:
+            _deferred.add(domain)
+
+def imported(domain: str):
+    """Called after an import has (re)created the domain's tables: retry its deferred migrations."""
+    with _lock:
+        _deferred.discard(domain)
+    ensure(domain)
+
+def bootstrap():
+    """
+    Migrate every registered domain whose database exists. Missing SQLite files
+    are left to ensure(), which creates or rejects them on first use.
+    """
+    for domain in MIGRATIONS:
+        if storage.is_sqlite() and not os.path.exists(storage.path_for(domain)):
+            continue
+        ensure(domain)
+
+def ready() -> Dict[str, bool]:
+    """Per registered domain: whether this process has its schema up to date."""
+    return {domain: domain in _ready for domain in MIGRATIONS}
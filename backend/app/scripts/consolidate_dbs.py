@@ -0,0 +1,89 @@
+"""
+Merge the per-domain SQLite files into one database.
+
+Every table (with its indexes) from each legacy file listed in
+app.storage.DOMAIN_FILES is copied into the target file; tables whose name
+collides across domains are renamed per storage.TABLE_RENAMES. Row counts are
+checked after each copy. Point UNIFIED_DB_PATH at the result and restart the
+API to serve every domain from it.
+
+Run from the backend directory:
+    python -m app.scripts.consolidate_dbs ecab.db
+"""
+
+import os
+import re
+import sqlite3
+import sys
+from typing import Dict
+
+from app import schema, storage
+
+def _rename_table(sql: str, old: str, new: str) -> str:
+    """Rewrite the table name in a CREATE TABLE / CREATE INDEX statement."""
+    pattern = r'((?:TABLE|ON)\s+(?:IF NOT EXISTS\s+)?)(["\[`]?)' + re.escape(old) + r'(["\]`]?)(\s*\()'
+    return re.sub(pattern, lambda m: f"{m.group(1)}{new}{m.group(4)}", sql, count=1, flags=re.IGNORECASE)
+
+def _copy_domain(conn: sqlite3.Connection, domain: str) -> Dict[str, int]:
+    copied = {}
+    src = conn.execute(
+        "SELECT name, sql FROM source.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND name != ?",
+        (schema.VERSIONS_TABLE,)  # per-file bookkeeping; the API re-runs the migrations on the unified file
+    ).fetchall()
+    for name, create_sql in src:
+        target = storage.TABLE_RENAMES.get((domain, name), name)
+        if conn.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ?", (target,)).fetchone():
+            raise RuntimeError(f"{domain}.{name}: table {target} already exists in the target database")
+        conn.execute(_rename_table(create_sql, name, target) if target != name else create_sql)
+        # Generated columns (hidden 2/3) are recomputed, not copied
+        columns = [
+            f'"{row[1]}"' for row in conn.execute(f'PRAGMA source.table_xinfo("{name}")').fetchall() if row[6] in (0, 1)
+        ]
+        column_list = ", ".join(columns)
+        conn.execute(f'INSERT INTO main."{target}" ({column_list}) SELECT {column_list} FROM source."{name}"')
+        expected = conn.execute(f'SELECT COUNT(*) FROM source."{name}"').fetchone()[0]
+        actual = conn.execute(f'SELECT COUNT(*) FROM main."{target}"').fetchone()[0]
+        if expected != actual:
+            raise RuntimeError(f"{domain}.{name}: copied {actual} of {expected} rows")
+        for index_name, index_sql in conn.execute(
+            "SELECT name, sql FROM source.sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (name,)
+        ).fetchall():
+            if target != name:
+                index_sql = _rename_table(index_sql, name, target)
+                index_sql = index_sql.replace(index_name, index_name.replace(name, target, 1), 1)
+            conn.execute(index_sql)
+        copied[target] = actual
+    return copied
+
+def consolidate(target_path: str) -> Dict[str, Dict[str, int]]:
+    target_path = os.path.abspath(target_path)
+    if os.path.exists(target_path):
+        raise FileExistsError(f"{target_path} already exists; remove it or choose another name")
+    conn = storage.sqlite_connect(target_path)
+    summary = {}
+    try:
+        for domain in storage.DOMAIN_FILES:
+            path = storage.legacy_path(domain)
+            if not os.path.exists(path):
+                print(f"skip {domain}: {os.path.basename(path)} not found")
+                continue
+            conn.execute("ATTACH DATABASE ? AS source", (path,))
+            try:
+                with conn:
+                    summary[domain] = _copy_domain(conn, domain)
+            finally:
+                conn.execute("DETACH DATABASE source")
+            for table_name, rows in summary[domain].items():
+                print(f"{domain:22} {table_name:28} {rows:>8} rows")
+        conn.execute("ANALYZE")
+    except Exception:
+        conn.close()
+        os.remove(target_path)
+        raise
+    conn.close()
+    return summary
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else os.path.join(storage.BACKEND_DIR, "ecab.db")
+    consolidate(target)
+    print(f"Done. Set UNIFIED_DB_PATH={os.path.relpath(os.path.abspath(target), storage.BACKEND_DIR)} to use it.")
@@ -0,0 +1,42 @@
+"""
+One-off compaction for structured_events.db.
+
+Older versions of /api/api-events/structured-events/fetch appended a new
+event_members row for every member on every re-fetch. This removes the
+duplicate (eventId, memberId) links, adds the unique index the upsert path
+relies on, and VACUUMs the file to reclaim the space.
+
+Run from the backend directory:
+    python -m app.scripts.dedupe_event_members
+"""
+
+import os
+
+from app import storage
+from app.db import dedupe_event_members
+
+DB_PATH = storage.path_for('structured_events')
+
+def compact():
+    if not os.path.exists(DB_PATH):
+        print(f"Error: database not found at {DB_PATH}")
+        return
+
+    conn = storage.sqlite_connect(DB_PATH)
+    before = conn.execute("SELECT COUNT(*) FROM event_members").fetchone()[0]
+    size_before = os.path.getsize(DB_PATH)
+
+    removed = dedupe_event_members(conn)
+    conn.execute("DELETE FROM event_members WHERE memberId IS NULL OR memberId = ''")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_event_members_eventId ON event_members (eventId)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_event_members_event_member ON event_members (eventId, memberId)")
+    conn.commit()
+    conn.execute("VACUUM")
+    after = conn.execute("SELECT COUNT(*) FROM event_members").fetchone()[0]
+    conn.close()
+
+    print(f"event_members: {before} -> {after} rows ({removed} duplicate links removed)")
+    print(f"File size: {size_before} -> {os.path.getsize(DB_PATH)} bytes")
+
+if __name__ == '__main__':
+    compact()
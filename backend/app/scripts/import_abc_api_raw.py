@@ -1,14 +1,18 @@
 import json
 import sqlite3
 import os
+import sys
 import requests
+from app import pos, storage
+from app.pos import upsert_pos_transactions
 
 API_URL = "https://api.abcfinancial.com/rest/40059/clubs/transactions/pos"
 APP_ID = "4c9b9b55"
 APP_KEY = "112d217a8efeafb44fc9a7c1c34b357e"
 TRANSACTION_TIMESTAMP_RANGE = "2025-06-01 00:00:00.000000"  # Fetch from the start of June 2025
-DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../sales_data_api.db"))
-TABLE_NAME = "api_transactions_raw"
+DB_PATH = storage.path_for("pos")
+TABLE_NAME = pos.RAW_TABLE
+POS_TABLE_NAME = pos.TABLE
 ABC_API_JSON = os.path.join(os.path.dirname(__file__), "abc_api_sample.json")
 
 USE_LOCAL_FILE = False  # Set to True to use the local JSON file instead of the API
@@ -58,26 +62,48 @@ def fetch_transactions_from_file():
             transactions.append(tx)
     return transactions
 
-def store_transactions(transactions):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(f"""
+def ensure_tables(conn: sqlite3.Connection):
+    """Create the raw archive table and the typed pos_transactions projection (app/pos.py)."""
+    conn.execute(f"""
     CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         transaction_id TEXT,
         raw_json TEXT
     )
     """)
+    pos.create_table(conn)
+
+def store_transactions(transactions):
+    conn = storage.sqlite_connect(DB_PATH)
+    ensure_tables(conn)
+    c = conn.cursor()
     for tx in transactions:
         tx_id = tx.get("transactionId")
         c.execute(f"INSERT INTO {TABLE_NAME} (transaction_id, raw_json) VALUES (?, ?)", (tx_id, json.dumps(tx)))
+    projected = upsert_pos_transactions(conn, transactions)
     conn.commit()
     conn.close()
     print(f"Inserted {len(transactions)} transactions into {TABLE_NAME}.")
+    print(f"Upserted {projected} transactions into {POS_TABLE_NAME}.")
+
+def backfill_from_raw():
+    """
+    Project every row already stored in api_transactions_raw into pos_transactions.
+    Safe to re-run: rows are upserted on transaction_id.
+    """
+    conn = storage.sqlite_connect(DB_PATH)
+    ensure_tables(conn)
+    projected = pos.backfill(conn)
+    conn.commit()
+    conn.close()
+    print(f"Backfilled {projected} transactions into {POS_TABLE_NAME}.")
 
 if __name__ == "__main__":
+    if "--backfill" in sys.argv:
+        backfill_from_raw()
+        sys.exit(0)
     if USE_LOCAL_FILE:
         txs = fetch_transactions_from_file()
     else:
         txs = fetch_transactions_from_api()
-    store_transactions(txs) 
\ No newline at end of file
+    store_transactions(txs)
@@ -0,0 +1,184 @@
+"""
+Attrition workbook ingestion.
+
+Streams the ABC attrition export (attrition.xlsx) through openpyxl's read-only
+reader, finds the header, member rows and footer sections with vectorized masks,
+types every column once, and bulk-writes the result to the attrition storage
+(attrition.db, or PostgreSQL) in a single transaction. Replaces the row-by-row
+import_attrition_data.py / tri.py flow.
+"""
+
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from app import storage
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+EXCEL_PATH = os.path.join(BACKEND_DIR, "attrition.xlsx")
+TABLE_NAME = "attrition"
+IMPORTS_TABLE = "attrition_imports"
+
+# Excel header -> (DB column, SQLite type)
+HEADER_MAP = {
+    'Club #': ('club_number', 'TEXT'),
+    'Club Name': ('club_name', 'TEXT'),
+    'Agreement #': ('agreement_number', 'TEXT'),
+    'Member Name': ('member_name', 'TEXT'),
+    'Primary Member': ('primary_member', 'TEXT'),
+    'Birth Date': ('birth_date', 'TEXT'),
+    'Address': ('address', 'TEXT'),
+    'City': ('city', 'TEXT'),
+    'State': ('state', 'TEXT'),
+    'Zip Code': ('zip_code', 'TEXT'),
+    'Email': ('email', 'TEXT'),
+    'Phone Number': ('phone_number', 'TEXT'),
+    'Membership Type': ('membership_type', 'TEXT'),
+    'Status': ('status', 'TEXT'),
+    'StatusReason': ('status_reason', 'TEXT'),
+    'Status Date': ('status_date', 'TEXT'),
+    'Gender': ('gender', 'TEXT'),
+    'Age': ('age', 'INTEGER'),
+    'Draft': ('draft', 'REAL'),
+}
+COLUMNS = [col for col, _ in HEADER_MAP.values()]
+
+TOTAL_COLLECTED_RE = re.compile(r'total\s*collected', re.IGNORECASE)
+FOOTER_RE = re.compile(r'^\s*applied filters', re.IGNORECASE)
+
+def read_sheet(path: str) -> pd.DataFrame:
+    """Stream the first worksheet into an untyped frame (one row per sheet row)."""
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        # Straight from the row iterator; from_records pads short rows itself
+        raw = pd.DataFrame.from_records(wb.worksheets[0].values, coerce_float=False)
+    finally:
+        wb.close()
+    return raw.astype(object)
+
+def _value_after_label(row: pd.Series) -> Optional[float]:
+    """First numeric-looking cell to the right of the 'TOTAL COLLECTED' label ('$1,234.50' allowed)."""
+    is_label = row.astype(str).str.contains(TOTAL_COLLECTED_RE)
+    after = row[is_label.cumsum().gt(0) & ~is_label]
+    cleaned = after.astype(str).str.replace(r'[$,\s]', '', regex=True)
+    numbers = pd.to_numeric(cleaned, errors='coerce').dropna()
+    return float(numbers.iloc[0]) if not numbers.empty else None
+
+def parse_attrition(raw: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Split a raw sheet into typed member rows plus the summary sections.
+    Returns {"rows": DataFrame[COLUMNS], "total_collected": float|None, "filters": str|None}.
+    """
+    if raw.empty:
+        return {"rows": pd.DataFrame(columns=COLUMNS), "total_collected": None, "filters": None}
+
+    text = raw.apply(lambda col: col.where(col.map(lambda v: isinstance(v, str))))
+    # Header = first row naming at least three known columns
+    header_hits = text.isin(list(HEADER_MAP)).sum(axis=1)
+    if header_hits.max() < 3:
+        raise ValueError("Could not find the attrition header row")
+    header_idx = int(header_hits.idxmax())
+
+    row_text = text.fillna('').agg(' '.join, axis=1)
+    is_total = row_text.str.contains(TOTAL_COLLECTED_RE)
+    is_footer = row_text.str.contains(FOOTER_RE)
+    is_blank = raw.isna().all(axis=1)
+
+    # Member section ends at the first blank/total/footer row after the header
+    after_header = raw.index > header_idx
+    stops = raw.index[after_header & (is_total | is_footer | is_blank)]
+    end_idx = int(stops[0]) if len(stops) else int(raw.index[-1]) + 1
+
+    headers = raw.iloc[header_idx]
+    body = raw.iloc[header_idx + 1:end_idx]
+    body.columns = headers.values
+    body = body[[h for h in HEADER_MAP if h in body.columns]].rename(
+        columns={h: col for h, (col, _) in HEADER_MAP.items()}
+    )
+    for col in COLUMNS:
+        if col not in body.columns:
+            body[col] = None
+    body = body[COLUMNS]
+
+    # Column-typed conversions, one vector op per column
+    text_cols = [col for col, typ in HEADER_MAP.values() if typ == 'TEXT']
+    for col in ('birth_date', 'status_date'):
+        body[col] = pd.to_datetime(body[col], errors='coerce').dt.strftime('%Y-%m-%d')
+    for col in ('agreement_number', 'club_number', 'zip_code'):
+        body[col] = body[col].astype('string').str.replace(r'\.0$', '', regex=True)
+    body['age'] = pd.to_numeric(body['age'], errors='coerce').astype('Int64')
+    body['draft'] = pd.to_numeric(
+        body['draft'].astype('string').str.replace(r'[$,\s]', '', regex=True), errors='coerce'
+    )
+    for col in text_cols:
+        if col not in ('birth_date', 'status_date'):
+            body[col] = body[col].astype('string').str.strip()
+    body = body[body['agreement_number'].notna() & body['agreement_number'].ne('')]
+
+    total_rows = raw[is_total]
+    total_collected = _value_after_label(total_rows.iloc[0]) if not total_rows.empty else None
+    footer_rows = row_text[is_footer]
+    filters = footer_rows.iloc[0].strip() if not footer_rows.empty else None
+    return {"rows": body, "total_collected": total_collected, "filters": filters}
+
+def write_attrition(rows: pd.DataFrame, db_path: Optional[str] = None, total_collected=None, filters=None, source=None):
+    """
+    Replace the attrition table with rows in one transaction and record the import.
+    Writes to the configured attrition storage unless a SQLite file is named.
+    """
+    sqlite = bool(db_path) or storage.is_sqlite()
+    # REAL is single precision on PostgreSQL; the migrated draft column is double precision
+    column_defs = ", ".join(
+        f"{col} {typ if sqlite or typ != 'REAL' else 'DOUBLE PRECISION'}" for col, typ in HEADER_MAP.values()
+    )
+    id_def = "INTEGER PRIMARY KEY AUTOINCREMENT" if sqlite else "BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY"
+    placeholders = ", ".join("?" for _ in COLUMNS)
+    records = rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None)
+    conn = storage.sqlite_connect(db_path) if db_path else storage.connect("attrition")
+    try:
+        with conn:
+            conn.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+            conn.execute(f"CREATE TABLE {TABLE_NAME} ({column_defs})")
+            conn.executemany(f"INSERT INTO {TABLE_NAME} ({', '.join(COLUMNS)}) VALUES ({placeholders})", records)
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {IMPORTS_TABLE} (
+                    id {id_def},
+                    imported_at TEXT,
+                    source TEXT,
+                    row_count INTEGER,
+                    total_collected REAL,
+                    filters TEXT
+                )
+            """)
+            conn.execute(
+                f"INSERT INTO {IMPORTS_TABLE} (imported_at, source, row_count, total_collected, filters) VALUES (?, ?, ?, ?, ?)",
+                (datetime.now().isoformat(), source, len(rows), total_collected, filters)
+            )
+    finally:
+        conn.close()
+
+def ingest(excel_path: str = EXCEL_PATH, db_path: Optional[str] = None) -> Dict[str, Any]:
+    if not os.path.exists(excel_path):
+        return {"success": False, "error": f"{os.path.basename(excel_path)} not found."}
+    started = datetime.now()
+    parsed = parse_attrition(read_sheet(excel_path))
+    rows = parsed["rows"]
+    write_attrition(rows, db_path, parsed["total_collected"], parsed["filters"], os.path.basename(excel_path))
+    return {
+        "success": True,
+        "rows_inserted": len(rows),
+        "total_collected": parsed["total_collected"],
+        "filters": parsed["filters"],
+        "seconds": round((datetime.now() - started).total_seconds(), 3),
+    }
+
+# Call this from FastAPI
+def run() -> Dict[str, Any]:
+    return ingest()
+
+if __name__ == "__main__":
+    print(run())
@@ -1,38 +1,18 @@
-import sqlite3
 import json
 import os
+from app import storage
 
-# Define paths relative to the script's location
-SCRIPT_DIR = os.path.dirname(__file__)
-BACKEND_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
-OLD_DB_PATH = os.path.join(BACKEND_DIR, 'apiEvents.db')
-NEW_DB_PATH = os.path.join(BACKEND_DIR, 'structured_events.db')
-
-def migrate_events():
-    """
-    Migrates events from the old JSON-based storage to a new, structured relational format.
-    - Reads from apiEvents.db (old format).
-    - Writes to structured_events.db (new format).
-    """
-    if not os.path.exists(OLD_DB_PATH):
-        print(f"Error: Old database not found at {OLD_DB_PATH}")
-        return
-
-    # Connect to the old and new databases
-    old_conn = sqlite3.connect(OLD_DB_PATH)
-    old_cursor = old_conn.cursor()
-
-    new_conn = sqlite3.connect(NEW_DB_PATH)
-    new_cursor = new_conn.cursor()
-
-    print("Creating new structured tables in structured_events.db...")
+OLD_DB_PATH = storage.path_for('api_events')
+NEW_DB_PATH = storage.path_for('structured_events')
 
+def create_structured_tables(cursor):
+    """(Re)create the empty events and event_members tables with their indexes."""
     # Drop tables if they exist to ensure a clean migration
-    new_cursor.execute('DROP TABLE IF EXISTS events')
-    new_cursor.execute('DROP TABLE IF EXISTS event_members')
+    cursor.execute('DROP TABLE IF EXISTS events')
+    cursor.execute('DROP TABLE IF EXISTS event_members')
 
     # Create the new 'events' table
-    new_cursor.execute('''
+    cursor.execute('''
         CREATE TABLE events (
             eventId TEXT PRIMARY KEY,
             eventName TEXT,
@@ -45,7 +25,7 @@ def migrate_events():
     ''')
 
     # Create the new 'event_members' table to link members to events
-    new_cursor.execute('''
+    cursor.execute('''
         CREATE TABLE event_members (
             event_member_id INTEGER PRIMARY KEY AUTOINCREMENT,
             eventId TEXT,
@@ -55,6 +35,30 @@ def migrate_events():
             FOREIGN KEY (eventId) REFERENCES events (eventId)
         )
     ''')
+    cursor.execute('CREATE INDEX idx_events_eventTimestamp ON events (eventTimestamp)')
+    cursor.execute('CREATE INDEX idx_event_members_eventId ON event_members (eventId)')
+    cursor.execute('CREATE UNIQUE INDEX ux_event_members_event_member ON event_members (eventId, memberId)')
+
+def migrate_events():
+    """
+    Migrates events from the old JSON-based storage to a new, structured relational format.
+    - Reads from apiEvents.db (old format).
+    - Writes to structured_events.db (new format).
+    """
+    if not os.path.exists(OLD_DB_PATH):
+        print(f"Error: Old database not found at {OLD_DB_PATH}")
+        return
+
+    # Connect to the old and new databases
+    old_conn = storage.sqlite_connect(OLD_DB_PATH)
+    old_cursor = old_conn.cursor()
+
+    new_conn = storage.sqlite_connect(NEW_DB_PATH)
+    new_cursor = new_conn.cursor()
+
+    print("Creating new structured tables in structured_events.db...")
+
+    create_structured_tables(new_cursor)
     print("New tables created successfully.")
 
     # Fetch all events from the old database
@@ -97,8 +101,10 @@ def migrate_events():
             # Insert into the 'event_members' table
             if 'members' in event_data and isinstance(event_data['members'], list):
                 for member in event_data['members']:
+                    if not member.get('memberId'):
+                        continue
                     new_cursor.execute('''
-                        INSERT INTO event_members (
+                        INSERT OR IGNORE INTO event_members (
                             eventId, memberId, firstName, lastName
                         ) VALUES (?, ?, ?, ?)
                     ''', (
@@ -1,14 +1,14 @@
 import csv
-import sqlite3
-import os
 from datetime import datetime
+from app import storage
 
 CSV_FILE = 'events.csv'  # Path to your events CSV file
-DB_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'events.db')  # backend/events.db
+DB_FILE = storage.path_for("csv_events")  # backend/events.db, or the unified database
+EVENTS_TABLE = storage.table("csv_events", "events")
 
 # Define the schema for the events table
-CREATE_TABLE_SQL = '''
-CREATE TABLE IF NOT EXISTS events (
+CREATE_TABLE_SQL = f'''
+CREATE TABLE IF NOT EXISTS {EVENTS_TABLE} (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     club_nbr TEXT,
     employee_name TEXT,
@@ -91,21 +91,21 @@ def read_events_csv(csv_path):
 
 def main():
     # Create DB and table if not exists
-    conn = sqlite3.connect(DB_FILE)
+    conn = storage.sqlite_connect(DB_FILE)
     cur = conn.cursor()
     cur.execute(CREATE_TABLE_SQL)
     conn.commit()
 
     # Clear existing data (optional, for re-import)
-    cur.execute('DELETE FROM events')
+    cur.execute(f'DELETE FROM {EVENTS_TABLE}')
     conn.commit()
 
     events = read_events_csv(CSV_FILE)
     
     # Insert events
     for event in events:
-        cur.execute('''
-            INSERT INTO events (club_nbr, employee_name, agreement_number, member_name, 
+        cur.execute(f'''
+            INSERT INTO {EVENTS_TABLE} (club_nbr, employee_name, agreement_number, member_name, 
                               event_type, price, event_date, event_time, event_status, 
                               event_commission, completed_datetime)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
@@ -117,7 +117,7 @@ def main():
         ))
     
     conn.commit()
-    print(f"Inserted {len(events)} rows into events.db.")
+    print(f"Inserted {len(events)} rows into {EVENTS_TABLE}.")
     conn.close()
 
 if __name__ == '__main__':
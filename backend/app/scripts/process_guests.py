@@ -1,8 +1,8 @@
 # scripts/process_guests.py
 
 import pandas as pd
+from app import storage
 from app.db import GUESTS_DB_PATH
-import sqlite3
 import os
 
 def run():
@@ -14,7 +14,7 @@ def run():
     df = pd.read_csv(csv_filename)
     df.columns = [col.strip().replace(" ", "_").lower() for col in df.columns]
 
-    conn = sqlite3.connect(GUESTS_DB_PATH)
+    conn = storage.sqlite_connect(GUESTS_DB_PATH)
     cur = conn.cursor()
 
     cur.execute("""
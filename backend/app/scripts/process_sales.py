@@ -9,26 +9,79 @@ based on agreement number and profit center.
 import os
 import sys
 import pandas as pd
-import sqlite3
 import logging
 import json
 import hashlib
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+from app import changes, storage
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Handlers come from app.logs in the API; the __main__ block below sets up console output
 logger = logging.getLogger("SalesProcessor")
 
 
+def ensure_sales_schema(cursor):
+    """Create the sales, sales_audit and transactions tables if they are missing."""
+    if not storage.is_sqlite():
+        return  # SQLite DDL; on PostgreSQL the tables come from migrate.py
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sales (
+        sale_id TEXT PRIMARY KEY,
+        agreement_number TEXT,
+        profit_center TEXT,
+        member_name TEXT,
+        membership_type TEXT,
+        agreement_type TEXT,
+        agreement_payment_plan TEXT,
+        total_amount REAL,
+        transaction_count INTEGER,
+        sales_person TEXT,
+        commission_employees TEXT,
+        payment_method TEXT,
+        main_item TEXT,
+        latest_payment_date TEXT,
+        manual_override INTEGER DEFAULT 0
+    )''')
+
+    # Try to add the column if it doesn't exist (for existing DBs)
+    try:
+        cursor.execute('ALTER TABLE sales ADD COLUMN manual_override INTEGER DEFAULT 0')
+    except Exception:
+        pass  # Ignore if already exists
+
+    # Add audit/history table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sales_audit (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sale_id TEXT,
+        action TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        old_data TEXT,
+        new_data TEXT
+    )''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sale_id TEXT,
+        payment_date TEXT,
+        item TEXT,
+        amount REAL,
+        campaign TEXT,
+        next_due_amount REAL,
+        package_qty INTEGER,
+        income_items REAL,
+        income_tax REAL,
+        income_total REAL,
+        sales_person TEXT,
+        commission_employees TEXT,
+        employee_name TEXT,
+        payment_method TEXT
+    )''')
+
+
 def process_sales_data(
     csv_path: str,
-    db_path: str = "sales_data.db",
+    db_path: Optional[str] = None,
     summary_path: str = "sales_summary.json",
     verbose: bool = False
 ) -> Dict[str, Any]:
@@ -74,64 +127,11 @@ def process_sales_data(
         # Add row index to create unique identifiers for prospect entries
         df['row_index'] = range(len(df))
 
-        # Create database if it doesn't exist, but don't delete existing data
-        conn = sqlite3.connect(db_path)
+        # Write to the configured sales storage unless a SQLite file is named; existing data is kept
+        conn = storage.sqlite_connect(db_path) if db_path else storage.connect("sales")
         cursor = conn.cursor()
 
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sales (
-            sale_id TEXT PRIMARY KEY,
-            agreement_number TEXT,
-            profit_center TEXT,
-            member_name TEXT,
-            membership_type TEXT,
-            agreement_type TEXT,
-            agreement_payment_plan TEXT,
-            total_amount REAL,
-            transaction_count INTEGER,
-            sales_person TEXT,
-            commission_employees TEXT,
-            payment_method TEXT,
-            main_item TEXT,
-            latest_payment_date TEXT,
-            manual_override INTEGER DEFAULT 0
-        )''')
-
-        # Try to add the column if it doesn't exist (for existing DBs)
-        try:
-            cursor.execute('ALTER TABLE sales ADD COLUMN manual_override INTEGER DEFAULT 0')
-        except Exception:
-            pass  # Ignore if already exists
-
-        # Add audit/history table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sales_audit (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sale_id TEXT,
-            action TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            old_data TEXT,
-            new_data TEXT
-        )''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sale_id TEXT,
-            payment_date TEXT,
-            item TEXT,
-            amount REAL,
-            campaign TEXT,
-            next_due_amount REAL,
-            package_qty INTEGER,
-            income_items REAL,
-            income_tax REAL,
-            income_total REAL,
-            sales_person TEXT,
-            commission_employees TEXT,
-            employee_name TEXT,
-            payment_method TEXT
-        )''')
+        ensure_sales_schema(cursor)
 
         # Group by agreement, payment date, member name, and profit center for unique sales
         grouped = df.groupby(['Agreement #', 'Payment Date', 'Member Name (last, first)', 'Profit Center'])
@@ -158,8 +158,13 @@ def process_sales_data(
                 transaction_count_for_sale = len(transactions)
                 latest_date = max(x.get('Payment Date', '') for x in transactions)
                 # Use the first row for most fields, but sum amounts
+                # Named columns: the migrated PostgreSQL table leads with a rowid column
                 cursor.execute('''
-                INSERT INTO sales VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
+                INSERT INTO sales (
+                    sale_id, agreement_number, profit_center, member_name, membership_type,
+                    agreement_type, agreement_payment_plan, total_amount, transaction_count, sales_person,
+                    commission_employees, payment_method, main_item, latest_payment_date, manual_override
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
                     sale_id, t['Agreement #'], t['Profit Center'],
                     t['Member Name (last, first)'], t['Membership Type'],
                     t['Agreement Type'], t['Agreement Payment Plan'],
@@ -169,10 +174,7 @@ def process_sales_data(
                     latest_date, 0  # manual_override=0 for new imports
                 ))
                 # Insert audit row
-                cursor.execute('''
-                INSERT INTO sales_audit (sale_id, action, old_data, new_data) VALUES (?, ?, ?, ?)''', (
-                    sale_id, 'insert', '', json.dumps(t)
-                ))
+                changes.record(conn, sale_id, 'insert', None, t)
                 new_sales_count += 1
                 # Insert all line items as transactions
                 for x in transactions:
@@ -210,11 +212,11 @@ def process_sales_data(
                 t = transactions[0]
                 old = existing_sales[sale_id]
                 changed = False
-                changes = {}
+                changed_fields = {}
                 for field in ['profit_center', 'main_item']:
                     if t.get(field.replace('_', ' ').title(), '') != old.get(field, ''):
                         changed = True
-                        changes[field] = {'old': old.get(field, ''), 'new': t.get(field.replace('_', ' ').title(), '')}
+                        changed_fields[field] = {'old': old.get(field, ''), 'new': t.get(field.replace('_', ' ').title(), '')}
                 if changed:
                     # Update sale
                     cursor.execute('''
@@ -222,10 +224,7 @@ def process_sales_data(
                         t['Profit Center'], t['Item'], sale_id
                     ))
                     # Insert audit row
-                    cursor.execute('''
-                    INSERT INTO sales_audit (sale_id, action, old_data, new_data) VALUES (?, ?, ?, ?)''', (
-                        sale_id, 'update', json.dumps(old), json.dumps(t)
-                    ))
+                    changes.record(conn, sale_id, 'update', old, t)
 
         conn.commit()
         conn.close()
@@ -264,5 +263,12 @@ def run() -> Dict[str, Any]:
 
 # ✅ CLI entry point for local testing
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
     result = run()
     print(json.dumps(result, indent=2))
\ No newline at end of file
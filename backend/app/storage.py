@@ -0,0 +1,439 @@
+# app/storage.py
+"""
+Where each data domain lives, and how to talk to it.
+
+Historically every domain had its own SQLite file and cross-domain reads had to
+ATTACH the other files per request. When settings.UNIFIED_DB_PATH points at a
+database built by app/scripts/consolidate_dbs.py, every domain resolves to that
+one file: joins run on a single connection with one page cache. Without it the
+legacy per-domain files are used and connect() attaches whatever else a query
+needs, so the same unqualified SQL works in both layouts.
+
+When settings.DATABASE_URL is set, every domain lives in that PostgreSQL
+database instead. connect() then hands out a connection from one pooled
+SQLAlchemy engine, wrapped so the qmark (?) / named (:name) SQL and the
+row["col"] / row[0] access the routers use keep working unchanged.
+"""
+
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from fastapi import HTTPException
+
+from . import perf
+from .config import settings
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# domain -> legacy SQLite file (relative to backend/)
+DOMAIN_FILES = {
+    "sales": "sales_data.db",
+    "pos": "sales_data_api.db",
+    "employees": "employees.db",
+    "kpi": "clubKPI.db",
+    "memberships": "memberships.db",
+    "guests": "guests.db",
+    "first_workouts": "firstWorkouts.db",
+    "thirtyday_reprograms": "thirtydayreprograms.db",
+    "members": "members.db",
+    "api_events": "apiEvents.db",
+    "structured_events": "structured_events.db",
+    "csv_events": "events.db",
+    "attrition": "attrition.db",
+}
+
+# Tables whose legacy name collides with another domain get renamed in the unified file
+TABLE_RENAMES = {
+    ("csv_events", "events"): "csv_events",
+}
+
+def _resolve(path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(BACKEND_DIR, path)
+
+UNIFIED_DB_PATH = _resolve(settings.UNIFIED_DB_PATH) if settings.UNIFIED_DB_PATH else None
+
+# --- PostgreSQL engine ---
+def database_url(url: str) -> str:
+    """
+    Pin PostgreSQL URLs to psycopg2 (the connection adapter relies on its COPY and
+    paramstyle); also accepts the postgres:// scheme hosting providers hand out.
+    """
+    for scheme in ("postgres://", "postgresql://"):
+        if url.startswith(scheme):
+            return "postgresql+psycopg2://" + url[len(scheme):]
+    return url
+
+engine = None
+if settings.DATABASE_URL:
+    # SQLAlchemy is only needed for PostgreSQL; SQLite deployments skip its import
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import QueuePool
+
+    engine = create_engine(
+        database_url(settings.DATABASE_URL),
+        poolclass=QueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
+def dialect() -> str:
+    """'postgresql' when DATABASE_URL is configured, otherwise 'sqlite'."""
+    return engine.dialect.name if engine is not None else "sqlite"
+
+def is_sqlite() -> bool:
+    return engine is None
+
+def is_unified() -> bool:
+    return is_sqlite() and bool(UNIFIED_DB_PATH) and os.path.exists(UNIFIED_DB_PATH)
+
+def legacy_path(domain: str) -> str:
+    return os.path.join(BACKEND_DIR, DOMAIN_FILES[domain])
+
+def path_for(domain: str) -> str:
+    """SQLite file that holds the given domain's tables."""
+    if domain not in DOMAIN_FILES:
+        raise KeyError(f"Unknown storage domain: {domain}")
+    return UNIFIED_DB_PATH if is_unified() else legacy_path(domain)
+
+def table(domain: str, name: str) -> str:
+    """Physical table name for a domain table (only differs for renamed collisions)."""
+    return TABLE_RENAMES.get((domain, name), name) if (is_unified() or not is_sqlite()) else name
+
+# --- Dialect-aware SQL fragments ---
+_SQLITE_DATE_FORMATS = {"year": "%Y", "month": "%m", "day": "%d", "date": "%Y-%m-%d", "year_month": "%Y-%m"}
+_PG_DATE_FORMATS = {"year": "YYYY", "month": "MM", "day": "DD", "date": "YYYY-MM-DD", "year_month": "YYYY-MM"}
+
+def date_part(part: str, column: str) -> str:
+    """
+    Zero-padded text for part of a date/timestamp column ('year', 'month', 'day',
+    'date' or 'year_month'), e.g. date_part('year', 'm.sinceDate') = '2025'.
+    """
+    if is_sqlite():
+        return f"strftime('{_SQLITE_DATE_FORMATS[part]}', {column})"
+    return f"to_char(CAST({column} AS timestamp), '{_PG_DATE_FORMATS[part]}')"
+
+_SQLITE_BUCKETS = {"day": "date({c})", "week": "date({c}, 'weekday 0', '-6 days')", "month": "strftime('%Y-%m-01', {c})"}
+
+def date_bucket(unit: str, column: str) -> str:
+    """
+    'YYYY-MM-DD' of the first day of the day, week (Monday-based) or month a
+    date/timestamp column falls in, e.g. date_bucket('week', 'd') = '2025-06-02'.
+    """
+    if is_sqlite():
+        return _SQLITE_BUCKETS[unit].format(c=column)
+    if unit not in _SQLITE_BUCKETS:
+        raise KeyError(unit)
+    return f"to_char(date_trunc('{unit}', CAST({column} AS timestamp)), 'YYYY-MM-DD')"
+
+def like() -> str:
+    """Case-insensitive LIKE operator (SQLite's LIKE already ignores ASCII case)."""
+    return "LIKE" if is_sqlite() else "ILIKE"
+
+_SIMPLE_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def ident(name: str) -> str:
+    """
+    Portable spelling of a column name. Simple names stay unquoted (PostgreSQL
+    stores them lower-cased, SQLite matches them case-insensitively); names with
+    spaces or punctuation, like the CSV headers, are quoted and kept verbatim.
+    """
+    return name if _SIMPLE_IDENTIFIER.match(name) else '"' + name.replace('"', '""') + '"'
+
+def table_info(domain: str, name: str) -> List[Dict[str, Any]]:
+    """Column names and declared types of a table, on either backend."""
+    physical = table(domain, name)
+    with connection(domain) as conn:
+        if is_sqlite():
+            rows = conn.execute(f'PRAGMA table_info("{physical}")').fetchall()
+            return [{"name": r[1], "type": r[2]} for r in rows]
+        rows = conn.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = ? ORDER BY ordinal_position",
+            (physical,)
+        ).fetchall()
+        return [{"name": COLUMN_CASE.get(r[0], r[0]), "type": r[1]} for r in rows]
+
+# --- PostgreSQL connection adapter ---
+_PLACEHOLDER = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"])*\"|::|\?|:(\w+)|%")
+
+def _to_pyformat(sql: str, params) -> str:
+    """Rewrite qmark/named placeholders to psycopg2's %s / %(name)s outside string literals."""
+    if not params:
+        return sql  # psycopg2 only interpolates (and unescapes %%) when params are given
+
+    def repl(m):
+        token = m.group(0)
+        if token == "?":
+            return "%s"
+        if token == "%":
+            return "%%"
+        if m.group(1):
+            return f"%({m.group(1)})s"
+        if token.startswith("'"):
+            return token.replace("%", "%%")
+        return token
+    return _PLACEHOLDER.sub(repl, sql)
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_ALIAS = re.compile(r"\bAS\s+([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+_ROWID = re.compile(r"\browid\b", re.IGNORECASE)
+
+# Extra lower -> original spellings for columns that never appear in the SQL text (SELECT *).
+# migrate.py records every migrated column in COLUMN_CASE_TABLE; it is read on first connect.
+COLUMN_CASE: Dict[str, str] = {}
+COLUMN_CASE_TABLE = "column_case"
+_column_case_loaded = False
+
+def _load_column_case(raw):
+    global _column_case_loaded
+    cur = raw.cursor()
+    try:
+        cur.execute(
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = current_schema() AND table_name = %s",
+            (COLUMN_CASE_TABLE,)
+        )
+        if cur.fetchone():
+            cur.execute(f"SELECT lower_name, original FROM {COLUMN_CASE_TABLE}")
+            COLUMN_CASE.update(dict(cur.fetchall()))
+        raw.commit()
+    finally:
+        cur.close()
+    _column_case_loaded = True
+
+class Row(tuple):
+    """Result row addressable by position or by column name, like sqlite3.Row."""
+    def __new__(cls, values, index: Dict[str, int]):
+        row = super().__new__(cls, values)
+        row._index = index
+        return row
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        return list(self._index)
+
+class _PooledCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._index: Dict[str, int] = {}
+        self._keep = None
+        self._description = None
+        self._timer = None
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            if self._timer:
+                self._timer.add(time.perf_counter() - started)
+
+    def execute(self, sql: str, params=()):
+        self._timer = perf.StatementTimer(sql) if settings.PERF_ENABLED else None
+        self._timed(self._cursor.execute, _to_pyformat(sql, params), params or None)
+        self._build_index(sql)
+        return self
+
+    def executemany(self, sql: str, seq_of_params):
+        rows = list(seq_of_params)
+        self._timer = perf.StatementTimer(sql) if settings.PERF_ENABLED else None
+        self._timed(self._cursor.executemany, _to_pyformat(sql, rows[0] if rows else None), rows)
+        return self
+
+    def _build_index(self, sql: str):
+        # PostgreSQL folds unquoted identifiers to lower case; restore the spelling
+        # the SQL (or the migrated schema) used so row keys match the SQLite results.
+        # Explicit aliases win over other mentions of the same name.
+        self._index, self._keep, self._description = {}, None, None
+        if not self._cursor.description:
+            return
+        spelled = dict(COLUMN_CASE)
+        spelled.update({name.lower(): name for name in _IDENTIFIER.findall(sql)})
+        spelled.update({name.lower(): name for name in _ALIAS.findall(sql)})
+        columns = list(self._cursor.description)
+        # The migrated rowid column stays hidden from SELECT *, as it is on SQLite
+        if not _ROWID.search(sql) and any(col.name == "rowid" for col in columns):
+            self._keep = [i for i, col in enumerate(columns) if col.name != "rowid"]
+            columns = [columns[i] for i in self._keep]
+        self._description = [(spelled.get(col.name, col.name),) + tuple(col)[1:] for col in columns]
+        self._index = {col[0]: i for i, col in enumerate(self._description)}
+
+    def _row(self, values):
+        if self._keep is not None:
+            values = [values[i] for i in self._keep]
+        return Row(values, self._index)
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if self._timer and row is not None:
+            self._timer.add(0.0, 1)
+        return self._row(row) if row is not None else None
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        if self._timer:
+            self._timer.add(0.0, len(rows))
+        return [self._row(row) for row in rows]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._description
+
+    def close(self):
+        self._cursor.close()
+
+class PooledConnection:
+    """
+    A pooled PostgreSQL connection with the sqlite3.Connection surface the routers use.
+    Rows support both row["col"] and row[0]; close() returns the connection to the pool.
+    """
+    row_factory = None  # accepted and ignored; rows are always addressable by name
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def cursor(self):
+        return _PooledCursor(self._raw.cursor())
+
+    def execute(self, sql: str, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+# --- SQLite connections ---
+_wal_files = set()
+
+def _prepare_sqlite(conn: sqlite3.Connection, schema: str, path: str):
+    """WAL (persistent, so switched once per file per process) and the per-connection sync level."""
+    if settings.SQLITE_WAL and path not in _wal_files:
+        try:
+            conn.execute(f"PRAGMA {schema}.journal_mode = WAL")
+            _wal_files.add(path)
+        except sqlite3.OperationalError:
+            pass  # another process holds a lock; the next connection retries
+    conn.execute(f"PRAGMA {schema}.synchronous = {settings.SQLITE_SYNCHRONOUS}")
+
+def sqlite_connect(path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite file the way every worker process must: WAL, so readers never
+    wait on a writer, and a busy timeout (sqlite3's timeout= is busy_timeout), so
+    concurrent writers from other workers queue instead of failing with
+    "database is locked".
+    """
+    conn = sqlite3.connect(path, timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000, factory=perf.CONNECTION_FACTORY)
+    _prepare_sqlite(conn, "main", path)
+    return conn
+
+# --- Connections ---
+def connect(*domains: str, must_exist: bool = False):
+    """
+    Open one connection that can see every table of the given domains.
+    On SQLite the first domain is the main schema; in the legacy layout the other
+    files are attached under their domain name, so unqualified table names resolve.
+    On PostgreSQL every domain shares the pooled database.
+    """
+    if not is_sqlite():
+        raw = engine.raw_connection()
+        if not _column_case_loaded:
+            _load_column_case(raw)
+        return PooledConnection(raw)
+    main = path_for(domains[0])
+    if must_exist and not os.path.exists(main):
+        raise HTTPException(status_code=404, detail=f"Database not found at {main}")
+    conn = sqlite_connect(main)
+    attached = {main}
+    for domain in domains[1:]:
+        path = path_for(domain)
+        if path in attached:
+            continue
+        conn.execute("ATTACH DATABASE ? AS " + domain, (path,))
+        _prepare_sqlite(conn, domain, path)
+        attached.add(path)
+    return conn
+
+@contextmanager
+def connection(*domains: str, must_exist: bool = False) -> Iterator[Any]:
+    """connect() as a context manager that always closes the connection."""
+    conn = connect(*domains, must_exist=must_exist)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+# Imports and migrations create tables while the API runs but nothing drops one
+# for good (scripts that rebuild a table recreate it), so a table once found is
+# remembered instead of probing the schema on every request.
+_known_tables: Set[Tuple[str, str]] = set()
+
+def has_table(domain: str, name: str) -> bool:
+    """True when the domain's storage exists and holds the table (replaces per-file exists checks)."""
+    key = (domain, name)
+    if is_sqlite():
+        if not os.path.exists(path_for(domain)):
+            _known_tables.discard(key)
+            return False
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    else:
+        sql = "SELECT 1 FROM information_schema.tables WHERE table_schema = current_schema() AND table_name = ?"
+    if key in _known_tables:
+        return True
+    with connection(domain) as conn:
+        found = conn.execute(sql, (table(domain, name),)).fetchone() is not None
+    if found:
+        _known_tables.add(key)
+    return found
+
+def query(domain: str, sql: str, params=()) -> List[Dict[str, Any]]:
+    with connection(domain, must_exist=True) as conn:
+        conn.row_factory = sqlite3.Row
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+def execute(domain: str, sql: str, params=()) -> None:
+    with connection(domain, must_exist=True) as conn:
+        conn.execute(sql, params)
+        conn.commit()
+
+def write_frame(df, name: str, conn, if_exists: str = "append") -> None:
+    """DataFrame.to_sql against whichever backend conn belongs to."""
+    if isinstance(conn, PooledConnection):
+        conn.commit()
+        df.to_sql(name, engine, if_exists=if_exists, index=False)
+    else:
+        df.to_sql(name, conn, if_exists=if_exists, index=False)
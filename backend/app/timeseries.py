@@ -0,0 +1,340 @@
+# app/timeseries.py
+"""
+Daily series behind /api/timeseries/{metric}.
+
+Each metric is a filtered count or sum over one source table, bucketed per
+day (and per series, e.g. guest source) into the series_daily table of the
+metric's own database, so reads never touch the source rows. Requests read a
+range of days from there and roll them up into dense day/week/month arrays.
+
+The buckets are maintained incrementally. refresh() reconciles them day by
+day against the source: one grouped pass (which the sales indexes serve on
+their own) yields every day's count and sum per series, and only the days
+whose stored buckets differ are rewritten, so a row moved to another day or
+edited in place is re-bucketed while untouched history is not. Sales metrics
+also follow the sales change log (app.changes): after a write, the next
+request re-buckets just the days the new changes touch. Full passes never run
+in a request. Each worker's background reconciler runs them for what the
+change log cannot cover (a reload, a long backlog, the metrics without a
+change log), and for every metric at least every settings.CACHE_TTL_SECONDS
+so edits made outside the API are picked up. Each metric has its own lock,
+and one worker at a time refreshes a metric (app.jobs lease).
+"""
+
+import datetime
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from . import cache, changes, jobs, schema, storage
+from .aggregates import PT_NEW_CENTERS, PT_RENEW_CENTERS
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+SERIES_TABLE = "series_daily"
+INTERVALS = ("day", "week", "month")
+TOTAL = "total"  # series name of metrics without a breakdown
+_FEED_BATCH = 200  # pending sales changes beyond this are cheaper to catch up on with a full pass
+
+@dataclass
+class Metric:
+    domain: str
+    table: str
+    date_column: str
+    value: str  # summed per bucket; "1" counts rows
+    where: str = "1 = 1"
+    params: Sequence[Any] = field(default_factory=list)
+    series: Optional[str] = None  # breakdown key; one TOTAL series when None
+    description: str = ""
+
+    @property
+    def source(self) -> str:
+        return storage.table(self.domain, self.table)
+
+def _in(values: Sequence[str]) -> str:
+    return f"({', '.join('?' for _ in values)})"
+
+METRICS: Dict[str, Metric] = {
+    "nb_cash": Metric("sales", "sales", "latest_payment_date", "total_amount", "profit_center = 'New Business'",
+                      description="New Business cash"),
+    "promo": Metric("sales", "sales", "latest_payment_date", "total_amount",
+                    "profit_center = 'Promotion' AND (main_item IS NULL OR main_item NOT LIKE '%Downgrade%')",
+                    description="Promotion cash, downgrades excluded"),
+    "pt_new": Metric("sales", "sales", "latest_payment_date", "total_amount", f"profit_center IN {_in(PT_NEW_CENTERS)}",
+                     PT_NEW_CENTERS, description="New personal training cash"),
+    "pt_renew": Metric("sales", "sales", "latest_payment_date", "total_amount",
+                       f"profit_center IN {_in(PT_RENEW_CENTERS)}", PT_RENEW_CENTERS,
+                       description="Renewed personal training cash"),
+    "guests": Metric("guests", "guests", "created_at", "1", series="COALESCE(source, '')",
+                     description="Guest visits by source"),
+    "first_workouts": Metric("structured_events", "events", "eventTimestamp", "1",
+                             "eventName = '1st Workout' AND status = 'Completed'",
+                             description="Completed 1st workouts"),
+    "thirtyday_reprograms": Metric("structured_events", "events", "eventTimestamp", "1",
+                                   "eventName = '30 Day Reprogram' AND status = 'Completed'",
+                                   description="Completed 30 day reprograms"),
+}
+
+def create_series_tables(conn):
+    real = "REAL" if storage.is_sqlite() else "DOUBLE PRECISION"
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SERIES_TABLE} (
+            metric TEXT NOT NULL,
+            series TEXT NOT NULL,
+            day TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            total {real} NOT NULL,
+            PRIMARY KEY (metric, day, series)
+        )
+    """)
+
+for _domain, _version in (("sales", 3), ("guests", 1), ("structured_events", 2)):
+    schema.migration(_domain, _version, "daily series bucket tables")(create_series_tables)
+
+# --- Maintenance ---
+def _bucket(metric: Metric, unit: str) -> str:
+    # The date part only: guest timestamps carry a UTC offset SQLite's date functions reject
+    return storage.date_bucket(unit, f"NULLIF(SUBSTR(CAST({metric.date_column} AS TEXT), 1, 10), '')")
+
+def _next_month(month: str) -> str:
+    d = datetime.date.fromisoformat(month)
+    return (d.replace(year=d.year + 1, month=1) if d.month == 12 else d.replace(month=d.month + 1)).isoformat()
+
+def _next_day(day: str) -> str:
+    return (datetime.date.fromisoformat(day) + datetime.timedelta(days=1)).isoformat()
+
+def _by_day(rows) -> Dict[str, Dict[str, Tuple[int, float]]]:
+    days: Dict[str, Dict[str, Tuple[int, float]]] = {}
+    for day, name, count, total in rows:
+        days.setdefault(day, {})[name] = (count, total or 0.0)
+    return days
+
+def _same(a: Dict[str, Tuple[int, float]], b: Dict[str, Tuple[int, float]]) -> bool:
+    return a.keys() == b.keys() and all(
+        a[s][0] == b[s][0] and round(a[s][1], 2) == round(b[s][1], 2) for s in a
+    )
+
+_followed: Dict[str, int] = {}  # metric -> last sales change this worker has applied
+
+def _has_change_log(metric: Metric) -> bool:
+    return metric.domain == "sales" and metric.table == "sales"
+
+def refresh(name: str, days: Optional[Sequence[str]] = None) -> int:
+    """
+    Re-bucket the days of `name` whose source rows changed, checking every day
+    or only `days` (ISO dates); the number of days rewritten.
+    """
+    metric = METRICS[name]
+    if days is not None and not days:
+        return 0
+    schema.ensure(metric.domain)
+    with storage.connection(metric.domain, must_exist=True) as conn:
+        if not schema.table_exists(conn, metric.source):
+            return 0
+        seq = None
+        if days is None and _has_change_log(metric) and schema.table_exists(conn, changes.TABLE):
+            # Read before the scan: a change committed during it is applied again later, which is harmless
+            seq = changes.latest()
+        series = metric.series or f"'{TOTAL}'"
+        day = _bucket(metric, "day")
+        sql = f"""
+            SELECT {day}, {series}, COUNT(*), SUM({metric.value})
+            FROM {metric.source}
+            WHERE {metric.where} AND {day} IS NOT NULL
+        """
+        stored_sql = f"SELECT day, series, count, total FROM {SERIES_TABLE} WHERE metric = ?"
+        params, stored_params = list(metric.params), [name]
+        if days is not None:
+            sql += " AND (" + " OR ".join(f"({metric.date_column} >= ? AND {metric.date_column} < ?)" for _ in days) + ")"
+            for d in days:
+                params += [d, _next_day(d)]
+            stored_sql += f" AND day IN {_in(days)}"
+            stored_params += list(days)
+        current = _by_day(conn.execute(sql + " GROUP BY 1, 2", tuple(params)).fetchall())
+        stored = _by_day(conn.execute(stored_sql, tuple(stored_params)).fetchall())
+        dirty = sorted(d for d in set(current) | set(stored) if not _same(current.get(d, {}), stored.get(d, {})))
+        for d in dirty:
+            conn.execute(f"DELETE FROM {SERIES_TABLE} WHERE metric = ? AND day = ?", (name, d))
+            rows = [(name, s, d, count, total) for s, (count, total) in current.get(d, {}).items()]
+            if rows:
+                conn.executemany(f"INSERT INTO {SERIES_TABLE} (metric, series, day, count, total) VALUES (?, ?, ?, ?, ?)",
+                                 rows)
+        conn.commit()
+    if seq is not None:
+        _followed[name] = seq
+    if dirty:
+        logger.info("timeseries %s: rebuilt %d day(s)", name, len(dirty))
+    return len(dirty)
+
+def _sale_day(sale: Any, metric: Metric) -> Optional[str]:
+    value = sale.get(metric.date_column) if isinstance(sale, dict) else None
+    try:
+        return datetime.date.fromisoformat(str(value)[:10]).isoformat() if value else None
+    except ValueError:
+        return None
+
+def follow_changes(name: str) -> bool:
+    """
+    Re-bucket only the days touched by the sales changes logged since this
+    worker last caught up. False, with nothing done, when a full refresh() is
+    needed instead: a metric without a change log, a worker that has not
+    run one yet, a reload, or more than _FEED_BATCH pending changes.
+    """
+    metric = METRICS[name]
+    seq = _followed.get(name)
+    if not _has_change_log(metric) or seq is None:
+        return False
+    pending = changes.since(seq, _FEED_BATCH + 1)
+    if len(pending) > _FEED_BATCH or any(c["action"] == "reload" for c in pending):
+        return False
+    # Where the sale was and where it is now: an edit can move it between days
+    days = {_sale_day(c[key], metric) for c in pending for key in ("old", "new", "sale")}
+    refresh(name, sorted(d for d in days if d))
+    if pending:
+        _followed[name] = pending[-1]["seq"]
+    return True
+
+# --- Keeping buckets fresh ---
+_locks = {name: threading.Lock() for name in METRICS}  # one refresh of a metric at a time in this worker
+_seen: Dict[str, Optional[int]] = {}  # metric -> cache generation its buckets were last brought up to date at
+_reconciled: Dict[str, float] = {}  # metric -> time of this worker's last full pass
+_requested: Set[str] = set()  # metrics a request found needing a full pass
+_wake = threading.Event()
+_reconciler: Optional[threading.Thread] = None
+_reconciler_lock = threading.Lock()
+
+def _generation() -> Optional[int]:
+    try:
+        return cache.generation()
+    except Exception:
+        return None
+
+def ensure_fresh(name: str):
+    """
+    Apply the sales changes logged since this worker last caught up, unless it
+    already has since the last write. Never runs a full refresh(): a metric
+    that needs one (no change log, a reload, a long backlog) is handed to the
+    background reconciler and served from the buckets as they are.
+    """
+    start_reconciler()
+    generation = _generation()
+    if generation is not None and _seen.get(name) == generation:
+        return
+    lock = _locks[name]
+    if not lock.acquire(blocking=False):
+        return  # the reconciler is running a full pass of it; serve what is there
+    try:
+        with jobs.lease(f"timeseries {name}") as acquired:
+            if not acquired:
+                return  # another worker is refreshing it right now
+            if follow_changes(name):
+                _seen[name] = generation
+                return
+    finally:
+        lock.release()
+    with _reconciler_lock:
+        _requested.add(name)
+    _wake.set()
+
+def reconcile(name: str):
+    """Full refresh() of one metric, unless another worker is running one."""
+    with _locks[name]:
+        generation = _generation()
+        with jobs.lease(f"timeseries {name}") as acquired:
+            if acquired:
+                refresh(name)
+                _seen[name] = generation
+        _reconciled[name] = time.monotonic()
+
+def reconcile_due():
+    """The full passes requests asked for, plus every metric not reconciled for settings.CACHE_TTL_SECONDS."""
+    with _reconciler_lock:
+        due = set(_requested)
+        _requested.clear()
+    now = time.monotonic()
+    for name in METRICS:
+        if name in due or now - _reconciled.get(name, float("-inf")) >= settings.CACHE_TTL_SECONDS:
+            try:
+                reconcile(name)
+            except Exception as e:  # a missing or broken source must not stop the other metrics
+                logger.warning("timeseries %s: reconcile failed: %s", name, e)
+
+def _reconcile_loop():
+    while True:
+        _wake.wait(settings.CACHE_TTL_SECONDS)
+        _wake.clear()
+        reconcile_due()
+
+def start_reconciler():
+    """Start this worker's background reconciler once; it picks up edits made outside the API."""
+    global _reconciler
+    if _reconciler is not None:
+        return
+    with _reconciler_lock:
+        if _reconciler is None:
+            _reconciler = threading.Thread(target=_reconcile_loop, name="timeseries-reconcile", daemon=True)
+            _reconciler.start()
+
+# --- Reading ---
+def bucket_start(day: datetime.date, interval: str) -> datetime.date:
+    if interval == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+def buckets(start: datetime.date, end: datetime.date, interval: str) -> List[datetime.date]:
+    """First day of every bucket overlapping [start, end]."""
+    out, current = [], bucket_start(start, interval)
+    while current <= end:
+        out.append(current)
+        if interval == "month":
+            current = datetime.date.fromisoformat(_next_month(current.isoformat()))
+        else:
+            current += datetime.timedelta(days=7 if interval == "week" else 1)
+    return out
+
+def read(name: str, start: datetime.date, end: datetime.date, interval: str) -> Dict[str, Any]:
+    """
+    {"buckets": [first day, ...], "series": {name: [value per bucket]},
+    "counts": {name: [rows per bucket]}} for days start..end; values are sums
+    for cash metrics and counts otherwise, zero where nothing happened.
+    """
+    metric = METRICS[name]
+    days = buckets(start, end, interval)
+    index = {d: i for i, d in enumerate(days)}
+    rows = storage.query(
+        metric.domain,
+        f"SELECT series, day, count, total FROM {SERIES_TABLE} WHERE metric = ? AND day >= ? AND day <= ?",
+        (name, start.isoformat(), end.isoformat()),
+    )
+    values: Dict[str, List[float]] = {}
+    counts: Dict[str, List[int]] = {}
+    for row in rows:
+        i = index[bucket_start(datetime.date.fromisoformat(row["day"]), interval)]
+        values.setdefault(row["series"], [0] * len(days))[i] += row["total"]
+        counts.setdefault(row["series"], [0] * len(days))[i] += row["count"]
+    if metric.series is None:
+        values.setdefault(TOTAL, [0] * len(days))
+        counts.setdefault(TOTAL, [0] * len(days))
+    if metric.value == "1":
+        values = counts
+    return {
+        "buckets": [d.isoformat() for d in days],
+        "series": {s: [round(v, 2) for v in vs] for s, vs in sorted(values.items())},
+        "counts": dict(sorted(counts.items())),
+    }
+
+def previous_year(start: datetime.date, end: datetime.date, interval: str) -> Tuple[datetime.date, datetime.date]:
+    """
+    The comparison range a year earlier: the same calendar months for monthly
+    series, otherwise 52 weeks back so each day lines up with the same weekday.
+    """
+    if interval == "month":
+        def shift(d):
+            return d.replace(year=d.year - 1, day=28) if (d.month, d.day) == (2, 29) else d.replace(year=d.year - 1)
+        return shift(start), shift(end)
+    return start - datetime.timedelta(weeks=52), end - datetime.timedelta(weeks=52)
@@ -0,0 +1,246 @@
+# app/warmup.py
+"""
+Post-startup warm-up and readiness.
+
+Once the startup hook has finished, start() runs the registered warm-up steps
+on a background thread. Required steps come first and gate readiness: they
+open the database connections (reading SQLite files into the OS page cache),
+build the app.lookups indexes, and request the dashboard endpoints once so
+today's snapshot sits in the shared response cache before the first user asks.
+The optional steps then bring the daily series buckets up to date (and start
+their background reconciler, app.timeseries), and import the dependencies
+routers keep out of module scope (pandas, requests) ahead of the first upload
+or ABC sync.
+
+status() backs /api/health/ready: 503 until startup and the required steps are
+done, then 200 with each step's progress; ?warm=true also waits for the rest.
+"""
+
+import time
+
+# Imported first by app.main, so boot_seconds covers the framework and router imports
+_loaded_at = time.time()
+
+import asyncio
+import importlib
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Imported lazily by the routers; warm-up loads them in the background instead
+HEAVY_MODULES = (
+    "pandas",
+    "requests",
+    "app.scripts.process_sales",
+    "app.scripts.process_guests",
+    "app.scripts.ingest_attrition",
+)
+
+# What the dashboard pages load first; requested once so their responses are cached
+DASHBOARD_PATHS = (
+    "/api/sales/stats",
+    "/api/sales/abc-sections",
+    "/api/sales/nb-promo",
+    "/api/sales/promo-only",
+    "/api/sales/all",
+    "/api/sales/nb-cash-entries",
+    "/api/sales/eft-entries",
+    "/api/sales/collections-dues",
+    "/api/sales/pif-renewals-dues",
+    "/api/attrition/summary",
+    "/api/employees",
+    "/api/employees/trainers",
+    "/api/memberships",
+    "/api/kpi/goals",
+    "/api/kpi/pt-quotas",
+    "/api/guests/visit-types",
+    "/api/coachees-table/summary",
+    "/api/coachees-table/sales?type=new&period=mtd",
+    "/api/coachees-table/sales?type=renew&period=mtd",
+    "/api/events/first-workout/counts",
+    "/api/events/thirtyday-reprogram/counts",
+    "/api/events/other-reprogram/counts",
+    "/api/eft-calculations/counts",
+    "/api/first-workouts/counts",
+    "/api/thirtyday-reprograms/counts",
+)
+
+# Sent with the dashboard requests so session recording leaves them out
+HEADER = "x-warmup"
+
+_lock = threading.Lock()
+_steps: Dict[str, Callable[[], Any]] = {}
+_required: List[str] = []
+_progress: Dict[str, Dict[str, Any]] = {}
+_started_at = None
+_app = None
+_ready = threading.Event()
+_warmed = threading.Event()
+
+def step(name: str, required: bool = False):
+    """
+    Register fn() to run during warm-up. Required steps run first and the
+    worker reports ready only once they are done; the rest run after.
+    """
+    def register(fn: Callable[[], Any]) -> Callable[[], Any]:
+        _steps[name] = fn
+        if required:
+            _required.append(name)
+        return fn
+    return register
+
+@step("connections", required=True)
+def open_connections():
+    """Fill the PostgreSQL pool, or read the SQLite files into the OS page cache and open each once."""
+    from . import cache, storage
+    cache.connect()
+    if not storage.is_sqlite():
+        # Held together, so the pool has to open every one of them
+        conns = [storage.connect("sales") for _ in range(settings.DB_POOL_SIZE)]
+        try:
+            for conn in conns:
+                conn.execute("SELECT 1").fetchone()
+        finally:
+            for conn in conns:
+                conn.close()
+        return
+    # Request connections are short-lived and lose SQLite's own page cache, so
+    # warming means getting the file pages into the OS cache they read through
+    budget = settings.WARMUP_PREFETCH_MB * 1024 * 1024
+    for path in sorted({storage.path_for(domain) for domain in storage.DOMAIN_FILES}):
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            while budget > 0:
+                chunk = f.read(min(budget, 1024 * 1024))
+                if not chunk:
+                    break
+                budget -= len(chunk)
+        storage.sqlite_connect(path).close()
+
+@step("lookups", required=True)
+def build_lookups():
+    from . import lookups
+    lookups.build_all()
+
+async def _get(app, path: str) -> int:
+    """GET path through the ASGI app in-process; the status code."""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query.encode(),
+        "headers": [(b"host", b"localhost"), (HEADER.encode(), b"1")],
+        "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    sent = False
+    done = asyncio.Event()
+    status = 500
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            done.set()
+
+    await app(scope, receive, send)
+    return status
+
+@step("dashboard", required=True)
+def precompute_dashboard():
+    """Request each of DASHBOARD_PATHS once, leaving today's responses in the cache."""
+    if _app is None or not settings.WARMUP_DASHBOARD:
+        return
+
+    async def run():
+        return [(path, await _get(_app, path)) for path in DASHBOARD_PATHS]
+
+    failed = [f"{path} ({status})" for path, status in asyncio.run(run()) if status >= 400]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(DASHBOARD_PATHS)} dashboard requests failed: {', '.join(failed)}")
+
+@step("timeseries")
+def reconcile_timeseries():
+    """Bring every metric's buckets up to date, then keep reconciling them in the background."""
+    from . import timeseries
+    timeseries.reconcile_due()
+    timeseries.start_reconciler()
+
+for _module in HEAVY_MODULES:
+    step(f"import {_module}")(lambda module=_module: importlib.import_module(module))
+
+def _run_step(name: str):
+    fn = _steps[name]
+    with _lock:
+        _progress[name]["state"] = "running"
+    started = time.perf_counter()
+    try:
+        fn()
+        state, error = "done", None
+    except Exception as e:  # warm-up is best effort; the real request reports the failure
+        logger.warning("warm-up step %s failed: %s", name, e)
+        state, error = "failed", str(e)
+    with _lock:
+        _progress[name].update(state=state, ms=round((time.perf_counter() - started) * 1000, 1), error=error)
+
+def _run():
+    for name in _required:
+        _run_step(name)
+    _ready.set()
+    logger.info("required warm-up done %.2fs after boot", time.time() - _loaded_at)
+    for name in _steps:
+        if name not in _required:
+            _run_step(name)
+    _warmed.set()
+    logger.info("warm-up finished %.2fs after boot", time.time() - _loaded_at)
+
+def start(app=None):
+    """Called once the startup hook is done: warm the worker in the background; `app` serves the dashboard step."""
+    global _started_at, _app
+    with _lock:
+        if _started_at is not None:
+            return
+        _started_at = time.time()
+        _app = app
+        for name in _steps:
+            _progress[name] = {"name": name, "state": "pending", "ms": None, "error": None}
+    if not settings.WARMUP_ENABLED:
+        for entry in _progress.values():
+            entry["state"] = "skipped"
+        _ready.set()
+        _warmed.set()
+        return
+    threading.Thread(target=_run, name="warmup", daemon=True).start()
+
+def wait(timeout: Optional[float] = None) -> bool:
+    """Block until every warm-up step has finished (benchmarks use this before timing)."""
+    return _warmed.wait(timeout)
+
+def status() -> Dict[str, Any]:
+    with _lock:
+        steps: List[Dict[str, Any]] = [dict(entry) for entry in _progress.values()]
+    finished = sum(1 for s in steps if s["state"] in ("done", "failed", "skipped"))
+    if _started_at is None:
+        phase = "starting"
+    else:
+        phase = "ready" if _ready.is_set() else "warming"
+    return {
+        "status": phase,
+        "warmed": _warmed.is_set(),
+        "boot_seconds": round(_started_at - _loaded_at, 3) if _started_at is not None else None,
+        "uptime_seconds": round(time.time() - _loaded_at, 3),
+        "warmup": {"completed": finished, "total": len(_steps), "required": list(_required), "steps": steps},
+    }
@@ -0,0 +1,14 @@
+# benchmarks/__init__.py
+"""
+Benchmark suite for the API.
+
+    python -m benchmarks.datagen --scale small      # build benchmarks/data/small.db
+    python -m benchmarks.run --scale small          # time every GET endpoint against it
+    python -m benchmarks.run --scale small --save-baseline
+    python -m benchmarks.run --scale small --compare
+    python -m benchmarks.loadtest --scale small --users 50 --workers 4
+    python -m benchmarks.importtime                 # import and startup profile
+
+Run from backend/. Each tool points app.storage at the generated unified
+database before importing the app, so the real data files are never touched.
+"""
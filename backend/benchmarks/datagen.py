@@ -0,0 +1,517 @@
+# benchmarks/datagen.py
+"""
+Synthetic datasets for the benchmark suite.
+
+Builds one unified SQLite file per scale (benchmarks/data/<scale>.db) with
+every table the routers read. Tables are created by the same code the
+importers use (process_sales.ensure_sales_schema, the structured-events
+migration, the app.schema migrations, import_abc_api_raw, ingest_attrition, ...)
+so the benchmark sees production schemas and indexes. Generation is seeded,
+so a given scale always produces the same rows; dates fall in the 13 months
+up to today so the today / month-to-date endpoints have data to scan.
+
+    python -m benchmarks.datagen --scale medium [--seed 7] [--out path.db]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DATA_DIR = os.path.join(BACKEND_DIR, "benchmarks", "data")
+
+# Row counts per scale. Transactions follow sales (1-3 per sale) and
+# event_members follow events (one member per event).
+SCALES: Dict[str, Dict[str, int]] = {
+    "tiny": {"sales": 1_000, "members": 2_000, "events": 5_000, "pos_transactions": 1_000,
+             "raw_events": 500, "guests": 500, "workouts": 500, "attrition": 300},
+    "small": {"sales": 10_000, "members": 50_000, "events": 100_000, "pos_transactions": 10_000,
+              "raw_events": 5_000, "guests": 5_000, "workouts": 5_000, "attrition": 2_000},
+    "medium": {"sales": 100_000, "members": 150_000, "events": 500_000, "pos_transactions": 100_000,
+               "raw_events": 20_000, "guests": 20_000, "workouts": 20_000, "attrition": 10_000},
+    "large": {"sales": 1_000_000, "members": 500_000, "events": 1_000_000, "pos_transactions": 1_000_000,
+              "raw_events": 50_000, "guests": 50_000, "workouts": 50_000, "attrition": 25_000},
+}
+
+DAYS_OF_HISTORY = 400
+BATCH_SIZE = 10_000
+CLUB_NUMBER = "40059"
+
+# (Name, Position, Profit Center) -- the run module picks path parameters from these
+STAFF: List[Tuple[str, str, str]] = [
+    ("Sheffield, Dakota", "Sales - General Manager", "New Business"),
+    ("Ortega, Xavier", "Sales - Assistant General Manager", "New Business"),
+    ("Hopkins, Dallas", "Sales - Sales Manager", "New Business"),
+    ("Iremonger, Anatoly", "Sales - Fitness Facilitator", "New Business"),
+    ("Moss, Tucker", "Sales - Fitness Facilitator", "New Business"),
+    ("Cooley, Asia", "Sales - Receptionist", "New Business"),
+    ("Kassa, Ephriam", "Sales - Receptionist", "New Business"),
+    ("Zambrana, Erika", "Sales - Receptionist", "New Business"),
+    ("Bridegroom, Zachary", "Trainer - Fitness Director", "Personal Training - NEW, PT Postdate - Renew"),
+    ("Swet, Sean", "Trainer - Weekend Fitness Director", "Personal Training - NEW, PT Postdate - Renew"),
+    ("Lair, Abbigayle", "Trainer - Assistant Fitness Director", "Personal Training - NEW, PT Postdate - Renew"),
+    ("Damis-salaam, Nyil", "Trainer", "Personal Training - NEW, PT Postdate - Renew"),
+    ("Epps, Sam", "Trainer", "Personal Training - NEW, PT Postdate - Renew"),
+    ("Eubanks, Marcus", "Trainer", "Personal Training - NEW, PT Postdate - Renew"),
+    ("Werwinski, Sydney", "Trainer", "Personal Training - NEW, PT Postdate - Renew"),
+    ("Brecheisen, Gray", "Coordinator", "POS Dues"),
+    ("Favour, Madeline", "Coordinator", "POS Dues"),
+]
+SALES_STAFF = [name for name, position, _ in STAFF if position.startswith("Sales")]
+TRAINERS = [name for name, position, _ in STAFF if "Trainer" in position]
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Chris", "Karen",
+    "Daniel", "Lisa", "Matthew", "Nancy", "Anthony", "Betty", "Mark", "Sandra", "Xavier", "Ashley",
+    "Riley", "Kimberly", "Nathaniel", "Emily", "Kevin", "Donna", "Brian", "Michelle", "George", "Carol",
+    "Chijioke", "Amanda", "Javaris", "Melissa", "Roseann", "Deborah", "Sanee", "Stephanie", "Tucker", "Rebecca",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson",
+    "Walker", "Young", "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores",
+    "Phan", "Callahan", "Barilla", "Boyd", "Kamanu", "Matthews", "Mclean", "Murray", "Zaton", "Ortega",
+]
+
+MEMBERSHIP_TYPES = ["ACCESS", "AMENITIES PLUS", "CHAMPIONS CLUB", "ALL-ACCESS", "Prospect"]
+# (plan name, monthly price, category) -- sales.agreement_payment_plan draws from the same names
+MEMBERSHIP_PLANS = [
+    ("Access MTM - First and Last- In Club.", 29.0, "Access"),
+    ("Access MTM - First and Last", 29.0, "Access"),
+    ("Memorial Day Access MTM.", 24.0, "Access"),
+    ("1. 59 Access Month to Month", 59.0, "Access"),
+    ("1. 39 Access Guarantee", 39.0, "Access"),
+    ("Amenities MTM- First and Last- In Club.", 49.0, "Amenities"),
+    ("Amenities Plus- MTM- First and Last", 54.0, "Amenities"),
+    ("Amenities MTM - No First- In Club.", 49.0, "Amenities"),
+    ("24Amenities Plus 12M Contract", 44.0, "Amenities"),
+    ("Champions 12M Contract - NO FIRST.", 119.0, "Champions"),
+    ("24Champions 12M Contract - NO LAST", 119.0, "Champions"),
+    ("Memorial Day Champions 12M No First Contract.", 99.0, "Champions"),
+    ("Memorial Day Access 12M Pay in Full.", 0.0, "PIF Access"),
+    ("Champions 12M PIF.", 0.0, "PIF Champions"),
+]
+# profit center -> (weight, main items)
+PROFIT_CENTERS = {
+    "New Business": (40, ["First Month Dues", "First Month Dues; Last Month Dues", "Last Month Dues",
+                          "PIF Dues - New", "Collect At Club", "Guest Fee -1 Day", "Guest Fee - 1 Week"]),
+    "POS Dues": (20, ["Collect At Club", "Past Due Dues"]),
+    "PT Postdate - Renew": (8, ["PT Postdate Renew 60"]),
+    "PT Postdate - New": (2, ["PT Postdate New 60"]),
+    "Promotion": (8, ["UPG Access to Amenities", "UPG Amenities to Champions", "Promo Enrollment"]),
+    "Personal Training - NEW": (6, ["PT New 60 min", "PT New 30 min"]),
+    "Personal Training - RENEW": (6, ["PT Renew 60 min", "PT Renew 30 min"]),
+    "PIF Renewals": (4, ["PIF Dues - Renewal"]),
+    "Downgrade Fees": (3, ["Downgrade Fee"]),
+    "Collections": (3, ["Collections Payment"]),
+}
+AGREEMENT_TYPES = (["New Agreement"] * 8) + ["Rewrite", "Renewal"]
+PAYMENT_METHODS = (["Visa"] * 7) + ["Master Card", "Master Card", "American Express", "Discover", "Cash"]
+CAMPAIGNS = ["Advertising", "Buddy Referral", "Walk In", "Corporate", "Former Member"]
+
+EVENT_NAMES = (["1st Workout"] * 5) + (["30 Day Reprogram"] * 3) + (["Other Reprogram"] * 2) + \
+    (["PT 60 Session"] * 6) + (["Availability"] * 4)
+EVENT_STATUSES = (["Completed"] * 6) + ["Scheduled", "Scheduled", "Cancelled", "No Show"]
+CSV_EVENT_TYPES = ["1st Workout", "First Workout", "30 Day Reprogram", "Other Reprogram", "PT 60 Session"]
+
+GUEST_VISIT_TYPES = ["Appointment", "Walk In", "Guest Pass", "Class"]
+GUEST_SOURCES = ["Buddy Referral", "Former Member", "Corporate", "Advertising (Social Media/TV/Internet)",
+                 "tagJOIN", "Out of Town Guest", "Class Pass", "Under 18 guest", ""]
+
+ATTRITION_STATUSES = [("Cancelled", "Member Request"), ("Expired", "Expired"), ("Active", "Returned for collection"),
+                      ("Cancelled", "Returned for collection"), ("Frozen", "Medical")]
+
+KPI_GOALS = [
+    ("guests", 500), ("qualified_guests", 450), ("deals", 315), ("first_workouts", 220),
+    ("five_star_reviews", 175), ("reprograms", 130), ("new_pt_units", 60), ("closing_percentage", 70),
+    ("first_workout_show_percentage", 70), ("five_star_review_percentage", 80), ("average_eft", 50),
+    ("pt_quota_new_fd", 25000), ("pt_quota_renew_fd", 30000), ("pt_quota_new_wfd", 20000),
+    ("pt_quota_renew_wfd", 25000), ("nbpromo_quota_gm", 50000), ("nbpromo_quota_agm", 20000),
+    ("fept_quota_gm", 15000), ("fept_quota_agm", 5347), ("neweft_quota_gm", 12000), ("neweft_quota_agm", 4277),
+    ("collections_quota", 5000), ("pif_renewals_quota", 3000), ("abc_dues_quota", 129426),
+    ("coordinator_bonus_quota", 8000),
+]
+
+def dataset_path(scale: str) -> str:
+    return os.path.join(DATA_DIR, f"{scale}.db")
+
+def use_dataset(path: str):
+    """
+    Point app.storage at a unified database. Must run before anything under app
+    is imported: storage and several routers resolve table locations at import.
+    """
+    os.environ["UNIFIED_DB_PATH"] = path
+    os.environ.pop("DATABASE_URL", None)
+    os.environ.setdefault("CACHE_PATH", os.path.join(DATA_DIR, "cache.db"))
+    # Settings requires ABC credentials; the benchmarked endpoints never call ABC
+    os.environ.setdefault("APP_ID", "benchmark")
+    os.environ.setdefault("APP_KEY", "benchmark")
+    if not os.path.exists(path):
+        open(path, "a").close()
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    # Relative paths the app writes to (db_backups/, slow_queries.log) land next to the data
+    os.makedirs(DATA_DIR, exist_ok=True)
+    os.chdir(DATA_DIR)
+
+def _batches(rows: Iterator[tuple], size: int = BATCH_SIZE) -> Iterator[List[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class _Generator:
+    """Seeded value helpers shared by the table builders."""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def hex_id(self, bits: int = 128) -> str:
+        return f"{self.rng.getrandbits(bits):0{bits // 4}x}"
+
+    def day(self) -> datetime:
+        # Skewed toward recent days, like a live club: half the rows fall in the last ~90 days
+        offset = int(self.rng.expovariate(1 / 120)) % DAYS_OF_HISTORY
+        return self.today - timedelta(days=offset)
+
+    def moment(self) -> datetime:
+        return self.day() + timedelta(hours=self.rng.randint(5, 21), minutes=self.rng.choice((0, 15, 30, 45)))
+
+    def person(self) -> Tuple[str, str]:
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def money(self, low: float, high: float) -> float:
+        return round(self.rng.uniform(low, high), 2)
+
+def _first_last(name: str) -> str:
+    """'Ortega, Xavier' -> 'Xavier  Ortega' (ABC's commission_employees format)."""
+    last, _, first = name.partition(", ")
+    return f"{first}  {last}"
+
+# --- Reference tables ---
+def build_reference(conn, gen: _Generator):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS employees (
+            "Active" TEXT, "Barcode" TEXT, "Name" TEXT, "Position" TEXT,
+            "Profit Center" TEXT, "hired" TEXT, "Quota" REAL DEFAULT 0
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO employees ("Active", "Barcode", "Name", "Position", "Profit Center", "hired", "Quota") '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        [("Yes", str(gen.rng.randint(1000, 99999999)), name, position, center,
+          gen.day().strftime("%m/%d/%Y"), 550.0) for name, position, center in STAFF],
+    )
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS memberships (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            membership_type TEXT NOT NULL,
+            price REAL NOT NULL DEFAULT 0.0,
+            other_names TEXT NOT NULL
+        )
+    """)
+    conn.executemany("INSERT INTO memberships (membership_type, price, other_names) VALUES (?, ?, ?)",
+                     MEMBERSHIP_PLANS)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS kpi_goals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            metric_name TEXT UNIQUE NOT NULL,
+            goal_value REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.executemany("INSERT INTO kpi_goals (metric_name, goal_value) VALUES (?, ?)", KPI_GOALS)
+
+# --- Sales (process_sales schema) ---
+def build_sales(conn, gen: _Generator, count: int):
+    from app.scripts.process_sales import ensure_sales_schema
+    ensure_sales_schema(conn.cursor())
+    centers = list(PROFIT_CENTERS)
+    weights = [PROFIT_CENTERS[c][0] for c in centers]
+    plans = [plan for plan, _, _ in MEMBERSHIP_PLANS]
+
+    def rows():
+        for i in range(count):
+            rng = gen.rng
+            agreement = str(4005900000 + i // 2)
+            center = rng.choices(centers, weights)[0]
+            first, last = gen.person()
+            member_name = f"{last}, {first}"
+            paid = gen.day().strftime("%Y-%m-%d")
+            unique = hashlib.md5(f"{agreement}_{paid}_{member_name}_{center}".encode("utf-8")).hexdigest()[:8]
+            seller = rng.choice(SALES_STAFF)
+            method = rng.choice(PAYMENT_METHODS)
+            items = [rng.choice(PROFIT_CENTERS[center][1]) for _ in range(rng.choice((1, 1, 2, 3)))]
+            amounts = [gen.money(10, 600) for _ in items]
+            sale = (f"{agreement}_{unique}", agreement, center, member_name, rng.choice(MEMBERSHIP_TYPES),
+                    rng.choice(AGREEMENT_TYPES), rng.choice(plans), round(sum(amounts), 2), len(items),
+                    seller, _first_last(seller), method, "; ".join(items), paid, 0)
+            transactions = [
+                (sale[0], paid, item, amount, rng.choice(CAMPAIGNS), amount, 1, amount,
+                 round(amount * 0.1, 2), round(amount * 1.1, 2), seller, _first_last(seller), "SYSTEM", method)
+                for item, amount in zip(items, amounts)
+            ]
+            yield sale, transactions
+
+    for batch in _batches(rows()):
+        conn.executemany("INSERT OR IGNORE INTO sales VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         [sale for sale, _ in batch])
+        conn.executemany("""
+            INSERT INTO transactions (sale_id, payment_date, item, amount, campaign, next_due_amount, package_qty,
+                income_items, income_tax, income_total, sales_person, commission_employees, employee_name,
+                payment_method)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [t for _, transactions in batch for t in transactions])
+    audit = [(f"{4005900000 + i:d}_audit", "update", json.dumps({"total_amount": 0}), json.dumps({"total_amount": 1}))
+             for i in range(count // 20)]
+    conn.executemany("INSERT INTO sales_audit (sale_id, action, old_data, new_data) VALUES (?, ?, ?, ?)", audit)
+
+# --- Members and structured events ---
+def build_members(conn, gen: _Generator, count: int) -> List[str]:
+    from app import schema
+    from app.db import MEMBERS_TABLE
+    schema.ensure("members")
+    member_ids = []
+
+    def rows():
+        for i in range(count):
+            member_id = gen.hex_id()
+            member_ids.append(member_id)
+            first, last = gen.person()
+            membership = gen.rng.choice(MEMBERSHIP_TYPES)
+            since = gen.day()
+            checkins = 0 if membership == "Prospect" else gen.rng.randint(0, 300)
+            first_in = (since + timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S") if checkins else ""
+            last_in = gen.moment().strftime("%Y-%m-%d %H:%M:%S") if checkins else ""
+            yield (member_id, first.upper(), last.upper(), f"{first}.{last}{i}@example.com".lower(),
+                   f"(206) {gen.rng.randint(200, 999)}-{gen.rng.randint(0, 9999):04d}",
+                   "PROSP" if membership == "Prospect" else f"{i:05d}", membership, checkins, first_in, last_in,
+                   since.strftime("%Y-%m-%d"), _first_last(gen.rng.choice(SALES_STAFF)) if checkins else "")
+
+    for batch in _batches(rows()):
+        conn.executemany(f"INSERT INTO {MEMBERS_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    return member_ids
+
+def build_structured_events(conn, gen: _Generator, count: int, member_ids: Sequence[str]):
+    from app.scripts.migrate_events_to_structured import create_structured_tables
+    create_structured_tables(conn.cursor())
+
+    def rows():
+        for _ in range(count):
+            event_id = gen.hex_id()
+            trainer = gen.rng.choice(TRAINERS)
+            last, _, first = trainer.partition(", ")
+            member_id = gen.rng.choice(member_ids)
+            yield ((event_id, gen.rng.choice(EVENT_NAMES), gen.moment().strftime("%Y-%m-%d %H:%M:%S.000000"),
+                    gen.rng.choice(EVENT_STATUSES), first, last, CLUB_NUMBER),
+                   (event_id, member_id, gen.rng.choice(FIRST_NAMES), gen.rng.choice(LAST_NAMES)))
+
+    for batch in _batches(rows()):
+        conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)", [e for e, _ in batch])
+        conn.executemany("INSERT INTO event_members (eventId, memberId, firstName, lastName) VALUES (?, ?, ?, ?)",
+                         [m for _, m in batch])
+
+def _raw_event(gen: _Generator) -> dict:
+    trainer = gen.rng.choice(TRAINERS)
+    last, _, first = trainer.partition(", ")
+    when = gen.moment()
+    return {
+        "eventId": gen.hex_id(),
+        "eventName": gen.rng.choice(EVENT_NAMES),
+        "category": "Appointment",
+        "eventTimestamp": when.strftime("%Y-%m-%d %H:%M:%S.000000"),
+        "status": gen.rng.choice(EVENT_STATUSES),
+        "duration": "60",
+        "employeeName": f"{first}  {last}",
+        "employeeFirstName": first,
+        "employeeLastName": last,
+        "clubNumber": CLUB_NUMBER,
+        "members": {"member": [{"memberId": gen.hex_id()}]},
+    }
+
+def build_raw_events(gen: _Generator, count: int):
+    """api_events and abc_events through the same insert helpers the ABC sync uses."""
+    from app import db
+    db.insert_api_events([_raw_event(gen) for _ in range(count)])
+    db.insert_abc_events([_raw_event(gen) for _ in range(count)])
+
+def build_pos_transactions(conn, gen: _Generator, count: int, member_ids: Sequence[str]):
+    from app.scripts.import_abc_api_raw import ensure_tables, upsert_pos_transactions
+    ensure_tables(conn)
+
+    def transactions():
+        for i in range(count):
+            items = [{"name": gen.rng.choice(["Protein Shake", "Water", "Day Pass", "Towel", "Supplement"]),
+                      "subtotal": str(gen.money(2, 60)), "tax": str(gen.money(0, 5))}
+                     for _ in range(gen.rng.randint(1, 3))]
+            yield {
+                "transactionId": gen.hex_id(),
+                "transactionTimestamp": gen.moment().strftime("%Y-%m-%d %H:%M:%S.000000"),
+                "memberId": gen.rng.choice(member_ids),
+                "homeClub": CLUB_NUMBER,
+                "employeeId": gen.hex_id(),
+                "receiptNumber": str(100000 + i),
+                "stationName": gen.rng.choice(["Front Desk", "Cafe"]),
+                "return": "false",
+                "items": {"item": items},
+            }
+
+    batch = []
+    for tx in transactions():
+        batch.append(tx)
+        if len(batch) >= BATCH_SIZE:
+            upsert_pos_transactions(conn, batch)
+            batch = []
+    upsert_pos_transactions(conn, batch)
+
+# --- CSV-imported tables ---
+def build_csv_events(conn, gen: _Generator, count: int):
+    from app.scripts.process_events import CREATE_TABLE_SQL, EVENTS_TABLE
+    conn.executescript(CREATE_TABLE_SQL)
+
+    def rows():
+        for i in range(count):
+            first, last = gen.person()
+            when = gen.moment()
+            status = gen.rng.choice(EVENT_STATUSES)
+            yield (CLUB_NUMBER, _first_last(gen.rng.choice(TRAINERS)), str(4005900000 + i), f"{last}, {first}",
+                   gen.rng.choice(CSV_EVENT_TYPES), gen.money(0, 90), when.strftime("%Y-%m-%d"),
+                   when.strftime("%H:%M"), status, gen.money(0, 20),
+                   when.strftime("%Y-%m-%d %H:%M") if status == "Completed" else "")
+
+    for batch in _batches(rows()):
+        conn.executemany(f"""
+            INSERT INTO {EVENTS_TABLE} (club_nbr, employee_name, agreement_number, member_name, event_type, price,
+                event_date, event_time, event_status, event_commission, completed_datetime)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, batch)
+
+def _workout_frame(gen: _Generator, count: int, event_type: str):
+    import pandas as pd
+    records = []
+    for i in range(count):
+        first, last = gen.person()
+        when = gen.moment()
+        records.append({
+            "Club Nbr": int(CLUB_NUMBER),
+            "Member Name (last, first)": f"{last}, {first}",
+            "Agreement #": 4005900000 + i,
+            "Membership Type": gen.rng.choice(MEMBERSHIP_TYPES[:-1]),
+            "Employee": _first_last(gen.rng.choice(TRAINERS + SALES_STAFF)),
+            "Event Type": event_type,
+            "Event Date": when.strftime("%m/%d/%Y"),
+            "Event Time": when.strftime("%H:%M"),
+            "Event Status": gen.rng.choice(EVENT_STATUSES),
+            "Purchased Visits": 1.0,
+            "Unit Price": 0.0,
+            "Remaining Visits": 0.0,
+        })
+    return pd.DataFrame.from_records(records)
+
+def build_csv_tables(conn, gen: _Generator, counts: Dict[str, int]):
+    import pandas as pd
+    from app import storage
+    storage.write_frame(_workout_frame(gen, counts["workouts"], "1st Workout"), "first_workouts", conn, "replace")
+    storage.write_frame(_workout_frame(gen, counts["workouts"], "30 Day Reprogram"), "thirtyday_reprograms",
+                        conn, "replace")
+
+    guests = []
+    for i in range(counts["guests"]):
+        first, last = gen.person()
+        guests.append({
+            "id": 66300000 + i, "first_name": first, "last_name": last,
+            "email": f"{first}.{last}{i}@example.com".lower(),
+            "visit_type": gen.rng.choice(GUEST_VISIT_TYPES), "source": gen.rng.choice(GUEST_SOURCES) or None,
+            "created_at": gen.moment().strftime("%Y-%m-%d %H:%M:%S -0700"),
+            "salesperson": _first_last(gen.rng.choice(SALES_STAFF)).replace("  ", " "),
+            "phone_mobile": 12060000000 + gen.rng.randint(0, 9999999), "notes": "Person Signed In Via Guest App",
+        })
+    storage.write_frame(pd.DataFrame.from_records(guests), "guests", conn, "replace")
+
+def build_attrition(gen: _Generator, count: int):
+    import pandas as pd
+    from app import storage
+    from app.scripts.ingest_attrition import COLUMNS, write_attrition
+    rows = []
+    for i in range(count):
+        first, last = gen.person()
+        status, reason = gen.rng.choice(ATTRITION_STATUSES)
+        rows.append((CLUB_NUMBER, "Emerald City Athletics", str(4005900000 + i), f"{last}, {first}", "Yes",
+                     "1990-01-01", "1 Main St", "Seattle", "WA", "98101", f"{first}{i}@example.com".lower(),
+                     "(206) 555-0100", gen.rng.choice(MEMBERSHIP_TYPES[:-1]), status, reason,
+                     gen.day().strftime("%Y-%m-%d"), gen.rng.choice("MF"), gen.rng.randint(18, 80),
+                     gen.money(20, 130)))
+    write_attrition(pd.DataFrame(rows, columns=COLUMNS), storage.path_for("attrition"), source="benchmarks.datagen")
+
+def generate(scale: str, path: str, seed: int = 42) -> Dict[str, float]:
+    """Build the dataset for `scale` at `path` (replacing it). Returns seconds spent per table group."""
+    path = os.path.abspath(path)
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    use_dataset(path)
+    from app import storage
+
+    counts = SCALES[scale]
+    gen = _Generator(seed)
+    timings: Dict[str, float] = {}
+
+    def timed(name, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        timings[name] = round(time.perf_counter() - started, 2)
+        print(f"  {name:<20} {timings[name]:>8.2f}s", flush=True)
+        return result
+
+    conn = storage.connect("sales")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    timed("reference", build_reference, conn, gen)
+    timed("sales", build_sales, conn, gen, counts["sales"])
+    conn.commit()
+    member_ids = timed("members", build_members, conn, gen, counts["members"])
+    conn.commit()
+    timed("structured_events", build_structured_events, conn, gen, counts["events"], member_ids)
+    timed("pos_transactions", build_pos_transactions, conn, gen, counts["pos_transactions"], member_ids)
+    timed("csv_events", build_csv_events, conn, gen, counts["workouts"])
+    timed("csv_tables", build_csv_tables, conn, gen, counts)
+    conn.commit()
+    conn.close()
+    timed("raw_events", build_raw_events, gen, counts["raw_events"])
+    timed("attrition", build_attrition, gen, counts["attrition"])
+
+    with storage.connection("sales") as conn:
+        conn.execute("ANALYZE")
+        conn.commit()
+    return timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic benchmark database.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Database file to write (default: benchmarks/data/<scale>.db)")
+    args = parser.parse_args(argv)
+
+    path = os.path.abspath(args.out or dataset_path(args.scale))
+    print(f"Generating {args.scale} dataset at {path}")
+    started = time.perf_counter()
+    generate(args.scale, path, args.seed)
+    size_mib = os.path.getsize(path) / 2 ** 20
+    print(f"Done in {time.perf_counter() - started:.1f}s ({size_mib:.1f} MiB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/importtime.py
+"""
+Cold-start profile.
+
+Boots the app in a fresh interpreter under `python -X importtime` and reports
+how long it took to import app.main and to run the startup hooks, then the
+modules that cost the most: by cumulative time (a module plus everything it
+pulled in) and by top-level package. Run it after touching imports; a module
+that drags pandas or SQLAlchemy into app.main shows up at the top.
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --runs 5 --top 30 --budget-ms 1000
+
+The fastest of `--runs` boots is reported (the first run also pays for
+writing .pyc files). `--budget-ms` exits 1 when boot (import + startup)
+takes longer. The app boots against benchmarks/data/<scale>.db when it
+exists, otherwise an empty database in a temporary directory, so the real
+data files are never touched.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from benchmarks.datagen import BACKEND_DIR, dataset_path
+
+# Runs in the child interpreter; prints its timings as the last stdout line
+BOOT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app):
+    booted = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "startup_ms": (booted - imported) * 1000}))
+"""
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def parse(stderr: str) -> List[Dict[str, Any]]:
+    """The -X importtime lines as {module, self_us, cumulative_us, depth}."""
+    modules = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            modules.append({
+                "module": m.group(4),
+                "self_us": int(m.group(1)),
+                "cumulative_us": int(m.group(2)),
+                "depth": len(m.group(3)) // 2,
+            })
+    return modules
+
+def _app_main_subtree(modules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """What `import app.main` pulled in: importtime prints a module after its children."""
+    end = next((i for i, m in enumerate(modules) if m["module"] == "app.main"), None)
+    if end is None:
+        return modules
+    start = end
+    while start > 0 and (modules[start - 1]["depth"] > 0 or modules[start - 1]["module"] == "app"):
+        start -= 1
+    return modules[start:end + 1]
+
+def boot_once(dataset: str, workdir: str) -> Dict[str, Any]:
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, LOG_LEVEL="WARNING", PERF_SLOW_QUERY_LOG="", WARMUP_ENABLED="false",
+               UNIFIED_DB_PATH=dataset, CACHE_PATH=os.path.join(workdir, "cache.db"))
+    env.pop("DATABASE_URL", None)
+    env.setdefault("APP_ID", "benchmark")
+    env.setdefault("APP_KEY", "benchmark")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT_SCRIPT], cwd=workdir, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"boot failed:\n{proc.stderr[-3000:]}")
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    timings["modules"] = _app_main_subtree(parse(proc.stderr))
+    timings["boot_ms"] = timings["import_ms"] + timings["startup_ms"]
+    return timings
+
+def summarize(modules: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    by_package: Dict[str, int] = defaultdict(int)
+    for m in modules:
+        by_package[m["module"].split(".")[0]] += m["self_us"]
+    return {
+        "cumulative": sorted(modules, key=lambda m: -m["cumulative_us"])[:top],
+        "packages": sorted(({"package": k, "self_us": v} for k, v in by_package.items()),
+                           key=lambda p: -p["self_us"])[:top],
+        "module_count": len(modules),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile app import and startup time.")
+    parser.add_argument("--runs", type=int, default=3, help="Boots to time; the fastest is reported")
+    parser.add_argument("--top", type=int, default=20, help="Modules and packages to list")
+    parser.add_argument("--scale", default="small", help="Dataset to boot against when it exists")
+    parser.add_argument("--budget-ms", type=float, help="Exit 1 when boot (import + startup) exceeds this")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        dataset = os.path.abspath(dataset_path(args.scale))
+        if not os.path.exists(dataset):
+            dataset = os.path.join(workdir, "empty.db")  # startup then runs every schema migration
+            open(dataset, "w").close()
+        best = min((boot_once(dataset, workdir) for _ in range(max(args.runs, 1))), key=lambda r: r["boot_ms"])
+    summary = summarize(best.pop("modules"), args.top)
+
+    print(f"import app.main {best['import_ms']:.0f}ms + startup {best['startup_ms']:.0f}ms "
+          f"= boot {best['boot_ms']:.0f}ms ({summary['module_count']} modules, best of {args.runs})")
+    print(f"\n  {'cumulative ms':>13} {'self ms':>8}  module")
+    for m in summary["cumulative"]:
+        print(f"  {m['cumulative_us'] / 1000:>13.1f} {m['self_us'] / 1000:>8.1f}  {'  ' * m['depth']}{m['module']}")
+    print(f"\n  {'self ms':>8}  package")
+    for p in summary["packages"]:
+        print(f"  {p['self_us'] / 1000:>8.1f}  {p['package']}")
+
+    if args.json:
+        with open(os.path.abspath(args.json), "w") as f:
+            json.dump(dict(best, **summary), f, indent=2)
+    if args.budget_ms is not None and best["boot_ms"] > args.budget_ms:
+        print(f"\nboot took {best['boot_ms']:.0f}ms, over the {args.budget_ms:.0f}ms budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
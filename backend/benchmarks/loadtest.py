@@ -0,0 +1,225 @@
+# benchmarks/loadtest.py
+"""
+Morning-rush load test.
+
+Replays a recorded dashboard session (see app/recording.py; the default is
+benchmarks/sessions/dashboard.jsonl, the home and production-results pages
+plus a trainer drill-down) as N concurrent users against a real uvicorn
+server. Requests the browser fired together -- recorded within `--burst-ms`
+of each other -- are sent together, and the recorded pauses between those
+bursts are kept (scaled by `--think`; 0 replays back to back).
+
+Without `--url` the tool starts `uvicorn app.main:app --workers W` itself on
+a generated dataset (python -m benchmarks.datagen --scale <scale>). It reports
+per route: requests, errors, error rate, throughput and p50/p95/p99/max, plus
+how long each burst (one page load) took end to end.
+
+    python -m benchmarks.loadtest --users 50 --workers 4 --scale medium
+    python -m benchmarks.loadtest --url http://localhost:8000 --users 20 --loops 5
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.datagen import BACKEND_DIR, dataset_path, use_dataset
+from benchmarks.run import percentile
+
+DEFAULT_SESSION = os.path.join(BACKEND_DIR, "benchmarks", "sessions", "dashboard.jsonl")
+SERVER_START_TIMEOUT = 60
+
+Burst = Tuple[float, List[Dict[str, Any]]]  # (seconds to wait before it, requests)
+
+def load_session(path: str, burst_ms: float) -> List[Burst]:
+    """Group the recorded requests into bursts; each burst carries the pause that preceded it."""
+    with open(path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries.sort(key=lambda e: e["t"])
+    bursts: List[Burst] = []
+    burst_start = None
+    for entry in entries:
+        if burst_start is None or (entry["t"] - burst_start) * 1000 > burst_ms:
+            pause = 0.0 if burst_start is None else entry["t"] - burst_start
+            bursts.append((pause, []))
+            burst_start = entry["t"]
+        bursts[-1][1].append(entry)
+    return bursts
+
+class _Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.bursts: List[float] = []
+
+    def observe(self, route: str, seconds: float, status: Optional[int]):
+        self.latencies[route].append(seconds)
+        self.statuses[route][status or 0] += 1
+        if status is None or status >= 500:
+            self.errors[route] += 1
+
+async def _request(client: httpx.AsyncClient, entry: Dict[str, Any], stats: _Stats):
+    url = entry["path"] + (f"?{entry['query']}" if entry.get("query") else "")
+    started = time.perf_counter()
+    try:
+        status = (await client.get(url)).status_code
+    except httpx.HTTPError:
+        status = None
+    stats.observe(entry.get("route") or entry["path"], time.perf_counter() - started, status)
+
+async def _user(client, bursts: List[Burst], loops: int, think: float, delay: float, stats: _Stats):
+    await asyncio.sleep(delay)
+    for _ in range(loops):
+        for pause, requests in bursts:
+            if pause and think:
+                await asyncio.sleep(pause * think)
+            started = time.perf_counter()
+            await asyncio.gather(*(_request(client, entry, stats) for entry in requests))
+            stats.bursts.append(time.perf_counter() - started)
+
+async def replay(url: str, bursts: List[Burst], users: int, loops: int, think: float, ramp_up: float,
+                 timeout: float) -> Tuple[_Stats, float]:
+    stats = _Stats()
+    limits = httpx.Limits(max_connections=users * 8, max_keepalive_connections=users * 8)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            _user(client, bursts, loops, think, ramp_up * i / max(users - 1, 1), stats) for i in range(users)
+        ))
+        elapsed = time.perf_counter() - started
+    return stats, elapsed
+
+def report(stats: _Stats, elapsed: float) -> Dict[str, Any]:
+    def ms(samples, q):
+        return round(percentile(samples, q) * 1000, 1)
+
+    routes = {}
+    for route, samples in sorted(stats.latencies.items(), key=lambda kv: -percentile(kv[1], 95)):
+        routes[route] = {
+            "requests": len(samples),
+            "errors": stats.errors.get(route, 0),
+            "error_rate": round(stats.errors.get(route, 0) / len(samples), 4),
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": ms(samples, 50),
+            "p95_ms": ms(samples, 95),
+            "p99_ms": ms(samples, 99),
+            "max_ms": round(max(samples) * 1000, 1),
+            "statuses": dict(stats.statuses[route]),
+        }
+    every = [s for samples in stats.latencies.values() for s in samples]
+    errors = sum(stats.errors.values())
+    return {
+        "seconds": round(elapsed, 2),
+        "requests": len(every),
+        "errors": errors,
+        "error_rate": round(errors / len(every), 4) if every else 0,
+        "rps": round(len(every) / elapsed, 2),
+        "p50_ms": ms(every, 50) if every else None,
+        "p95_ms": ms(every, 95) if every else None,
+        "p99_ms": ms(every, 99) if every else None,
+        "page_load_p50_ms": ms(stats.bursts, 50) if stats.bursts else None,
+        "page_load_p95_ms": ms(stats.bursts, 95) if stats.bursts else None,
+        "routes": routes,
+    }
+
+def print_report(result: Dict[str, Any]):
+    print(f"\n  {'route':<52} {'reqs':>6} {'err%':>6} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for route, r in result["routes"].items():
+        print(f"  {route:<52} {r['requests']:>6} {r['error_rate'] * 100:>5.1f}% {r['rps']:>7.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+    print(f"\n{result['requests']} requests in {result['seconds']}s: {result['rps']} req/s, "
+          f"{result['errors']} errors ({result['error_rate'] * 100:.2f}%), "
+          f"p50 {result['p50_ms']}ms p95 {result['p95_ms']}ms p99 {result['p99_ms']}ms")
+    print(f"page load (one burst): p50 {result['page_load_p50_ms']}ms p95 {result['page_load_p95_ms']}ms")
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(dataset: str, workers: int, port: int) -> subprocess.Popen:
+    """uvicorn on the dataset, from the data directory so db_backups/ and logs stay out of the tree."""
+    use_dataset(dataset)
+    # Start every run with a cold response cache
+    for stale in glob.glob(os.environ["CACHE_PATH"] + "*"):
+        os.remove(stale)
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"uvicorn exited with status {server.returncode}")
+        try:
+            # Wait for warm-up too, so the background imports stay out of the measurement
+            if httpx.get(f"http://127.0.0.1:{port}/api/health/ready?warm=true", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    server.terminate()
+    sys.exit(f"uvicorn did not answer within {SERVER_START_TIMEOUT}s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded dashboard session at N concurrent users.")
+    parser.add_argument("--session", default=DEFAULT_SESSION, help="JSONL recorded with RECORD_SESSION")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--loops", type=int, default=1, help="Times each user replays the session")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Seconds over which users start")
+    parser.add_argument("--think", type=float, default=1.0, help="Scale for recorded pauses (0 = none)")
+    parser.add_argument("--burst-ms", type=float, default=250.0, help="Requests this close together go out at once")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--url", help="Server to test; omit to start uvicorn on a generated dataset")
+    parser.add_argument("--scale", default="small", help="Dataset for the spawned server")
+    parser.add_argument("--data", help="Database file for the spawned server (default: benchmarks/data/<scale>.db)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the spawned server")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    bursts = load_session(os.path.abspath(args.session), args.burst_ms)
+    requests = sum(len(r) for _, r in bursts)
+    output = os.path.abspath(args.json) if args.json else None
+
+    server = None
+    url = args.url
+    if url is None:
+        dataset = os.path.abspath(args.data or dataset_path(args.scale))
+        if not os.path.exists(dataset):
+            sys.exit(f"{dataset} not found; run `python -m benchmarks.datagen --scale {args.scale}` first")
+        port = _free_port()
+        server = start_server(dataset, args.workers, port)
+        url = f"http://127.0.0.1:{port}"
+
+    print(f"Replaying {requests} requests in {len(bursts)} bursts x {args.loops} loop(s) "
+          f"for {args.users} users against {url}")
+    try:
+        stats, elapsed = asyncio.run(
+            replay(url, bursts, args.users, args.loops, args.think, args.ramp_up, args.timeout)
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    result = report(stats, elapsed)
+    result.update({"url": url, "users": args.users, "loops": args.loops, "workers": args.workers if server else None})
+    print_report(result)
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
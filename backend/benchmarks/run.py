@@ -0,0 +1,294 @@
+# benchmarks/run.py
+"""
+Benchmark runner.
+
+Discovers every GET endpoint from the app's OpenAPI schema, fills in path and
+required query parameters from the generated dataset, and drives them through
+TestClient against benchmarks/data/<scale>.db:
+
+  - sequential pass: `--iterations` timed requests per endpoint (after
+    `--warmup` untimed ones) for p50 / p95 / p99 / mean;
+  - memory pass: one request per endpoint under tracemalloc for its peak
+    Python allocation;
+  - load pass: `--requests` requests spread over every endpoint from
+    `--concurrency` threads, for throughput and latency under contention.
+
+Results go to benchmarks/results/<scale>-<timestamp>.json. `--save-baseline`
+also stores them as benchmarks/baselines/<scale>.json and `--compare` checks
+the run against that baseline, exiting 1 when an endpoint's p95 or peak memory
+grew by more than `--tolerance` (and by more than `--min-delta-ms` for
+latency), or when an endpoint that used to succeed now fails. The committed
+small baseline was recorded on one development machine; timings only compare
+on the same hardware, so save a local baseline before comparing elsewhere.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.datagen import BACKEND_DIR, SALES_STAFF, TRAINERS, dataset_path, use_dataset
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+BASELINES_DIR = os.path.join(BACKEND_DIR, "benchmarks", "baselines")
+
+# Endpoints that call the live ABC API, report on the benchmark itself or stream without end
+EXCLUDED = {"/api/events/abcfinancial", "/api/debug/perf", "/metrics", "/api/health/ready", "/api/live"}
+
+# Extra query-string variants worth timing on their own
+VARIANTS: Dict[str, List[Dict[str, Any]]] = {
+    "/api/members/paginated": [{"page": 50, "page_size": 100}, {"name": "smith"}],
+    "/api/member-tracker/data": [{"page": 20, "page_size": 100}, {"search_term": "garcia"}],
+    "/api/attrition/details": [{"page_size": 100, "page": 3}],
+    "/api/api-events/structured-events/db": [{"page": 1, "page_size": 500}],
+    "/api/coachees-table/sales": [{"type": "total", "period": "mtd"}],
+    "/api/transactions": [{"page": 5, "page_size": 100}],
+    "/api/timeseries/{metric}": [{"interval": "week", "start": "2024-01-01"}],
+}
+
+Case = Tuple[str, str, Dict[str, Any]]  # (label, url, query params)
+
+def _first_last(name: str) -> str:
+    last, _, first = name.partition(", ")
+    return f"{first} {last}"
+
+def _path_values() -> Dict[str, str]:
+    """Concrete values for every path parameter, taken from the dataset."""
+    from app import storage
+    sale = storage.query("sales", "SELECT sale_id FROM sales ORDER BY latest_payment_date DESC LIMIT 1")
+    return {
+        "name": SALES_STAFF[0],
+        "sale_id": sale[0]["sale_id"] if sale else "missing",
+        "membership_id": "1",
+        "metric_name": "deals",
+        "metric": "guests",
+        "employee": _first_last(TRAINERS[0]),
+        "period": "mtd",
+    }
+
+def _required_query(path: str, name: str) -> Any:
+    today = datetime.now()
+    values = {
+        "filename": "employees.csv",
+        "day": "mtd",
+        "source": "Buddy Referral",
+        "query": "smith",
+        "start_date": today.replace(day=1).strftime("%Y-%m-%d"),
+        "end_date": today.strftime("%Y-%m-%d"),
+    }
+    if name not in values:
+        raise KeyError(f"No benchmark value for required parameter {name!r} of {path}")
+    return values[name]
+
+def discover_cases(app, only: Optional[str] = None) -> List[Case]:
+    """One case per GET endpoint (plus VARIANTS), with parameters filled in."""
+    path_values = _path_values()
+    cases: List[Case] = []
+    for path, operations in app.openapi()["paths"].items():
+        operation = operations.get("get")
+        if operation is None or path in EXCLUDED:
+            continue
+        if only and only not in path:
+            continue
+        url = path
+        query: Dict[str, Any] = {}
+        for param in operation.get("parameters", []):
+            name = param["name"]
+            if param["in"] == "path":
+                url = url.replace("{" + name + "}", path_values[name])
+            elif param.get("required"):
+                query[name] = _required_query(path, name)
+        cases.append((path, url, query))
+        for i, extra in enumerate(VARIANTS.get(path, []), 1):
+            cases.append((f"{path} #{i}", url, {**query, **extra}))
+    return cases
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of the samples (q in 0..100)."""
+    ordered = sorted(samples)
+    rank = max(1, min(len(ordered), round(q / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ms = [s * 1000 for s in samples]
+    return {
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "mean_ms": round(sum(ms) / len(ms), 2),
+        "max_ms": round(max(ms), 2),
+    }
+
+def _timed_get(client, url: str, query: Dict[str, Any]) -> Tuple[float, int]:
+    started = time.perf_counter()
+    response = client.get(url, params=query)
+    return time.perf_counter() - started, response.status_code
+
+def run_sequential(client, cases: List[Case], iterations: int, warmup: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for label, url, query in cases:
+        for _ in range(warmup):
+            client.get(url, params=query)
+        samples, statuses = [], set()
+        for _ in range(iterations):
+            seconds, status = _timed_get(client, url, query)
+            samples.append(seconds)
+            statuses.add(status)
+        results[label] = {"status": max(statuses), **_summary(samples)}
+        print(f"  {label:<58} {results[label]['p50_ms']:>9.1f} {results[label]['p95_ms']:>9.1f}"
+              f" {results[label]['p99_ms']:>9.1f}  {results[label]['status']}", flush=True)
+    return results
+
+def run_memory(client, cases: List[Case], results: Dict[str, Dict[str, Any]]):
+    """Peak traced Python allocation (KiB) of one request per case."""
+    tracemalloc.start()
+    try:
+        for label, url, query in cases:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            client.get(url, params=query)
+            _, peak = tracemalloc.get_traced_memory()
+            results[label]["peak_kib"] = round((peak - baseline) / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+def run_load(client, cases: List[Case], requests: int, concurrency: int, seed: int = 42) -> Dict[str, Any]:
+    """Random mix of every case from `concurrency` threads; latency and throughput overall."""
+    rng = random.Random(seed)
+    schedule = [rng.choice(cases) for _ in range(requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda case: _timed_get(client, case[1], case[2]), schedule))
+    elapsed = time.perf_counter() - started
+    samples = [seconds for seconds, _ in outcomes]
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "seconds": round(elapsed, 2),
+        "rps": round(requests / elapsed, 1),
+        "errors": sum(1 for _, status in outcomes if status >= 500),
+        **_summary(samples),
+    }
+
+def _max_rss_mib() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_delta_ms: float) -> List[str]:
+    """Regressions of current against baseline, one line each (empty when the run passes)."""
+    regressions = []
+    for label, base in baseline["endpoints"].items():
+        now = current["endpoints"].get(label)
+        if now is None:
+            continue
+        if base["status"] < 400 <= now["status"]:
+            regressions.append(f"{label}: status {base['status']} -> {now['status']}")
+            continue
+        delta = now["p95_ms"] - base["p95_ms"]
+        if delta > min_delta_ms and now["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {base['p95_ms']}ms -> {now['p95_ms']}ms")
+        base_peak, now_peak = base.get("peak_kib"), now.get("peak_kib")
+        if base_peak and now_peak and now_peak > base_peak * (1 + tolerance) and now_peak - base_peak > 1024:
+            regressions.append(f"{label}: peak memory {base_peak}KiB -> {now_peak}KiB")
+    base_load, now_load = baseline.get("load"), current.get("load")
+    if base_load and now_load and now_load["p95_ms"] - base_load["p95_ms"] > min_delta_ms \
+            and now_load["p95_ms"] > base_load["p95_ms"] * (1 + tolerance):
+        regressions.append(f"load: p95 {base_load['p95_ms']}ms -> {now_load['p95_ms']}ms")
+    return regressions
+
+def _write_json(path: str, data: Dict[str, Any]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every GET endpoint against a generated dataset.")
+    parser.add_argument("--scale", default="small", help="Dataset scale (see benchmarks.datagen.SCALES)")
+    parser.add_argument("--data", help="Database file to use (default: benchmarks/data/<scale>.db)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400, help="Requests in the load pass (0 skips it)")
+    parser.add_argument("--only", help="Only endpoints whose path contains this text")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="Fail on regressions against the stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative growth (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Ignore p95 growth smaller than this")
+    args = parser.parse_args(argv)
+
+    path = os.path.abspath(args.data or dataset_path(args.scale))
+    if not os.path.exists(path):
+        sys.exit(f"{path} not found; run `python -m benchmarks.datagen --scale {args.scale}` first")
+    use_dataset(path)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("PERF_SLOW_QUERY_LOG", "")
+    # Time the endpoints themselves, not cache hits (benchmarks.loadtest keeps the cache on)
+    os.environ.setdefault("CACHE_ENABLED", "false")
+
+    from fastapi.testclient import TestClient
+    from app import warmup
+    from app.main import app
+
+    # Failing endpoints are recorded with their status rather than aborting the run
+    with TestClient(app, raise_server_exceptions=False) as client:
+        warmup.wait()  # warm-up requests and imports would otherwise land in the first cases' timings
+        cases = discover_cases(app, args.only)
+        print(f"{len(cases)} cases against {path}")
+        print(f"  {'endpoint':<58} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  status")
+        endpoints = run_sequential(client, cases, args.iterations, args.warmup)
+        run_memory(client, cases, endpoints)
+        load = run_load(client, cases, args.requests, args.concurrency) if args.requests else None
+
+    result = {
+        "scale": args.scale,
+        "dataset": path,
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "iterations": args.iterations,
+        "endpoints": endpoints,
+        "load": load,
+        "max_rss_mib": _max_rss_mib(),
+    }
+    if load:
+        print(f"load: {load['requests']} requests x{load['concurrency']} in {load['seconds']}s "
+              f"({load['rps']} req/s), p50 {load['p50_ms']}ms p95 {load['p95_ms']}ms p99 {load['p99_ms']}ms, "
+              f"{load['errors']} errors")
+    print(f"max RSS: {result['max_rss_mib']} MiB")
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    _write_json(os.path.join(RESULTS_DIR, f"{args.scale}-{stamp}.json"), result)
+    baseline_path = os.path.join(BASELINES_DIR, f"{args.scale}.json")
+    if args.save_baseline:
+        _write_json(baseline_path, result)
+        print(f"baseline saved to {baseline_path}")
+    if args.compare:
+        if not os.path.exists(baseline_path):
+            sys.exit(f"No baseline at {baseline_path}; run with --save-baseline first")
+        with open(baseline_path) as f:
+            regressions = compare(result, json.load(f), args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions against baseline")
+
+if __name__ == "__main__":
+    main()
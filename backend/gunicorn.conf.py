@@ -0,0 +1,31 @@
+# gunicorn.conf.py
+"""
+Multi-process deployment:
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+Each worker is a uvicorn event loop with its own SQLite connections (WAL, so
+readers in every worker run alongside a writer) or its own PostgreSQL pool.
+Workers share the response cache and job leases through CACHE_PATH, so a
+dashboard burst is computed once and only one worker runs an ABC sync.
+`uvicorn app.main:app --workers N` works the same way without gunicorn's
+worker recycling.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+# Reads are CPU-bound (JSON rendering, pandas) and SQLite lets them run in parallel under WAL
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# The ABC syncs and imports can run for minutes
+timeout = int(os.environ.get("WORKER_TIMEOUT", 300))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then so pandas' heap growth doesn't accumulate
+max_requests = 2000
+max_requests_jitter = 200
+# Workers import the app themselves: connections and pools must not cross a fork
+preload_app = False
+accesslog = "-"
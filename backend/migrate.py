@@ -1,74 +1,419 @@
+"""
+SQLite -> PostgreSQL migration.
+
+Copies every table of the per-domain SQLite files (or of a unified file built
+by app/scripts/consolidate_dbs.py) into the PostgreSQL database at
+DATABASE_URL, or at --url:
+
+- rows are streamed from SQLite in chunks and loaded with COPY FROM STDIN, so
+  no table is ever held in memory;
+- independent tables load in parallel, each on its own connection;
+- primary keys, indexes and the event JSON generated columns are created after
+  the data is in;
+- every table is verified (row count, plus an MD5 over its rows as sent and as
+  read back with COPY TO STDOUT) and loaded in its own transaction. Finished
+  tables are recorded in migration_state, so rerunning after a failure only
+  loads the tables that did not finish.
+
+The schema follows what app.storage expects: simple column names are left
+unquoted (PostgreSQL stores them lower-cased; the original spelling goes to the
+column_case table), names with spaces or punctuation are quoted verbatim, and
+the SQLite rowid is kept as an identity column named rowid.
+
+This script MUST be run from the `backend` directory:
+    python migrate.py                                    # DATABASE_URL from .env
+    python migrate.py --url postgresql://postgres@localhost:5432/ecab_test
+    python migrate.py --source ecab.db --jobs 8 --tables sales members
+    python migrate.py --fresh                            # reload every table
+"""
+
+import argparse
+import hashlib
+import io
 import os
 import sqlite3
-import pandas as pd
-from sqlalchemy import create_engine, inspect, text, Table, Column, Integer, String, MetaData
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import create_engine
+
+from app import schema, storage
 from app.config import settings
+from app.db import PG_EVENT_JSON_COLUMNS
 
-# --- Configuration ---
-# This script MUST be run from the `backend` directory.
-# It uses the DATABASE_URL from your .env file to connect to the production PostgreSQL DB.
-
-# A mapping from your local SQLite DB files to the table names they contain.
-# Add any other dbs/tables you need to migrate here.
-SQLITE_DATABASES = {
-    'members.db': ['members'],
-    'structured_events.db': ['events', 'event_members'],
-    'guests.db': ['guests'],
-    'employees.db': ['employees'],
-    # Add other DBs and their tables here if needed
-}
-
-def get_table_schema(inspector, table_name):
-    """Helper to get column definitions from a live DB connection."""
-    columns = []
-    for col in inspector.get_columns(table_name):
-        columns.append(f"{col['name']} {col['type']}")
-    return columns
+STATE_TABLE = "migration_state"
+DEFAULT_JOBS = 4
+DEFAULT_CHUNK_SIZE = 5000
+
+# Generated columns are recomputed by PostgreSQL, never copied
+GENERATED_COLUMNS = PG_EVENT_JSON_COLUMNS
+
+ident = storage.ident
 
-def migrate():
+@dataclass
+class TablePlan:
+    source_path: str
+    source_name: str
+    target: str
+    row_estimate: int
+    # (name, PostgreSQL type) of every copied column, in SQLite order
+    columns: List[Tuple[str, str]]
+    # SQLite rowid alias (INTEGER PRIMARY KEY), or None when a rowid column is added
+    rowid_alias: Optional[str]
+    primary_key: List[str]
+    generated: List[Tuple[str, str]] = field(default_factory=list)
+    # (name, unique, ["col", "col DESC", ...])
+    indexes: List[Tuple[str, bool, List[str]]] = field(default_factory=list)
+
+    @property
+    def order_column(self) -> str:
+        return self.rowid_alias or "rowid"
+
+    @property
+    def copy_columns(self) -> List[Tuple[str, str]]:
+        return self.columns if self.rowid_alias else [("rowid", "bigint")] + self.columns
+
+def _quote_sqlite(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _pg_name(name: str) -> str:
+    """Name as PostgreSQL stores it (unquoted identifiers fold to lower case)."""
+    return name if ident(name) != name else name.lower()
+
+def _affinity(declared: str) -> str:
+    """SQLite type affinity of a declared column type."""
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return "integer"
+    if any(t in declared for t in ("CHAR", "CLOB", "TEXT")):
+        return "text"
+    if not declared or "BLOB" in declared:
+        return "blob"
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB")):
+        return "real"
+    return "numeric"
+
+def _pg_type(declared: str, observed: Set[str]) -> str:
     """
-    Connects to the production PostgreSQL database and local SQLite files,
-    creates tables, and copies data.
+    PostgreSQL type for a SQLite column, chosen from the storage classes its
+    values actually use so every value round-trips; empty columns fall back to
+    the declared affinity.
     """
-    if not settings.DATABASE_URL:
-        print("ERROR: DATABASE_URL is not set in your .env file.")
-        print("Please set it to your Render PostgreSQL Internal Connection String.")
-        return
-
-    print(f"Connecting to production database...")
-    prod_engine = create_engine(settings.DATABASE_URL)
-    
-    with prod_engine.connect() as prod_conn:
-        print("Connection successful.")
-        
-        for db_file, tables in SQLITE_DATABASES.items():
-            db_path = os.path.join(os.path.dirname(__file__), db_file)
-            if not os.path.exists(db_path):
-                print(f"WARNING: SQLite file not found, skipping: {db_file}")
+    observed = observed - {"null"}
+    if not observed:
+        return {"integer": "bigint", "real": "double precision", "blob": "bytea"}.get(_affinity(declared), "text")
+    if observed == {"integer"}:
+        return "bigint"
+    if observed <= {"integer", "real"}:
+        return "double precision"
+    if observed == {"blob"}:
+        return "bytea"
+    return "text"
+
+def _plan_table(conn: sqlite3.Connection, path: str, name: str, target: str, index_names: Set[str]) -> TablePlan:
+    quoted = _quote_sqlite(name)
+    try:
+        conn.execute(f"SELECT rowid FROM {quoted} LIMIT 0")
+    except sqlite3.OperationalError:
+        raise RuntimeError(f"{name}: WITHOUT ROWID tables are not supported")
+
+    # cid, name, type, notnull, default, pk, hidden (2/3 = generated)
+    xinfo = conn.execute(f"PRAGMA table_xinfo({quoted})").fetchall()
+    stored = [row for row in xinfo if row[6] in (0, 1)]
+    observed = conn.execute(
+        "SELECT COUNT(*), " + ", ".join(f"group_concat(DISTINCT typeof({_quote_sqlite(row[1])}))" for row in stored)
+        + f" FROM {quoted}"
+    ).fetchone()
+    columns = [
+        (row[1], _pg_type(row[2], set(types.split(",")) if types else set()))
+        for row, types in zip(stored, observed[1:])
+    ]
+    primary_key = [row[1] for row in sorted((r for r in stored if r[5]), key=lambda r: r[5])]
+    pk_rows = [row for row in stored if row[5]]
+    rowid_alias = pk_rows[0][1] if len(pk_rows) == 1 and (pk_rows[0][2] or "").upper() == "INTEGER" else None
+
+    generated = []
+    for row in xinfo:
+        if row[6] in (2, 3):
+            if row[1] not in GENERATED_COLUMNS:
+                raise RuntimeError(f"{name}.{row[1]}: no PostgreSQL expression for this generated column")
+            generated.append((row[1], GENERATED_COLUMNS[row[1]]))
+
+    indexes = []
+    for _, index_name, unique, origin, partial in conn.execute(f"PRAGMA index_list({quoted})").fetchall():
+        if origin == "pk":
+            continue
+        if partial:
+            print(f"  skip index {index_name}: partial indexes are not translated")
+            continue
+        keys = []
+        # seqno, cid, name, desc, collation, key
+        for _, cid, column, desc, _, key in conn.execute(f"PRAGMA index_xinfo({_quote_sqlite(index_name)})").fetchall():
+            if not key:
                 continue
+            if cid == -2:
+                keys = None
+                break
+            keys.append(ident(column if cid >= 0 else rowid_alias or "rowid") + (" DESC" if desc else ""))
+        if not keys:
+            print(f"  skip index {index_name}: expression indexes are not translated")
+            continue
+        pg_index = index_name
+        if index_name.startswith("sqlite_autoindex_"):
+            pg_index = f"ux_{target}_{len(indexes) + 1}"
+        elif target != name:
+            pg_index = index_name.replace(name, target, 1)
+        if _pg_name(pg_index) in index_names:
+            pg_index = f"{target}_{pg_index}"
+        index_names.add(_pg_name(pg_index))
+        indexes.append((pg_index, bool(unique), keys))
 
-            print(f"--- Processing {db_file} ---")
-            local_conn = sqlite3.connect(db_path)
-            
-            for table_name in tables:
-                print(f"  Migrating table: {table_name}")
+    return TablePlan(path, name, target, observed[0], columns, rowid_alias, primary_key, generated, indexes)
+
+def _sources(source: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+    """(SQLite file, storage domain) pairs to read; a unified file has no single domain."""
+    if source:
+        return [(os.path.abspath(source), None)]
+    return [(storage.legacy_path(d), d) for d in storage.DOMAIN_FILES if os.path.exists(storage.legacy_path(d))]
+
+def plan_migration(source: Optional[str] = None, tables: Optional[List[str]] = None) -> List[TablePlan]:
+    plans: Dict[str, TablePlan] = {}
+    index_names: Set[str] = set()
+    for path, domain in _sources(source):
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            names = [r[0] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND name != ? ORDER BY name",
+                (schema.VERSIONS_TABLE,)  # per-file bookkeeping; the API migrates PostgreSQL on startup
+            ).fetchall()]
+            for name in names:
+                target = storage.TABLE_RENAMES.get((domain, name), name) if domain else name
+                if tables and target not in tables:
+                    continue
+                if target.lower() in plans:
+                    raise RuntimeError(f"{os.path.basename(path)}.{name}: table {target} already comes from another file")
+                plans[target.lower()] = _plan_table(conn, path, name, target, index_names)
+        finally:
+            conn.close()
+    # Largest tables first so the parallel load finishes as evenly as possible
+    return sorted(plans.values(), key=lambda p: p.row_estimate, reverse=True)
+
+# --- COPY text format ---
+_COPY_ESCAPES = str.maketrans({
+    "\\": "\\\\", "\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f", "\v": "\\v",
+    "\x00": "",  # PostgreSQL text cannot hold NUL
+})
+
+def _copy_value(value, pg_type: str) -> str:
+    if value is None:
+        return "\\N"
+    if pg_type == "bigint":
+        return str(int(value))
+    if pg_type == "double precision":
+        return repr(float(value))
+    if pg_type == "bytea":
+        return "\\\\x" + bytes(value).hex()
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", "replace")
+    return str(value).translate(_COPY_ESCAPES)
+
+class _ChecksumSink(io.TextIOBase):
+    """
+    COPY TO STDOUT target that hashes the rows PostgreSQL sends back. Floats are
+    re-rendered the way _copy_value wrote them so both digests are comparable.
+    """
+    def __init__(self, types: List[str]):
+        self.digest = hashlib.md5()
+        self.rows = 0
+        self._floats = [i for i, t in enumerate(types) if t == "double precision"]
+        self._pending = ""
+
+    def write(self, data):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        lines = (self._pending + data).split("\n")
+        self._pending = lines.pop()
+        for line in lines:
+            if self._floats:
+                fields = line.split("\t")
+                for i in self._floats:
+                    if fields[i] != "\\N":
+                        fields[i] = repr(float(fields[i]))
+                line = "\t".join(fields)
+            self.digest.update((line + "\n").encode("utf-8"))
+            self.rows += 1
+        return len(data)
+
+def _create_table_sql(plan: TablePlan) -> str:
+    columns = []
+    if not plan.rowid_alias:
+        columns.append("rowid bigint GENERATED BY DEFAULT AS IDENTITY")
+    for name, pg_type in plan.columns:
+        identity = " GENERATED BY DEFAULT AS IDENTITY" if name == plan.rowid_alias else ""
+        columns.append(f"{ident(name)} {pg_type}{identity}")
+    for name, expr in plan.generated:
+        columns.append(f"{ident(name)} text GENERATED ALWAYS AS ({expr}) STORED")
+    return f"CREATE TABLE {ident(plan.target)} ({', '.join(columns)})"
+
+def _copy_rows(src: sqlite3.Connection, cur, plan: TablePlan, chunk_size: int) -> Tuple[int, str]:
+    """Stream the SQLite rows into the new table chunk by chunk; returns (rows, md5 of the data sent)."""
+    types = [t for _, t in plan.copy_columns]
+    select_list = ", ".join(("rowid" if name == "rowid" and not plan.rowid_alias else _quote_sqlite(name))
+                            for name, _ in plan.copy_columns)
+    copy_sql = f"COPY {ident(plan.target)} ({', '.join(ident(n) for n, _ in plan.copy_columns)}) FROM STDIN"
+    digest = hashlib.md5()
+    rows = 0
+    source = src.execute(f"SELECT {select_list} FROM {_quote_sqlite(plan.source_name)} ORDER BY rowid")
+    while True:
+        batch = source.fetchmany(chunk_size)
+        if not batch:
+            break
+        data = "".join("\t".join(_copy_value(v, t) for v, t in zip(row, types)) + "\n" for row in batch)
+        digest.update(data.encode("utf-8"))
+        cur.copy_expert(copy_sql, io.StringIO(data))
+        rows += len(batch)
+    return rows, digest.hexdigest()
+
+def _read_back(cur, plan: TablePlan) -> Tuple[int, str]:
+    sink = _ChecksumSink([t for _, t in plan.copy_columns])
+    column_list = ", ".join(ident(n) for n, _ in plan.copy_columns)
+    cur.copy_expert(
+        f"COPY (SELECT {column_list} FROM {ident(plan.target)} ORDER BY {ident(plan.order_column)}) TO STDOUT", sink
+    )
+    return sink.rows, sink.digest.hexdigest()
+
+def _finish_table(cur, plan: TablePlan):
+    table = ident(plan.target)
+    if plan.primary_key:
+        cur.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({', '.join(ident(c) for c in plan.primary_key)})")
+    for name, unique, keys in plan.indexes:
+        cur.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX {ident(name)} ON {table} ({', '.join(keys)})")
+    # New rows keep getting ids above the migrated ones
+    order = ident(plan.order_column)
+    cur.execute(f"SELECT COALESCE(MAX({order}), 0) + 1 FROM {table}")
+    cur.execute(f"ALTER TABLE {table} ALTER COLUMN {order} RESTART WITH {cur.fetchone()[0]}")
+    spellings = sorted({(name.lower(), name) for name, _ in plan.columns + plan.generated
+                        if ident(name) == name and name != name.lower()})
+    for lower_name, original in spellings:
+        cur.execute(
+            f"INSERT INTO {storage.COLUMN_CASE_TABLE} (lower_name, original) VALUES (%s, %s) ON CONFLICT (lower_name) DO NOTHING",
+            (lower_name, original)
+        )
+    cur.execute(f"ANALYZE {table}")
+
+def migrate_table(engine, plan: TablePlan, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, object]:
+    """Load one table in a single PostgreSQL transaction; nothing is kept unless it verifies."""
+    started = time.monotonic()
+    src = sqlite3.connect(f"file:{plan.source_path}?mode=ro", uri=True)
+    raw = engine.raw_connection()
+    try:
+        src.execute("BEGIN")  # one read snapshot for the copy and the count
+        cur = raw.cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {ident(plan.target)} CASCADE")
+        cur.execute(_create_table_sql(plan))
+        rows, checksum = _copy_rows(src, cur, plan, chunk_size)
+        expected = src.execute(f"SELECT COUNT(*) FROM {_quote_sqlite(plan.source_name)}").fetchone()[0]
+        if rows != expected:
+            raise RuntimeError(f"{plan.target}: read {rows} of {expected} rows from SQLite")
+        loaded_rows, loaded_checksum = _read_back(cur, plan)
+        if loaded_rows != rows or loaded_checksum != checksum:
+            raise RuntimeError(
+                f"{plan.target}: verification failed ({loaded_rows}/{rows} rows, checksum {loaded_checksum} != {checksum})"
+            )
+        _finish_table(cur, plan)
+        seconds = round(time.monotonic() - started, 3)
+        cur.execute(
+            f"""INSERT INTO {STATE_TABLE} (table_name, source, row_count, checksum, seconds, finished_at)
+                VALUES (%s, %s, %s, %s, %s, now())
+                ON CONFLICT (table_name) DO UPDATE SET source = EXCLUDED.source, row_count = EXCLUDED.row_count,
+                    checksum = EXCLUDED.checksum, seconds = EXCLUDED.seconds, finished_at = EXCLUDED.finished_at""",
+            (plan.target, f"{os.path.basename(plan.source_path)}:{plan.source_name}", rows, checksum, seconds)
+        )
+        raw.commit()
+        return {"rows": rows, "checksum": checksum, "seconds": seconds}
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+        src.close()
+
+def _prepare_target(engine, fresh: bool) -> Set[str]:
+    """Create the bookkeeping tables; returns the tables an earlier run already finished."""
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+                table_name TEXT PRIMARY KEY,
+                source TEXT,
+                row_count BIGINT,
+                checksum TEXT,
+                seconds DOUBLE PRECISION,
+                finished_at TIMESTAMPTZ
+            )
+        """)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {storage.COLUMN_CASE_TABLE} (
+                lower_name TEXT PRIMARY KEY,
+                original TEXT NOT NULL
+            )
+        """)
+        if fresh:
+            cur.execute(f"DELETE FROM {STATE_TABLE}")
+        cur.execute(f"SELECT table_name FROM {STATE_TABLE}")
+        done = {r[0] for r in cur.fetchall()}
+        raw.commit()
+        return done
+    finally:
+        raw.close()
+
+def migrate(url: Optional[str] = None, source: Optional[str] = None, tables: Optional[List[str]] = None,
+            jobs: int = DEFAULT_JOBS, chunk_size: int = DEFAULT_CHUNK_SIZE, fresh: bool = False) -> Dict[str, Dict]:
+    url = url or settings.DATABASE_URL
+    if not url:
+        raise RuntimeError("DATABASE_URL is not set; pass --url or set it in your .env file.")
+    plans = plan_migration(source, tables)
+    engine = create_engine(storage.database_url(url), pool_size=max(jobs, 1), max_overflow=0)
+    try:
+        done = _prepare_target(engine, fresh)
+        pending = [p for p in plans if p.target not in done]
+        for plan in plans:
+            if plan.target in done:
+                print(f"{plan.target:32} already migrated, skipping")
+
+        results, failures = {}, {}
+        with ThreadPoolExecutor(max_workers=max(min(jobs, len(pending)), 1), thread_name_prefix="migrate") as pool:
+            futures = {pool.submit(migrate_table, engine, plan, chunk_size): plan for plan in pending}
+            for future in as_completed(futures):
+                plan = futures[future]
                 try:
-                    # Read data from SQLite into a pandas DataFrame
-                    df = pd.read_sql_query(f"SELECT * FROM {table_name}", local_conn)
-                    print(f"    Found {len(df)} rows in local table.")
-
-                    # Use DataFrame's to_sql to create table and insert data
-                    # 'if_exists="replace"' will DROP the table and recreate it.
-                    # Use 'append' if you want to add to existing data.
-                    df.to_sql(table_name, prod_conn, if_exists='replace', index=False)
-                    print(f"    Successfully migrated {table_name} to production.")
-                    
+                    results[plan.target] = result = future.result()
+                    print(f"{plan.target:32} {result['rows']:>9} rows {result['seconds']:>8.2f}s  md5 {result['checksum']}")
                 except Exception as e:
-                    print(f"    ERROR migrating {table_name}: {e}")
-            
-            local_conn.close()
-
-    print("\n--- Migration Complete ---")
+                    failures[plan.target] = str(e)
+                    print(f"{plan.target:32} FAILED: {e}")
+    finally:
+        engine.dispose()
+    if failures:
+        raise RuntimeError(f"{len(failures)} table(s) failed; rerun to retry them: {', '.join(sorted(failures))}")
+    return results
 
 if __name__ == "__main__":
-    migrate() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Copy the SQLite databases into PostgreSQL.")
+    parser.add_argument("--url", help="target database URL (defaults to DATABASE_URL)")
+    parser.add_argument("--source", help="read one unified SQLite file instead of the per-domain files")
+    parser.add_argument("--tables", nargs="+", help="only migrate these tables")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="tables loaded in parallel")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per COPY chunk")
+    parser.add_argument("--fresh", action="store_true", help="forget earlier progress and reload every table")
+    args = parser.parse_args()
+    try:
+        migrate(args.url, args.source, args.tables, args.jobs, args.chunk_size, args.fresh)
+    except RuntimeError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    print("\n--- Migration Complete ---")
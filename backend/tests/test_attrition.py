@@ -0,0 +1,48 @@
+from collections import Counter
+
+# Independent of the router's SQL: which buckets a seeded row belongs to
+BUCKETS = {
+    "champions_club_cancelled": lambda club, status, reason: club and status == "Cancelled",
+    "champions_club_expired": lambda club, status, reason: club and status == "Expired",
+    "champions_club_rfc": lambda club, status, reason: club and reason == "Returned for collection",
+    "all_other_canceled": lambda club, status, reason: not club and status == "Cancelled",
+    "all_other_expired": lambda club, status, reason: not club and status == "Expired",
+    "all_other_rfc": lambda club, status, reason: not club and reason == "Returned for collection",
+}
+
+def _truth(db):
+    counts, drafts = Counter(), Counter()
+    for membership_type, status, reason, draft in db.execute(
+        "SELECT membership_type, status, status_reason, draft FROM attrition"
+    ):
+        for name, matches in BUCKETS.items():
+            if matches(membership_type == "CHAMPIONS CLUB", status, reason):
+                counts[name] += 1
+                drafts[name] += draft or 0
+    return counts, drafts
+
+def test_summary_and_details_match_the_dataset(client, db):
+    counts, drafts = _truth(db)
+    # The seeded statuses include rows in two buckets at once (cancelled and returned for collection)
+    assert sum(counts.values()) > db.execute("SELECT COUNT(*) FROM attrition").fetchone()[0] > 0
+
+    summary = client.get("/api/attrition/summary").json()
+    assert {name: bucket["count"] for name, bucket in summary.items()} == {name: counts[name] for name in BUCKETS}
+    for name, bucket in summary.items():
+        assert round(bucket["draft_sum"] or 0, 2) == round(drafts[name], 2)
+
+    details = client.get("/api/attrition/details").json()
+    assert details["total"] == len(details["details"]) == sum(counts.values())
+    assert Counter(row["bucket"] for row in details["details"]) == +counts
+
+    page = client.get("/api/attrition/details", params={"bucket": ["all_other_canceled", "all_other_rfc"],
+                                                        "page_size": 5, "page": 2}).json()
+    assert page["total"] == counts["all_other_canceled"] + counts["all_other_rfc"]
+    assert len(page["details"]) == min(5, max(page["total"] - 5, 0))
+
+def test_both_clubs_use_the_same_status_predicates():
+    from app.routers.attrition import ALL_OTHER, ATTRITION_BUCKETS, CHAMPIONS_CLUB
+    for champions, other in (("champions_club_cancelled", "all_other_canceled"),
+                             ("champions_club_expired", "all_other_expired"),
+                             ("champions_club_rfc", "all_other_rfc")):
+        assert ATTRITION_BUCKETS[champions].replace(CHAMPIONS_CLUB, ALL_OTHER) == ATTRITION_BUCKETS[other]
@@ -0,0 +1,31 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from app import cache
+
+def test_async_endpoints_use_the_cache_off_the_event_loop(client):
+    calls = []
+
+    def record(fn):
+        def called(*args, **kwargs):
+            calls.append((fn.__name__, threading.get_ident()))
+            return fn(*args, **kwargs)
+        return called
+
+    @cache.cached()
+    async def endpoint(n: int):
+        return {"n": n, "loop": threading.get_ident()}
+
+    async def twice():
+        return await endpoint(n=1), await endpoint(n=1)
+
+    with mock.patch.object(cache, "get", record(cache.get)), \
+         mock.patch.object(cache, "put", record(cache.put)), \
+         mock.patch.object(cache, "generation", record(cache.generation)):
+        first, second = asyncio.run(twice())
+    assert first.body == second.body
+    assert {name for name, _ in calls} == {"get", "put", "generation"}
+    loop = json.loads(first.body)["loop"]
+    assert all(thread != loop for _, thread in calls)
@@ -0,0 +1,37 @@
+import csv
+import io
+import re
+
+def _sales(db):
+    cur = db.execute("SELECT * FROM sales ORDER BY sale_id")
+    return [d[0] for d in cur.description], cur.fetchall()
+
+def _indexes(db):
+    """Index names on the live sales table, without the generation suffix copies get."""
+    return {re.sub(r"_g\d+$", "", row[0]) for row in db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'sales' AND sql IS NOT NULL"
+    )}
+
+def test_import_then_undo_restores_the_previous_table(client, db):
+    columns, original = _sales(db)
+    indexes = _indexes(db)
+    steps = client.get("/api/sales/undo-available").json()["steps"]
+    since = client.get("/api/changes", params={"since": 0, "limit": 1}).json()["latest"]
+
+    kept = original[: len(original) // 2]
+    body = io.StringIO()
+    writer = csv.writer(body)
+    writer.writerow(columns)
+    writer.writerows(kept)
+    imported = client.post("/api/sales/import-csv", files={"file": ("sales.csv", body.getvalue(), "text/csv")}).json()
+    assert imported["success"] and imported["rows"] == len(kept)
+    sale_id = columns.index("sale_id")
+    assert [row[sale_id] for row in _sales(db)[1]] == [row[sale_id] for row in kept]
+    assert _indexes(db) == indexes
+    assert client.get("/api/sales/undo-available").json() == {"available": True, "steps": steps + 1}
+
+    assert client.post("/api/sales/undo-import").json()["success"]
+    assert _sales(db) == (columns, original)
+    assert client.get("/api/sales/undo-available").json()["steps"] == steps
+    logged = client.get("/api/changes", params={"since": since}).json()["changes"]
+    assert [c["action"] for c in logged] == ["reload", "reload"]
@@ -0,0 +1,19 @@
+import datetime
+
+from app import kpi, lookups
+
+def test_plan_only_edit_revalues_new_eft(client, db):
+    before = kpi.evaluate({})["totals"]["new_eft"]
+    prices = lookups.plan_prices()
+    today = datetime.date.today()
+    sale_id, plan = db.execute("""
+        SELECT sale_id, TRIM(COALESCE(agreement_payment_plan, '')) FROM sales
+        WHERE profit_center = 'New Business' AND latest_payment_date >= ? AND latest_payment_date < ? LIMIT 1
+    """, (today.replace(day=1).isoformat(), (today + datetime.timedelta(days=1)).isoformat())).fetchone()
+    other = next(p for p, price in sorted(prices.list_prices.items()) if price != prices.list_price(plan))
+    # Count and total of the day stay the same; only the plan (and so its list price) changes
+    assert client.put(f"/api/sales/{sale_id}", json={"agreement_payment_plan": other}).json() == {"success": True}
+
+    after = kpi.evaluate({})["totals"]["new_eft"]
+    kpi._days.clear()
+    assert after == kpi.evaluate({})["totals"]["new_eft"] != before
@@ -0,0 +1,102 @@
+"""
+Pooled PostgreSQL mode. storage picks its backend when it is imported, so the
+checks against a real server run in a child process with DATABASE_URL set,
+after migrate.py has loaded the test dataset into it. They are skipped unless
+TEST_DATABASE_URL names a scratch database, which they overwrite.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import storage
+from conftest import BACKEND_DIR, DATASET
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+def test_database_url_pins_psycopg2():
+    assert storage.database_url("postgres://u@db:5432/ecab") == "postgresql+psycopg2://u@db:5432/ecab"
+    assert storage.database_url("postgresql://u@db/ecab") == "postgresql+psycopg2://u@db/ecab"
+    assert storage.database_url("postgresql+psycopg2://u@db/ecab") == "postgresql+psycopg2://u@db/ecab"
+
+_CHECKS = r"""
+import json
+import os
+from fastapi.testclient import TestClient
+from app import schema, storage
+from app.main import app
+from app.scripts import process_sales
+
+def count(domain, sql):
+    return storage.query(domain, sql)[0]["n"]
+
+out = {}
+with TestClient(app) as client:
+    name = storage.query("members", "SELECT lastName FROM members WHERE lastName <> '' LIMIT 1")[0]["lastName"]
+    out["search"] = [client.get("/api/members/search", params={"query": q}).json()["total"]
+                     for q in (name, name.title(), name.lower())]
+    out["tracker"] = [client.get("/api/member-tracker/data", params={"search_term": q}).json()["total"]
+                      for q in (name, name.title(), name.lower())]
+    out["keys"] = sorted(storage.query("sales", "SELECT COUNT(*) AS saleCount, MAX(total_amount) AS topAmount FROM sales")[0])
+
+    with storage.connection("attrition") as conn:
+        conn.execute("DROP TABLE IF EXISTS attrition")
+        conn.execute("CREATE TABLE attrition (member_id TEXT, draft TEXT)")
+        conn.execute("INSERT INTO attrition VALUES ('1', '12.50'), ('2', ' ')")
+        conn.execute("DELETE FROM schema_versions WHERE domain = 'attrition'")
+        conn.commit()
+    schema._ready.discard("attrition")
+    schema.ensure("attrition")
+    out["draft"] = {c["name"]: c["type"] for c in storage.table_info("attrition", "attrition")}["draft"]
+    out["drafts"] = [r["draft"] for r in storage.query("attrition", "SELECT draft FROM attrition ORDER BY member_id")]
+
+    # The importers behind /api/tools write to PostgreSQL, not to a local SQLite file
+    sales, audit = count("sales", "SELECT COUNT(*) AS n FROM sales"), count("sales", "SELECT MAX(id) AS n FROM sales_audit")
+    added = process_sales.process_sales_data("all_sales_report.csv", summary_path=os.devnull)["statistics"]["new_sales_added"]
+    out["sales_import"] = [added, count("sales", "SELECT COUNT(*) AS n FROM sales") - sales,
+                           count("sales", f"SELECT COUNT(*) AS n FROM sales_audit WHERE id > {audit} AND action = 'insert'")]
+    ingested = client.post("/api/tools/process-attrition").json()
+    out["attrition_import"] = [ingested["rows_inserted"], count("attrition", "SELECT COUNT(*) AS n FROM attrition")]
+print("RESULT " + json.dumps(out))
+"""
+
+@pytest.fixture(scope="module")
+def postgres():
+    if not TEST_DATABASE_URL:
+        pytest.skip("set TEST_DATABASE_URL to a scratch PostgreSQL database to run these")
+    env = {**os.environ, "DATABASE_URL": TEST_DATABASE_URL}
+    env.pop("UNIFIED_DB_PATH", None)
+    subprocess.run([sys.executable, "migrate.py", "--url", TEST_DATABASE_URL, "--source", DATASET, "--fresh"],
+                   cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    done = subprocess.run([sys.executable, "-c", _CHECKS], cwd=BACKEND_DIR, env=env,
+                          check=True, capture_output=True, text=True)
+    line = next(line for line in done.stdout.splitlines() if line.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+def test_member_search_ignores_case(postgres):
+    assert postgres["search"][0] > 0
+    assert len(set(postgres["search"])) == 1
+
+def test_member_tracker_search_ignores_case(postgres):
+    assert postgres["tracker"][0] > 0
+    assert len(set(postgres["tracker"])) == 1
+
+def test_aliases_keep_their_spelling(postgres):
+    assert postgres["keys"] == ["saleCount", "topAmount"]
+
+def test_attrition_draft_is_retyped(postgres):
+    assert postgres["draft"] == "double precision"
+    assert postgres["drafts"] == [12.5, None]
+
+def test_sales_import_writes_to_postgres(postgres):
+    added, stored, logged = postgres["sales_import"]
+    assert added > 0
+    assert stored == logged == added
+
+def test_attrition_import_writes_to_postgres(postgres):
+    inserted, stored = postgres["attrition_import"]
+    assert inserted > 0
+    assert stored == inserted
@@ -0,0 +1,13 @@
+from unittest import mock
+
+from app import schema
+
+def test_deferred_migrations_wait_for_an_import():
+    with mock.patch.object(schema, "_ready", set()), mock.patch.object(schema, "_deferred", set()), \
+         mock.patch.object(schema, "_migrate", side_effect=[False, True]) as migrate:
+        schema.ensure("attrition")
+        schema.ensure("attrition")  # no connection or DDL until something creates the table
+        assert migrate.call_count == 1
+        schema.imported("attrition")
+        assert migrate.call_count == 2
+        assert schema.ready()["attrition"]
@@ -0,0 +1,68 @@
+import threading
+import time
+from unittest import mock
+
+from app import timeseries
+
+def _truth(db, month):
+    rows = db.execute("""
+        SELECT SUBSTR(latest_payment_date, 1, 10), COUNT(*), ROUND(SUM(total_amount), 2) FROM sales
+        WHERE profit_center = 'New Business' AND latest_payment_date LIKE ?
+        GROUP BY 1
+    """, (month + "%",)).fetchall()
+    return {day: (count, total) for day, count, total in rows}
+
+def _stored(db, month):
+    rows = db.execute(
+        "SELECT day, count, ROUND(total, 2) FROM series_daily WHERE metric = 'nb_cash' AND day LIKE ?", (month + "%",)
+    ).fetchall()
+    return {day: (count, total) for day, count, total in rows}
+
+def _late_sale(db):
+    """A New Business sale paid after the 2nd of its month, and that date."""
+    return db.execute("""
+        SELECT sale_id, latest_payment_date FROM sales
+        WHERE profit_center = 'New Business' AND SUBSTR(latest_payment_date, 9, 2) > '02'
+        ORDER BY latest_payment_date DESC LIMIT 1
+    """).fetchone()
+
+def test_refresh_rebuckets_a_sale_moved_within_its_month(client, db):
+    timeseries.refresh("nb_cash")
+    sale_id, paid = _late_sale(db)
+    month = paid[:7]
+    db.execute("UPDATE sales SET latest_payment_date = ? WHERE sale_id = ?", (month + "-01" + paid[10:], sale_id))
+    db.commit()
+
+    assert timeseries.refresh("nb_cash") == 2
+    assert _stored(db, month) == _truth(db, month)
+
+def test_api_edit_rebuckets_only_the_days_it_touched(client, db):
+    timeseries.refresh("nb_cash")
+    timeseries.ensure_fresh("nb_cash")
+    sale_id, paid = _late_sale(db)
+    moved_to = paid[:7] + "-02" + paid[10:]
+    assert client.put(f"/api/sales/{sale_id}", json={"latest_payment_date": moved_to}).json() == {"success": True}
+
+    with mock.patch.object(timeseries, "refresh", wraps=timeseries.refresh) as refresh:
+        timeseries.ensure_fresh("nb_cash")
+    refresh.assert_called_once_with("nb_cash", sorted({paid[:10], moved_to[:10]}))
+    assert _stored(db, paid[:7]) == _truth(db, paid[:7])
+
+def test_requests_leave_full_passes_to_the_reconciler(client):
+    callers = []
+    real = timeseries.refresh
+
+    def spy(*args, **kwargs):
+        callers.append(threading.get_ident())
+        return real(*args, **kwargs)
+
+    timeseries._seen.pop("guests", None)  # as after a write: guests has no change log, so only a full pass catches up
+    with mock.patch.object(timeseries, "refresh", spy):
+        with timeseries._locks["nb_cash"]:  # a slow pass of another metric holds up neither request
+            timeseries.ensure_fresh("guests")
+            timeseries.ensure_fresh("nb_cash")
+        assert threading.get_ident() not in callers
+        deadline = time.monotonic() + 10
+        while "guests" not in timeseries._seen and time.monotonic() < deadline:
+            time.sleep(0.05)
+    assert callers and threading.get_ident() not in callers
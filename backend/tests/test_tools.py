@@ -0,0 +1,14 @@
+import os
+
+from app.scripts import process_sales
+from conftest import BACKEND_DIR
+
+def test_sales_import_writes_to_the_configured_storage(client, db):
+    sales = db.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+    audit = db.execute("SELECT MAX(id) FROM sales_audit").fetchone()[0]
+    result = process_sales.process_sales_data(os.path.join(BACKEND_DIR, "all_sales_report.csv"), summary_path=os.devnull)
+
+    added = result["statistics"]["new_sales_added"]
+    assert added > 0
+    assert db.execute("SELECT COUNT(*) FROM sales").fetchone()[0] - sales == added
+    assert db.execute("SELECT COUNT(*) FROM sales_audit WHERE id > ? AND action = 'insert'", (audit,)).fetchone()[0] == added
@@ -82,54 +82,31 @@ export default function TopSection() {
   const fetchAttrition = async () => {
     setLoadingAttrition(true);
     try {
-      // Summary
-      const summaryRes = await fetch(`${API_BASE}/champions_club_cancelled_summary`);
+      // Every bucket's count and draft sum in one request
+      const summaryRes = await fetch(`${API_BASE}/api/attrition/summary`);
       const summary = await summaryRes.json();
-      setCtCanceled({ units: summary.count || 0, draftSum: summary.draft_sum || 0 });
-      // Details
-      const detailsRes = await fetch(`${API_BASE}/champions_club_cancelled_details`);
+      const totals = (bucket: string) => ({
+        units: summary[bucket]?.count || 0,
+        draftSum: summary[bucket]?.draft_sum || 0,
+      });
+      setCtCanceled(totals("champions_club_cancelled"));
+      setCtExpired(totals("champions_club_expired"));
+      setCtRFC(totals("champions_club_rfc"));
+      setOtherCanceled(totals("all_other_canceled"));
+      setOtherExpired(totals("all_other_expired"));
+      setOtherRFC(totals("all_other_rfc"));
+
+      // Member rows for every bucket, split client-side by their bucket tag
+      const detailsRes = await fetch(`${API_BASE}/api/attrition/details`);
       const details = await detailsRes.json();
-      setCtCanceledDetails(details.details || []);
-
-      // CT Expired
-      const expiredSummaryRes = await fetch(`${API_BASE}/champions_club_expired_summary`);
-      const expiredSummary = await expiredSummaryRes.json();
-      setCtExpired({ units: expiredSummary.count || 0, draftSum: expiredSummary.draft_sum || 0 });
-      const expiredDetailsRes = await fetch(`${API_BASE}/champions_club_expired_details`);
-      const expiredDetails = await expiredDetailsRes.json();
-      setCtExpiredDetails(expiredDetails.details || []);
-
-      // CT RFC
-      const rfcSummaryRes = await fetch(`${API_BASE}/champions_club_rfc_summary`);
-      const rfcSummary = await rfcSummaryRes.json();
-      setCtRFC({ units: rfcSummary.count || 0, draftSum: rfcSummary.draft_sum || 0 });
-      const rfcDetailsRes = await fetch(`${API_BASE}/champions_club_rfc_details`);
-      const rfcDetails = await rfcDetailsRes.json();
-      setCtRFCDetails(rfcDetails.details || []);
-
-      // All Other Canceled
-      const otherCanceledSummaryRes = await fetch(`${API_BASE}/all_other_canceled_summary`);
-      const otherCanceledSummary = await otherCanceledSummaryRes.json();
-      setOtherCanceled({ units: otherCanceledSummary.count || 0, draftSum: otherCanceledSummary.draft_sum || 0 });
-      const otherCanceledDetailsRes = await fetch(`${API_BASE}/all_other_canceled_details`);
-      const otherCanceledDetails = await otherCanceledDetailsRes.json();
-      setOtherCanceledDetails(otherCanceledDetails.details || []);
-
-      // All Other Expired
-      const otherExpiredSummaryRes = await fetch(`${API_BASE}/all_other_expired_summary`);
-      const otherExpiredSummary = await otherExpiredSummaryRes.json();
-      setOtherExpired({ units: otherExpiredSummary.count || 0, draftSum: otherExpiredSummary.draft_sum || 0 });
-      const otherExpiredDetailsRes = await fetch(`${API_BASE}/all_other_expired_details`);
-      const otherExpiredDetails = await otherExpiredDetailsRes.json();
-      setOtherExpiredDetails(otherExpiredDetails.details || []);
-
-      // All Other RFC
-      const otherRFCSummaryRes = await fetch(`${API_BASE}/all_other_rfc_summary`);
-      const otherRFCSummary = await otherRFCSummaryRes.json();
-      setOtherRFC({ units: otherRFCSummary.count || 0, draftSum: otherRFCSummary.draft_sum || 0 });
-      const otherRFCDetailsRes = await fetch(`${API_BASE}/all_other_rfc_details`);
-      const otherRFCDetails = await otherRFCDetailsRes.json();
-      setOtherRFCDetails(otherRFCDetails.details || []);
+      const rows = details.details || [];
+      const inBucket = (bucket: string) => rows.filter((row: any) => row.bucket === bucket);
+      setCtCanceledDetails(inBucket("champions_club_cancelled"));
+      setCtExpiredDetails(inBucket("champions_club_expired"));
+      setCtRFCDetails(inBucket("champions_club_rfc"));
+      setOtherCanceledDetails(inBucket("all_other_canceled"));
+      setOtherExpiredDetails(inBucket("all_other_expired"));
+      setOtherRFCDetails(inBucket("all_other_rfc"));
     } catch (e) {
       setCtCanceled({ units: 0, draftSum: 0 });
       setCtCanceledDetails([]);